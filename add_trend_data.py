@@ -12,7 +12,7 @@ import random
 backend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
 sys.path.insert(0, backend_path)
 
-from app_flask import create_app
+from app_flask import create_app, init_database
 from models import db, User, Prediction
 
 def add_trend_data():
@@ -20,6 +20,7 @@ def add_trend_data():
     app = create_app()
     
     with app.app_context():
+        init_database()
         print("📈 Adding prediction trend data...")
         print("=" * 50)
         
@@ -45,6 +46,7 @@ def add_trend_data():
         payment_methods = ["UPI", "Net Banking", "Credit card (automatic)", "Digital Wallet", "Electronic check"]
         
         created_count = 0
+        rows = []
         
         # Add 1-5 predictions for each of the last 30 days
         for days_back in range(30):
@@ -75,22 +77,22 @@ def add_trend_data():
                 # Randomly assign to demo_user or admin
                 user = random.choice([demo_user, admin_user])
                 
-                pred_record = Prediction(
-                    user_id=user.id,
-                    customer_name=customer_name,
-                    tenure=tenure,
-                    monthly_charges=monthly_charges,
-                    total_charges=total_charges,
-                    contract_type=contract_type,
-                    payment_method=payment_method,
-                    prediction=prediction,
-                    probability=probability,
-                    created_at=prediction_date
-                )
-                
-                db.session.add(pred_record)
+                rows.append({
+                    'user_id': user.id,
+                    'customer_name': customer_name,
+                    'tenure': tenure,
+                    'monthly_charges': monthly_charges,
+                    'total_charges': total_charges,
+                    'contract_type': contract_type,
+                    'payment_method': payment_method,
+                    'prediction': prediction,
+                    'probability': probability,
+                    'created_at': prediction_date
+                })
                 created_count += 1
         
+        # Insert everything in one bulk write
+        Prediction.bulk_insert(rows)
         db.session.commit()
         print(f"✅ Added {created_count} predictions across 30 days")
         
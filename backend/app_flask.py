@@ -6,16 +6,72 @@ from datetime import datetime, timedelta
 import csv
 import io
 import os
+import click
 from sqlalchemy import func, desc
 
 from config import Config
-from models import db, User, Prediction, ModelMetrics
+from models import db, User, Prediction, ModelMetrics, UserPredictionRollup, ensure_columns, ensure_indexes, rebuild_rollups
 from forms import LoginForm, RegistrationForm, PredictionForm
 from ml_utils import predictor
+from outbox_utils import outbox_sender
+from job_utils import recover_stale_jobs
+from metrics_utils import init_metrics
+from query_utils import init_query_tracking
+from profiling_utils import init_profiling
 
 # Global mail instance
 mail = Mail()
 
+def init_database():
+    """
+    Create and upgrade the tables and seed the default users and model metrics
+    
+    Idempotent; run once per database with `python init_db.py` (or
+    `flask init-db`) instead of on every boot. Needs an app context.
+    """
+    db.create_all()
+    ensure_columns()
+    ensure_indexes()
+    
+    # Backfill rollup tables for databases created before they existed
+    if not UserPredictionRollup.query.first() and Prediction.query.first():
+        rebuild_rollups()
+    
+    # Create default admin user if not exists
+    admin = User.query.filter_by(username='admin').first()
+    if not admin:
+        admin = User(
+            username='admin',
+            email='admin@churnpredict.in',
+            role='admin'
+        )
+        admin.set_password('admin123')
+        db.session.add(admin)
+    
+    # Create default user if not exists
+    user = User.query.filter_by(username='demo_user').first()
+    if not user:
+        user = User(
+            username='demo_user',
+            email='demo@churnpredict.in',
+            role='user'
+        )
+        user.set_password('user123')
+        db.session.add(user)
+    
+    # Create default model metrics if not exists
+    metrics = ModelMetrics.query.first()
+    if not metrics:
+        metrics = ModelMetrics(
+            accuracy=0.85,
+            precision=0.82,
+            recall=0.78,
+            f1_score=0.80
+        )
+        db.session.add(metrics)
+    
+    db.session.commit()
+
 def create_app():
     # Get the root directory (parent of backend)
     root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -35,49 +91,57 @@ def create_app():
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Please log in to access this page.'
     login_manager.login_message_category = 'info'
+    # API clients get a 401 instead of a redirect to the login form
+    login_manager.blueprint_login_views = {'api': None}
     
     @login_manager.user_loader
     def load_user(user_id):
         return User.query.get(int(user_id))
     
-    # Create tables
-    with app.app_context():
-        db.create_all()
-        
-        # Create default admin user if not exists
-        admin = User.query.filter_by(username='admin').first()
-        if not admin:
-            admin = User(
-                username='admin',
-                email='admin@churnpredict.in',
-                role='admin'
-            )
-            admin.set_password('admin123')
-            db.session.add(admin)
-        
-        # Create default user if not exists
-        user = User.query.filter_by(username='demo_user').first()
-        if not user:
-            user = User(
-                username='demo_user',
-                email='demo@churnpredict.in',
-                role='user'
-            )
-            user.set_password('user123')
-            db.session.add(user)
-        
-        # Create default model metrics if not exists
-        metrics = ModelMetrics.query.first()
-        if not metrics:
-            metrics = ModelMetrics(
-                accuracy=0.85,
-                precision=0.82,
-                recall=0.78,
-                f1_score=0.80
-            )
-            db.session.add(metrics)
-        
+    @login_manager.request_loader
+    def load_user_from_api_key(request):
+        # Service clients call /api/* with "Authorization: Bearer <API key>" instead of a session
+        if request.blueprint != 'api':
+            return None
+        scheme, _, key = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() != 'bearer':
+            return None
+        return User.from_api_key(key.strip())
+    
+    # Schema setup and seeding (bcrypt hashing) are a one-time step; only databases that
+    # start empty on every boot (in-memory SQLite) are initialized here
+    if app.config['INIT_DB_ON_BOOT']:
+        with app.app_context():
+            init_database()
+    
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create tables and default users"""
+        init_database()
+        print("✅ Database initialized")
+    
+    @app.cli.command('create-api-key')
+    @click.argument('username')
+    def create_api_key_command(username):
+        """Issue an API key for a user (replaces the previous key), e.g. for a CRM service account"""
+        user = User.query.filter_by(username=username).first()
+        if user is None:
+            raise click.ClickException(f"No user named {username}")
+        key = user.generate_api_key()
         db.session.commit()
+        print(f"✅ API key for {username} (shown once): {key}")
+    
+    @app.cli.command('send-outbox')
+    def send_outbox_command():
+        """Deliver due emails once and delete expired sent ones (for deployments without the sender thread)"""
+        from outbox_utils import OutboxSender, purge_sent_messages
+        sender = OutboxSender()
+        try:
+            sent, failed = sender.send_due()
+        finally:
+            sender.close()
+        print(f"✅ Sent {sent} emails, {failed} failed")
+        print(f"✅ Deleted {purge_sent_messages()} expired sent emails")
     
     # Register blueprints
     from routes.auth import auth_bp
@@ -90,6 +154,30 @@ def create_app():
     app.register_blueprint(admin_bp, url_prefix='/admin')
     app.register_blueprint(api_bp, url_prefix='/api')
     
+    # Opt-in sampling profiler; registered first so it covers the other request hooks
+    init_profiling(app)
+    
+    # SQL statement counts, N+1 warnings and query budgets per request
+    init_query_tracking(app)
+    
+    # Request, database and model metrics plus the Prometheus /metrics endpoint
+    init_metrics(app)
+    
+    # Hot-reload new model versions; started lazily so each forked worker runs its own watcher
+    @app.before_request
+    def start_model_watcher():
+        predictor.start_watcher()
+    
+    # Take over bulk jobs left behind by workers that exited
+    @app.before_request
+    def recover_bulk_jobs():
+        recover_stale_jobs(app)
+    
+    # Deliver queued emails from every worker, including retries left by earlier runs
+    @app.before_request
+    def start_outbox_sender():
+        outbox_sender.start(app)
+    
     # Add test route for dark mode
     @app.route('/test-dark')
     def test_dark():
@@ -104,4 +192,6 @@ def create_app():
 
 if __name__ == '__main__':
     app = create_app()
+    with app.app_context():
+        init_database()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
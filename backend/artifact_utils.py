@@ -0,0 +1,222 @@
+"""
+Model artifact format
+
+Holds the feature schema, the fused scaler + logistic regression model and
+the safe on-disk artifact it is served from: a NumPy .npz file of plain
+numeric arrays plus a JSON header. Loading it never unpickles anything and
+does not import sklearn.
+"""
+
+import hashlib
+import json
+import os
+import zipfile
+from datetime import datetime
+
+import numpy as np
+
+# Artifact format written by export_artifact
+ARTIFACT_FORMAT = 'churn-fused-linear'
+ARTIFACT_FORMAT_VERSION = 1
+
+# Feature order expected by the scaler and model
+FEATURE_COLUMNS = ('tenure', 'monthly_charges', 'total_charges', 'contract_type', 'payment_method')
+
+CONTRACT_MAP = {
+    "Month-to-month": 0,
+    "One year": 1,
+    "Two year": 2
+}
+
+PAYMENT_MAP = {
+    "Electronic check": 0,
+    "Mailed check": 1,
+    "Bank transfer (automatic)": 2,
+    "Credit card (automatic)": 3,
+    "UPI": 4,
+    "Net Banking": 5,
+    "Digital Wallet": 6
+}
+
+def _sigmoid(z):
+    """Numerically stable logistic function"""
+    return np.exp(-np.logaddexp(0.0, -z))
+
+class FusedLogisticModel:
+    """
+    StandardScaler + binary LogisticRegression folded into a single linear model.
+    
+    ((x - mean) / scale) . coef + intercept == x . (coef / scale) + (intercept - mean . coef / scale)
+    so scoring is one dot product and a sigmoid, without sklearn's input validation.
+    """
+    
+    # Maximum allowed difference from sklearn before the fast path is rejected
+    TOLERANCE = 1e-9
+    
+    def __init__(self, weights, bias, classes):
+        self.weights = np.ascontiguousarray(weights, dtype=np.float64)
+        self.bias = float(bias)
+        self.classes = np.asarray(classes)
+    
+    @classmethod
+    def from_sklearn(cls, scaler, model):
+        """Compile the fitted scaler and model, or return None if they cannot be folded"""
+        if type(scaler).__name__ != 'StandardScaler' or type(model).__name__ != 'LogisticRegression':
+            return None
+        
+        coef = np.asarray(getattr(model, 'coef_', np.empty((0, 0))), dtype=np.float64)
+        classes = getattr(model, 'classes_', None)
+        if coef.ndim != 2 or coef.shape[0] != 1 or classes is None or len(classes) != 2:
+            return None
+        
+        n_features = coef.shape[1]
+        mean = scaler.mean_ if getattr(scaler, 'mean_', None) is not None else np.zeros(n_features)
+        scale = scaler.scale_ if getattr(scaler, 'scale_', None) is not None else np.ones(n_features)
+        
+        weights = coef[0] / np.asarray(scale, dtype=np.float64)
+        bias = float(np.asarray(model.intercept_, dtype=np.float64)[0]) - float(np.dot(weights, mean))
+        fused = cls(weights, bias, classes)
+        
+        # Reject the fast path if it does not reproduce sklearn (e.g. multinomial binary models)
+        probe = np.asarray(mean, dtype=np.float64) + np.outer(np.linspace(-3, 3, 13), scale)
+        expected = model.predict_proba(scaler.transform(probe))[:, 1]
+        if not np.allclose(fused.predict_proba(probe), expected, rtol=0, atol=cls.TOLERANCE):
+            return None
+        
+        return fused
+    
+    def decision_function(self, features):
+        return features @ self.weights + self.bias
+    
+    def predict_proba(self, features):
+        """Probability of the positive class for each row"""
+        return _sigmoid(self.decision_function(features))
+    
+    def predict_one(self, features):
+        """Score a single feature vector, returns (label, probability)"""
+        z = float(np.dot(self.weights, features)) + self.bias
+        return self.classes[1 if z > 0 else 0], float(_sigmoid(z))
+    
+    def save(self, path):
+        """Write the numeric state as one flat float64 .npy file: [bias, class0, class1, *weights]"""
+        state = np.concatenate([[self.bias], self.classes.astype(np.float64), self.weights])
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, state)
+        os.replace(tmp_path, path)
+    
+    @classmethod
+    def load_shared(cls, path):
+        """
+        Map a file written by save() read-only
+        
+        The weights stay a view into the mapping, so every worker mapping the
+        same file shares one copy of the page cache instead of private pages.
+        """
+        state = np.load(path, mmap_mode='r')
+        return cls(state[3:], state[0], state[1:3].astype(np.int64))
+
+def content_version(model_bytes, scaler_bytes):
+    """Version name of pickled files outside the registry: a hash of their contents"""
+    return hashlib.sha256(model_bytes + scaler_bytes).hexdigest()[:12]
+
+class ModelArtifact:
+    """Contents of a loaded .npz artifact"""
+    
+    def __init__(self, header, fused, feature_mean, feature_scale):
+        self.header = header
+        self.fused = fused
+        self.feature_mean = feature_mean
+        self.feature_scale = feature_scale
+    
+    @property
+    def contract_map(self):
+        return self.header['contract_map']
+    
+    @property
+    def payment_map(self):
+        return self.header['payment_map']
+
+def export_artifact(scaler, model, path, source_version=None):
+    """
+    Write a fitted scaler + model as a non-executable .npz artifact
+    
+    Args:
+        scaler: Fitted StandardScaler
+        model: Fitted binary LogisticRegression
+        path (str): Destination .npz file, replaced atomically
+        source_version (str): Version of the pickles it was exported from
+    
+    Returns:
+        dict: The JSON header written to the artifact
+    
+    Raises:
+        ValueError: If the scaler and model cannot be folded into one linear model
+    """
+    fused = FusedLogisticModel.from_sklearn(scaler, model)
+    if fused is None or not np.issubdtype(fused.classes.dtype, np.integer):
+        raise ValueError(f"{type(scaler).__name__} + {type(model).__name__} cannot be exported as a linear artifact")
+    
+    n_features = len(FEATURE_COLUMNS)
+    mean = getattr(scaler, 'mean_', None)
+    scale = getattr(scaler, 'scale_', None)
+    
+    header = {
+        'format': ARTIFACT_FORMAT,
+        'format_version': ARTIFACT_FORMAT_VERSION,
+        'model_type': type(model).__name__,
+        'feature_columns': list(FEATURE_COLUMNS),
+        'contract_map': CONTRACT_MAP,
+        'payment_map': PAYMENT_MAP,
+        'source_version': source_version,
+        'created_at': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+    }
+    
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(
+            f,
+            header=np.array(json.dumps(header)),
+            weights=fused.weights,
+            bias=np.array(fused.bias),
+            classes=fused.classes.astype(np.int64),
+            feature_mean=np.asarray(mean if mean is not None else np.zeros(n_features), dtype=np.float64),
+            feature_scale=np.asarray(scale if scale is not None else np.ones(n_features), dtype=np.float64)
+        )
+    os.replace(tmp_path, path)
+    
+    return header
+
+def load_artifact(path):
+    """
+    Load an artifact written by export_artifact
+    
+    Returns:
+        ModelArtifact
+    
+    Raises:
+        ValueError: If the file is not a supported, consistent artifact
+    """
+    try:
+        # allow_pickle=False makes np.load refuse object arrays, so nothing is executed
+        with np.load(path, allow_pickle=False) as data:
+            header = json.loads(str(data['header']))
+            weights, bias, classes, mean, scale = (
+                np.array(data[name]) for name in ('weights', 'bias', 'classes', 'feature_mean', 'feature_scale')
+            )
+    except (KeyError, zipfile.BadZipFile, json.JSONDecodeError) as e:
+        raise ValueError(f"Invalid model artifact {path}: {e}") from e
+    
+    if header.get('format') != ARTIFACT_FORMAT or header.get('format_version') != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported model artifact {path}: {header.get('format')} v{header.get('format_version')}")
+    if tuple(header.get('feature_columns', ())) != FEATURE_COLUMNS:
+        raise ValueError(f"Model artifact {path} expects features {header.get('feature_columns')}")
+    
+    n_features = len(FEATURE_COLUMNS)
+    shapes_ok = (weights.shape == (n_features,) and bias.shape == () and classes.shape == (2,)
+                 and mean.shape == (n_features,) and scale.shape == (n_features,))
+    if not shapes_ok or not np.issubdtype(classes.dtype, np.integer) or not np.all(np.isfinite(weights)):
+        raise ValueError(f"Model artifact {path} has inconsistent arrays")
+    
+    fused = FusedLogisticModel(weights, bias, classes)
+    return ModelArtifact(header, fused, mean, scale)
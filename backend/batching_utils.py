@@ -0,0 +1,118 @@
+"""
+Micro-batching of single scoring requests
+
+Concurrent callers queue their item and get a concurrent.futures.Future.
+A background thread collects items until the batch is full or the oldest
+item has waited max_latency seconds, scores them with one call and resolves
+each future. Threaded workers block on future.result(), async code awaits
+asyncio.wrap_future(future); under gevent the patched threading primitives
+make both cooperative.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from concurrency_utils import run_cpu_bound
+
+logger = logging.getLogger(__name__)
+
+class MicroBatcher:
+    """Score queued items together, one call per batch"""
+
+    # Upper bounds of the batch size histogram buckets
+    SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+    def __init__(self, score_batch, max_batch=64, max_latency=0.002):
+        """
+        Args:
+            score_batch: Callable taking a list of items and returning a list
+                of results in the same order
+            max_batch (int): Largest number of items scored together
+            max_latency (float): Longest time in seconds an item waits for
+                the batch to fill
+        """
+        self.score_batch = score_batch
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+
+        self._queue = None
+        self._lock = threading.Lock()
+        self._worker_pid = None
+
+        self.batches = 0
+        self.items = 0
+        self.wait_seconds = 0.0
+        self.size_counts = [0] * (len(self.SIZE_BUCKETS) + 1)
+
+    def submit(self, item):
+        """Queue one item, returns a Future resolving to its result"""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def _ensure_worker(self):
+        """Start the batching thread once per process (threads do not survive a fork)"""
+        if self._worker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker_pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            self._worker_pid = os.getpid()
+            threading.Thread(target=self._run, args=(self._queue,), name='micro-batcher', daemon=True).start()
+
+    def _run(self, pending):
+        while True:
+            batch = [pending.get()]
+            deadline = batch[0][2] + self.max_latency
+
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._score(batch)
+
+    def _score(self, batch):
+        started = time.perf_counter()
+        try:
+            results = run_cpu_bound(self.score_batch, [item for item, _, _ in batch])
+        except Exception as e:
+            logger.error(f"Micro-batch of {len(batch)} items failed: {str(e)}")
+            for _, future, _ in batch:
+                future.set_exception(e)
+        else:
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+
+        size = len(batch)
+        bucket = next((i for i, bound in enumerate(self.SIZE_BUCKETS) if size <= bound), len(self.SIZE_BUCKETS))
+        with self._lock:
+            self.batches += 1
+            self.items += size
+            self.wait_seconds += sum(started - enqueued for _, _, enqueued in batch)
+            self.size_counts[bucket] += 1
+
+    def stats(self):
+        with self._lock:
+            histogram = {str(bound): count for bound, count in zip(self.SIZE_BUCKETS, self.size_counts)}
+            histogram['+Inf'] = self.size_counts[-1]
+            return {
+                'enabled': True,
+                'max_batch': self.max_batch,
+                'max_latency_ms': self.max_latency * 1000,
+                'batches': self.batches,
+                'items': self.items,
+                'mean_batch_size': self.items / self.batches if self.batches else 0.0,
+                'mean_wait_ms': self.wait_seconds / self.items * 1000 if self.items else 0.0,
+                'batch_size_histogram': histogram
+            }
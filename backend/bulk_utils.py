@@ -0,0 +1,212 @@
+"""
+Streaming bulk CSV prediction pipeline
+
+Uploads are decoded incrementally and processed in fixed-size chunks: each
+chunk is validated, scored with a single vectorized predictor call and
+written with one bulk insert, so memory stays bounded by the chunk size.
+Each chunk is inserted in a savepoint: a database error fails that chunk's
+rows and the rest of the file is still processed.
+"""
+
+import csv
+import io
+import logging
+import math
+from itertools import islice
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import db, Prediction
+from ml_utils import predictor, NUMERIC_LIMITS
+from concurrency_utils import run_cpu_bound
+
+logger = logging.getLogger(__name__)
+
+# Rows parsed, scored and inserted together
+DEFAULT_CHUNK_SIZE = 5000
+
+# Result rows kept for display; counts always cover the whole file
+MAX_RESULT_ROWS = 1000
+
+def iter_csv_chunks(binary_stream, chunk_size=DEFAULT_CHUNK_SIZE, encoding='utf-8-sig', skip_rows=0):
+    """
+    Yield lists of (row_num, row) tuples from a binary CSV stream
+
+    The stream is decoded incrementally, only one chunk of rows is held in memory.
+    Row numbers start at 2 to account for the header line; the first skip_rows
+    data rows (already processed by an earlier run) are read but not yielded.
+    """
+    text_stream = io.TextIOWrapper(binary_stream, encoding=encoding, newline='')
+    try:
+        rows = islice(enumerate(csv.DictReader(text_stream), start=2), skip_rows, None)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        # Leave the underlying upload stream open for its owner
+        text_stream.detach()
+
+def parse_numeric(row, field):
+    """A numeric column as a finite float within NUMERIC_LIMITS"""
+    value = float(row.get(field, 0))
+    low, high = NUMERIC_LIMITS[field]
+    # NaN compares false against both bounds, so this also rejects nan and inf
+    if not (math.isfinite(value) and low <= value <= high):
+        raise ValueError(f"{field} must be between {low} and {high}")
+    return value
+
+def prepare_chunk(chunk):
+    """
+    Validate a chunk of CSV rows
+
+    Returns:
+        tuple: (records, errors) where records is a list of column dicts ready
+        for scoring and errors is a list of (row_num, name, message)
+    """
+    records = []
+    errors = []
+
+    for row_num, row in chunk:
+        try:
+            customer_name = row.get('customer_name', f'Customer {row_num}')
+            if customer_name is not None and len(customer_name) > 100:
+                raise ValueError("customer_name must be at most 100 characters")
+            records.append({
+                'row': row_num,
+                'customer_name': customer_name,
+                'tenure': parse_numeric(row, 'tenure'),
+                'monthly_charges': parse_numeric(row, 'monthly_charges'),
+                'total_charges': parse_numeric(row, 'total_charges'),
+                'contract_type': row.get('contract_type', 'Month-to-month'),
+                'payment_method': row.get('payment_method', 'Electronic check')
+            })
+        except Exception as e:
+            errors.append((row_num, row.get('customer_name', 'Unknown'), str(e)))
+
+    return records, errors
+
+def score_chunk(records):
+    """Score validated records in one vectorized call, adding prediction fields in place"""
+    predictions, probabilities, model_version = predictor.predict_batch(
+        tenure=[r['tenure'] for r in records],
+        monthly_charges=[r['monthly_charges'] for r in records],
+        total_charges=[r['total_charges'] for r in records],
+        contract_type=[r['contract_type'] for r in records],
+        payment_method=[r['payment_method'] for r in records],
+        return_version=True
+    )
+    risk_scores = Prediction.risk_scores(probabilities)
+
+    for record, prediction, probability, risk_score in zip(records, predictions.tolist(),
+                                                           probabilities.tolist(), risk_scores.tolist()):
+        record['prediction'] = prediction
+        record['probability'] = probability
+        record['risk_score'] = risk_score
+        record['model_version'] = model_version
+
+    return records
+
+def insert_chunk(records, user_id):
+    """Write scored records through the Prediction bulk insert path"""
+    Prediction.bulk_insert([{
+        'user_id': user_id,
+        'customer_name': r['customer_name'],
+        'tenure': r['tenure'],
+        'monthly_charges': r['monthly_charges'],
+        'total_charges': r['total_charges'],
+        'contract_type': r['contract_type'],
+        'payment_method': r['payment_method'],
+        'prediction': r['prediction'],
+        'probability': r['probability'],
+        'risk_score': r['risk_score'],
+        'model_version': r['model_version']
+    } for r in records], batch_size=len(records))
+
+def chunk_results(records, errors):
+    """Turn a processed chunk into display/result rows in file order"""
+    outcomes = [(r['row'], r) for r in records] + [(e[0], e) for e in errors]
+    rows = []
+
+    for row_num, outcome in sorted(outcomes, key=lambda item: item[0]):
+        if isinstance(outcome, dict):
+            rows.append({
+                'row': row_num,
+                'name': outcome['customer_name'],
+                'status': 'success',
+                'prediction': 'Churn' if outcome['prediction'] == 1 else 'No Churn',
+                'risk_score': outcome['risk_score'],
+                'probability': f"{outcome['probability']:.1%}"
+            })
+        else:
+            rows.append({
+                'row': row_num,
+                'name': outcome[1],
+                'status': 'error',
+                'error': outcome[2]
+            })
+
+    return rows
+
+def process_bulk_csv(binary_stream, user_id, chunk_size=DEFAULT_CHUNK_SIZE, max_results=MAX_RESULT_ROWS,
+                     on_chunk=None, skip_rows=0):
+    """
+    Run the streaming bulk prediction pipeline over an uploaded CSV
+
+    All chunks are written in the current transaction, each in a savepoint; the caller commits
+    (on_chunk may commit to make progress visible).
+
+    Args:
+        on_chunk: optional callback(rows, success_count, error_count) called
+            after each chunk with that chunk's result rows and running totals
+        skip_rows: data rows at the start of the file to leave out (resuming a job);
+            the totals only cover the rows processed by this call
+
+    Returns:
+        dict: success_count, error_count, and up to max_results result rows
+    """
+    results = []
+    success_count = 0
+    error_count = 0
+
+    for chunk in iter_csv_chunks(binary_stream, chunk_size, skip_rows=skip_rows):
+        # Validation and scoring are CPU-bound, keep them off the event loop under gevent
+        records, errors = run_cpu_bound(prepare_chunk, chunk)
+
+        if records:
+            try:
+                run_cpu_bound(score_chunk, records)
+            except Exception as e:
+                logger.error(f"Scoring chunk starting at row {chunk[0][0]} failed: {str(e)}")
+                errors.extend((r['row'], r['customer_name'], str(e)) for r in records)
+                records = []
+
+        if records:
+            try:
+                # A savepoint, so a failed insert only loses this chunk's rows
+                with db.session.begin_nested():
+                    insert_chunk(records, user_id)
+            except SQLAlchemyError as e:
+                logger.error(f"Saving chunk starting at row {chunk[0][0]} failed: {str(e)}")
+                errors.extend((r['row'], r['customer_name'], 'Could not save prediction') for r in records)
+                records = []
+
+        success_count += len(records)
+        error_count += len(errors)
+
+        # Only build per-row results when someone is going to look at them
+        if on_chunk is None and len(results) >= max_results:
+            continue
+
+        rows = chunk_results(records, errors)
+        results.extend(rows[:max(max_results - len(results), 0)])
+
+        if on_chunk is not None:
+            on_chunk(rows, success_count, error_count)
+
+    return {
+        'results': results,
+        'success_count': success_count,
+        'error_count': error_count
+    }
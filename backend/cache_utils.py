@@ -0,0 +1,133 @@
+"""
+Prediction result cache
+
+An in-process LRU keyed on the encoded feature tuple and the model version,
+with an optional SQLite file tier shared by all gunicorn workers on a host.
+"""
+
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+class PredictionCache:
+    """Bounded LRU cache of (prediction, probability) results"""
+
+    def __init__(self, max_size=10000, shared_path=None, shared_max_rows=100000):
+        self.max_size = max_size
+        self.shared_path = shared_path
+        self.shared_max_rows = shared_max_rows
+        self.model_version = None
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._shared_writes = 0
+
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def reset(self, model_version):
+        """Drop all cached results, called whenever a model is (re)loaded"""
+        with self._lock:
+            self._entries.clear()
+            self.model_version = model_version
+
+    def _shared_connection(self):
+        """One SQLite connection per thread for the shared tier"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.shared_path, timeout=1.0, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS prediction_cache ('
+                'key TEXT PRIMARY KEY, prediction INTEGER NOT NULL, probability REAL NOT NULL)'
+            )
+            self._local.connection = connection
+        return connection
+
+    def _shared_key(self, key):
+        # Include the model version so results of an older model never match
+        return f"{self.model_version}:" + ':'.join(repr(part) for part in key)
+
+    def get(self, key):
+        """Return the cached (prediction, probability) for an encoded feature tuple, or None"""
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+
+        if self.shared_path:
+            try:
+                row = self._shared_connection().execute(
+                    'SELECT prediction, probability FROM prediction_cache WHERE key = ?',
+                    (self._shared_key(key),)
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"Shared prediction cache read failed: {str(e)}")
+                row = None
+            if row is not None:
+                result = (row[0], row[1])
+                with self._lock:
+                    self.shared_hits += 1
+                self._store_local(key, result)
+                return result
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _store_local(self, key, result):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def put(self, key, result):
+        """Store a freshly computed result in both tiers"""
+        self._store_local(key, result)
+
+        if self.shared_path:
+            try:
+                connection = self._shared_connection()
+                connection.execute(
+                    'INSERT OR REPLACE INTO prediction_cache (key, prediction, probability) VALUES (?, ?, ?)',
+                    (self._shared_key(key), result[0], result[1])
+                )
+                self._shared_writes += 1
+                # Trim the oldest rows now and then to keep the file bounded
+                if self._shared_writes % 1000 == 0:
+                    connection.execute(
+                        'DELETE FROM prediction_cache WHERE rowid <= '
+                        '(SELECT MAX(rowid) FROM prediction_cache) - ?',
+                        (self.shared_max_rows,)
+                    )
+            except sqlite3.Error as e:
+                logger.warning(f"Shared prediction cache write failed: {str(e)}")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                'model_version': self.model_version,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'shared': bool(self.shared_path),
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': (self.hits + self.shared_hits) / lookups if lookups else 0.0
+            }
@@ -0,0 +1,71 @@
+"""
+Helpers for the sync and gevent serving profiles
+
+Under gevent (gunicorn_gevent_config.py monkey-patches the process) every
+request is a greenlet on one OS thread, so CPU-bound work stalls all of
+them; run_cpu_bound moves that work to gevent's native thread pool. Under
+the sync profile it just calls the function.
+"""
+
+import sys
+
+def gevent_patched():
+    """True when gevent has monkey-patched threading in this process"""
+    if 'gevent' not in sys.modules:
+        return False
+    from gevent import monkey
+    return monkey.is_module_patched('threading')
+
+def run_cpu_bound(func, *args, **kwargs):
+    """
+    Run func(*args, **kwargs) without blocking other greenlets
+
+    The function must not use the request context or the database session,
+    both are local to the calling greenlet.
+
+    Returns:
+        The function's return value (exceptions propagate to the caller)
+    """
+    if not gevent_patched():
+        return func(*args, **kwargs)
+
+    import gevent
+    return gevent.get_hub().threadpool.apply(func, args, kwargs)
+
+def start_native_thread(func, *args):
+    """
+    Run func(*args) in a real OS thread, also under gevent (where threading
+    starts greenlets that only run when the hub gets control)
+
+    Pair with native_sleep inside func.
+    """
+    if gevent_patched():
+        from gevent import monkey
+        monkey.get_original('_thread', 'start_new_thread')(func, args)
+    else:
+        import threading
+        threading.Thread(target=func, args=args, daemon=True).start()
+
+def native_sleep(seconds):
+    """time.sleep that blocks the OS thread even when gevent has patched it"""
+    if gevent_patched():
+        from gevent import monkey
+        monkey.get_original('time', 'sleep')(seconds)
+    else:
+        import time
+        time.sleep(seconds)
+
+def native_thread_id():
+    """Identifier of the current OS thread (threading.get_ident is per greenlet under gevent)"""
+    if gevent_patched():
+        from gevent import monkey
+        return monkey.get_original('_thread', 'get_ident')()
+    import threading
+    return threading.get_ident()
+
+def current_greenlet():
+    """The running greenlet when gevent has patched the process, None otherwise"""
+    if not gevent_patched():
+        return None
+    import gevent
+    return gevent.getcurrent()
@@ -20,12 +20,48 @@ class Config:
         db_path = os.path.join(os.path.dirname(__file__), 'instance', 'churn_app.db')
         SQLALCHEMY_DATABASE_URI = f'sqlite:///{db_path}'
     
+    # In-memory SQLite is one connection shared by every thread, so background threads must not
+    # use the database: their commits and rollbacks would land in the requests' transactions
+    IN_MEMORY_DATABASE = SQLALCHEMY_DATABASE_URI in ('sqlite:///:memory:', 'sqlite://')
+    
+    # Create tables and default users at boot; otherwise run `python init_db.py` once per database.
+    # Defaults to on only for in-memory SQLite, which starts empty every time
+    INIT_DB_ON_BOOT = os.environ.get('INIT_DB_ON_BOOT', str(SQLALCHEMY_DATABASE_URI == 'sqlite:///:memory:')).lower() in ['true', 'on', '1']
+    
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     PERMANENT_SESSION_LIFETIME = timedelta(hours=2)
     
     # Model paths - relative to backend folder
     MODEL_PATH = os.path.join(os.path.dirname(__file__), 'churn_model.pkl')
     SCALER_PATH = os.path.join(os.path.dirname(__file__), 'scaler.pkl')
+    MODEL_ARTIFACT_PATH = os.environ.get('MODEL_ARTIFACT_PATH') or os.path.join(os.path.dirname(__file__), 'churn_model.npz')  # Safe export of the two files above
+    MODEL_ALLOW_PICKLE = os.environ.get('MODEL_ALLOW_PICKLE', 'true').lower() in ['true', 'on', '1']
+    
+    # Versioned model registry (takes precedence over the paths above once it has a manifest)
+    MODEL_REGISTRY_DIR = os.environ.get('MODEL_REGISTRY_DIR') or os.path.join(os.path.dirname(__file__), 'model_registry')
+    MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL') or 5)  # seconds, 0 disables hot reload
+    # Memory-mapped model state shared by all gunicorn workers (empty disables it)
+    MODEL_SHARED_DIR = os.environ.get('MODEL_SHARED_DIR', os.path.join(os.path.dirname(__file__), 'instance', 'model_shared'))
+    
+    # Prediction result cache (size 0 disables it, set the path to share it between workers)
+    PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE') or 10000)
+    PREDICTION_CACHE_PATH = os.environ.get('PREDICTION_CACHE_PATH')
+    
+    # Micro-batching of concurrent single predictions (max latency 0 disables it)
+    MICRO_BATCH_MAX_LATENCY_MS = float(os.environ.get('MICRO_BATCH_MAX_LATENCY_MS') or 0)
+    MICRO_BATCH_MAX_SIZE = int(os.environ.get('MICRO_BATCH_MAX_SIZE') or 64)
+    
+    # Background bulk prediction jobs
+    JOB_FOLDER = os.environ.get('JOB_FOLDER') or os.path.join(os.path.dirname(__file__), 'instance', 'jobs')
+    BULK_JOB_WORKERS = int(os.environ.get('BULK_JOB_WORKERS') or 2)
+    # A queued or running job whose heartbeat is older than this was left by an exited worker and is
+    # resumed by another one; a job that stops BULK_JOB_MAX_ATTEMPTS times is marked failed
+    BULK_JOB_STALE_SECONDS = int(os.environ.get('BULK_JOB_STALE_SECONDS') or 120)
+    BULK_JOB_MAX_ATTEMPTS = int(os.environ.get('BULK_JOB_MAX_ATTEMPTS') or 3)
+    
+    # JSON prediction API
+    API_MAX_BATCH = int(os.environ.get('API_MAX_BATCH') or 1000)
+    STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE') or 500)
     
     # Email Configuration
     MAIL_SERVER = os.environ.get('MAIL_SERVER') or 'smtp.gmail.com'
@@ -35,6 +71,40 @@ class Config:
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER') or 'noreply@churnpredict.com'
     
+    # Email outbox: background delivery with retries (poll interval 0 disables the sender thread)
+    OUTBOX_POLL_INTERVAL = float(os.environ.get('OUTBOX_POLL_INTERVAL') or 10)
+    OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE') or 20)
+    OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS') or 5)
+    OUTBOX_RETRY_BASE_SECONDS = float(os.environ.get('OUTBOX_RETRY_BASE_SECONDS') or 30)
+    OUTBOX_SMTP_IDLE_SECONDS = float(os.environ.get('OUTBOX_SMTP_IDLE_SECONDS') or 30)
+    # Sent messages are deleted after this many days (0 keeps them)
+    OUTBOX_RETENTION_DAYS = float(os.environ.get('OUTBOX_RETENTION_DAYS') or 30)
+    
+    # Bulk report emails show this many rows inline and attach longer reports as .csv.gz
+    EMAIL_INLINE_ROWS = int(os.environ.get('EMAIL_INLINE_ROWS') or 20)
+    EMAIL_REPORT_MAX_ROWS = int(os.environ.get('EMAIL_REPORT_MAX_ROWS') or 50000)
+    
+    # SQL statements per request: log requests over these limits and statements repeated
+    # this often (N+1); enforcing makes requests over their route's @query_budget fail
+    SQL_QUERY_WARN_COUNT = int(os.environ.get('SQL_QUERY_WARN_COUNT') or 20)
+    SQL_QUERY_WARN_MS = float(os.environ.get('SQL_QUERY_WARN_MS') or 250)
+    SQL_REPEAT_THRESHOLD = int(os.environ.get('SQL_REPEAT_THRESHOLD') or 5)
+    SQL_QUERY_BUDGET_ENFORCE = os.environ.get('SQL_QUERY_BUDGET_ENFORCE', 'false').lower() in ['true', 'on', '1']
+    
+    # Sampling profiler: profiles PROFILE_SAMPLE_RATE of requests plus admin requests sending
+    # PROFILE_HEADER, and keeps the last PROFILE_KEEP profiles as folded stacks in PROFILE_DIR
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() in ['true', 'on', '1']
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE') or 0.01)
+    PROFILE_HEADER = os.environ.get('PROFILE_HEADER', 'X-Profile')
+    PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS') or 5)
+    PROFILE_DIR = os.environ.get('PROFILE_DIR') or os.path.join(os.path.dirname(__file__), 'instance', 'profiles')
+    PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP') or 200)
+    # Per-endpoint aggregates are compacted (repeated stacks merged, rarest dropped) past this size
+    PROFILE_ENDPOINT_MAX_KB = float(os.environ.get('PROFILE_ENDPOINT_MAX_KB') or 1024)
+    
+    # Prometheus /metrics endpoint; when set, scrapers must send "Authorization: Bearer <token>"
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    
     # Email Templates
     COMPANY_NAME = "ChurnPredictor"
     COMPANY_EMAIL = "support@churnpredict.com"
@@ -0,0 +1,111 @@
+"""
+Streaming CSV export of predictions
+
+Rows are fetched in batches as plain column tuples (no ORM objects) and
+written to the response as they are formatted, optionally gzip-compressed
+on the fly, so worker memory stays flat regardless of export size.
+"""
+
+import csv
+import io
+import zlib
+from datetime import datetime
+
+from flask import Response, stream_with_context
+
+from models import Prediction
+
+# Rows fetched per database round trip
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = (
+    Prediction.customer_name,
+    Prediction.tenure,
+    Prediction.monthly_charges,
+    Prediction.total_charges,
+    Prediction.contract_type,
+    Prediction.payment_method,
+    Prediction.prediction,
+    Prediction.risk_score,
+    Prediction.probability,
+    Prediction.created_at
+)
+
+def _header(include_risk_score):
+    header = ['Customer Name', 'Tenure (Months)', 'Monthly Charges (₹)', 'Total Charges (₹)',
+              'Contract Type', 'Payment Method', 'Prediction']
+    if include_risk_score:
+        header.append('Risk Score')
+    return header + ['Probability', 'Date']
+
+def _format_row(row, include_risk_score):
+    """Format a column tuple with Indian currency formatting"""
+    formatted = [
+        row.customer_name,
+        f"{row.tenure} months",
+        f"₹{row.monthly_charges:,.0f}",
+        f"₹{row.total_charges:,.0f}",
+        row.contract_type,
+        row.payment_method,
+        'Churn' if row.prediction == 1 else 'No Churn'
+    ]
+    if include_risk_score:
+        formatted.append(row.risk_score)
+    return formatted + [
+        f"{row.probability:.3f}",
+        row.created_at.strftime('%Y-%m-%d %H:%M:%S')
+    ]
+
+def iter_csv_chunks(query, include_risk_score=False, batch_size=EXPORT_BATCH_SIZE):
+    """Yield CSV text one batch of rows at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(_header(include_risk_score))
+
+    # yield_per streams from the cursor (server-side on PostgreSQL) instead of fetching everything
+    rows = query.with_entities(*EXPORT_COLUMNS).execution_options(yield_per=batch_size)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(_format_row(row, include_risk_score))
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+def _gzip_chunks(chunks):
+    """Gzip-compress a stream of text chunks on the fly"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+def predictions_csv_gz(query, include_risk_score=False):
+    """Return the whole CSV export of a Prediction query as gzip-compressed bytes (e.g. for an email attachment)"""
+    return b''.join(_gzip_chunks(iter_csv_chunks(query, include_risk_score)))
+
+def stream_predictions_csv(query, include_risk_score=False, compress=False):
+    """
+    Build a streaming CSV download for a Prediction query
+
+    Args:
+        query: Prediction query (filters and ordering are kept)
+        include_risk_score (bool): Add the Risk Score column
+        compress (bool): Send a gzip-compressed .csv.gz file
+    """
+    filename = f'churn_predictions_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+    chunks = iter_csv_chunks(query, include_risk_score)
+
+    if compress:
+        body = _gzip_chunks(chunks)
+        mimetype = 'application/gzip'
+        filename += '.gz'
+    else:
+        body = (chunk.encode('utf-8') for chunk in chunks)
+        mimetype = 'text/csv'
+
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
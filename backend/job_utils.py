@@ -0,0 +1,240 @@
+"""
+Background job queue for bulk CSV predictions
+
+Uploads are spooled to disk and scored by a local thread pool; progress is
+tracked in the BulkJob table so any gunicorn worker can answer polling
+requests, and full results are written to a CSV for download.
+
+The pool lives in the worker process, so a worker that exits (recycled by
+max_requests, restarted or killed) stops its jobs midway. Each chunk's
+predictions are committed together with the job's progress and heartbeat,
+so every worker periodically looks for jobs whose heartbeat is older than
+BULK_JOB_STALE_SECONDS and resumes them after the last committed row. A job
+that stops BULK_JOB_MAX_ATTEMPTS times is marked failed.
+
+On an in-memory database jobs run in the request (pool threads would share
+its only connection), so uploads are bounded by the request timeout there.
+"""
+
+import csv
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from itertools import islice
+
+from flask import current_app
+from sqlalchemy import func, update
+
+from config import Config
+from models import db, BulkJob
+from bulk_utils import process_bulk_csv, MAX_RESULT_ROWS
+
+logger = logging.getLogger(__name__)
+
+RESULT_COLUMNS = ['row', 'customer_name', 'status', 'prediction', 'risk_score', 'probability', 'error']
+
+_executor = None
+_executor_lock = threading.Lock()
+_recovery_lock = threading.Lock()
+_next_recovery = {}
+
+def get_executor():
+    """Create the worker pool on first use so it is started after gunicorn forks"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=Config.BULK_JOB_WORKERS,
+                                           thread_name_prefix='bulk-job')
+        return _executor
+
+def upload_path(job_id):
+    return os.path.join(Config.JOB_FOLDER, f'job_{job_id}_upload.csv')
+
+def result_path(job_id):
+    return os.path.join(Config.JOB_FOLDER, f'job_{job_id}_results.csv')
+
+def submit_bulk_job(file_storage, user_id):
+    """Spool an uploaded CSV to disk and queue it for background processing"""
+    os.makedirs(Config.JOB_FOLDER, exist_ok=True)
+
+    job = BulkJob(user_id=user_id, filename=file_storage.filename, status='queued')
+    db.session.add(job)
+    db.session.commit()
+
+    file_storage.save(upload_path(job.id))
+
+    if Config.IN_MEMORY_DATABASE:
+        # Pool threads would share the request's connection, process the upload here instead
+        process_bulk_job(job.id)
+    else:
+        app = current_app._get_current_object()
+        get_executor().submit(run_bulk_job, app, job.id)
+    return job
+
+def run_bulk_job(app, job_id):
+    """Worker entry point: process a job in its own application context"""
+    with app.app_context():
+        process_bulk_job(job_id)
+
+def claim_job(job_id):
+    """Move a queued job to running; False if another worker already took it"""
+    now = datetime.utcnow()
+    claimed = db.session.execute(
+        update(BulkJob)
+        .where(BulkJob.id == job_id, BulkJob.status == 'queued')
+        .values(status='running', started_at=func.coalesce(BulkJob.started_at, now), heartbeat_at=now,
+                attempts=func.coalesce(BulkJob.attempts, 0) + 1)
+    ).rowcount
+    db.session.commit()
+    return claimed == 1
+
+def keep_result_rows(job_id, n_rows):
+    """Cut the results CSV back to its header and first n_rows rows (rows of an uncommitted chunk may follow)"""
+    path = result_path(job_id)
+    partial_path = path + '.partial'
+    with open(partial_path, 'w', newline='', encoding='utf-8') as output:
+        writer = csv.writer(output)
+        if os.path.exists(path):
+            with open(path, newline='', encoding='utf-8') as f:
+                writer.writerows(islice(csv.reader(f), n_rows + 1))
+        else:
+            writer.writerow(RESULT_COLUMNS)
+    os.replace(partial_path, path)
+
+def process_bulk_job(job_id):
+    """Score the spooled upload and record progress per chunk, resuming after the rows already committed"""
+    if not claim_job(job_id):
+        return
+    job = db.session.get(BulkJob, job_id)
+    resume_from, success_base, error_base = job.rows_processed, job.success_count, job.error_count
+    if resume_from:
+        logger.warning(f"Resuming bulk job {job_id} after row {resume_from} (attempt {job.attempts})")
+        keep_result_rows(job_id, resume_from)
+
+    try:
+        with open(upload_path(job_id), 'rb') as upload, \
+                open(result_path(job_id), 'a' if resume_from else 'w', newline='', encoding='utf-8') as output:
+            writer = csv.writer(output)
+            if not resume_from:
+                writer.writerow(RESULT_COLUMNS)
+
+            def on_chunk(rows, success_count, error_count):
+                writer.writerows([
+                    row['row'],
+                    row['name'],
+                    row['status'],
+                    row.get('prediction', ''),
+                    row.get('risk_score', ''),
+                    row.get('probability', ''),
+                    row.get('error', '')
+                ] for row in rows)
+                # Flush the result rows before the commit, so committed progress never runs ahead of the file
+                output.flush()
+                job.success_count = success_base + success_count
+                job.error_count = error_base + error_count
+                job.rows_processed = job.success_count + job.error_count
+                job.heartbeat_at = datetime.utcnow()
+                # Commit the chunk's predictions with the progress, the point a resumed run continues from
+                db.session.commit()
+
+            process_bulk_csv(upload, job.user_id, max_results=0, on_chunk=on_chunk, skip_rows=resume_from)
+
+        job.status = 'completed'
+    except Exception as e:
+        logger.error(f"Bulk job {job_id} failed: {str(e)}")
+        db.session.rollback()
+        job = db.session.get(BulkJob, job_id)
+        job.status = 'failed'
+        job.error_message = str(e)
+    finally:
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        if os.path.exists(upload_path(job_id)):
+            os.remove(upload_path(job_id))
+
+def recover_stale_jobs(app):
+    """Look for jobs of exited workers every BULK_JOB_STALE_SECONDS / 2 per process, off the request thread"""
+    if Config.IN_MEMORY_DATABASE:
+        return
+    now = time.monotonic()
+    # Keyed by pid: a forked worker starts with a check of its own
+    if now < _next_recovery.get(os.getpid(), 0):
+        return
+    with _recovery_lock:
+        if now < _next_recovery.get(os.getpid(), 0):
+            return
+        _next_recovery[os.getpid()] = now + Config.BULK_JOB_STALE_SECONDS / 2
+    get_executor().submit(run_stale_job_recovery, app)
+
+def run_stale_job_recovery(app):
+    with app.app_context():
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=Config.BULK_JOB_STALE_SECONDS)
+        last_seen = func.coalesce(BulkJob.heartbeat_at, BulkJob.created_at)
+        stale_jobs = BulkJob.query.filter(BulkJob.status.in_(('queued', 'running')), last_seen < cutoff).all()
+
+        for job in stale_jobs:
+            job_id, status, attempts, rows_done = job.id, job.status, job.attempts or 0, job.rows_processed
+            requeue = os.path.exists(upload_path(job_id)) and attempts < Config.BULK_JOB_MAX_ATTEMPTS
+            if requeue:
+                # Queued again with its progress kept; the fresh heartbeat keeps other workers off it
+                values = {'status': 'queued', 'heartbeat_at': now}
+            elif not os.path.exists(upload_path(job_id)):
+                values = {'status': 'failed', 'finished_at': now,
+                          'error_message': f'The uploaded file was lost after {rows_done} rows'}
+            else:
+                values = {'status': 'failed', 'finished_at': now,
+                          'error_message': f'Processing stopped {attempts} times, giving up after '
+                                           f'{rows_done} rows; those predictions were saved'}
+
+            # Only one worker wins each job
+            taken = db.session.execute(
+                update(BulkJob)
+                .where(BulkJob.id == job_id, BulkJob.status == status, last_seen < cutoff)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.commit()
+            if not taken:
+                continue
+
+            if requeue:
+                logger.warning(f"Bulk job {job_id} was left {status} by an exited worker, "
+                               f"{'resuming it after row ' + str(rows_done) if rows_done else 'starting it again'}")
+                get_executor().submit(run_bulk_job, app, job_id)
+            else:
+                logger.warning(f"Bulk job {job_id} was left {status} by an exited worker, marked failed")
+                if os.path.exists(upload_path(job_id)):
+                    os.remove(upload_path(job_id))
+
+def load_job_results(job, limit=MAX_RESULT_ROWS):
+    """Read the first result rows of a finished job in the bulk_predict.html format"""
+    path = result_path(job.id)
+    if not os.path.exists(path):
+        return []
+
+    results = []
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            if len(results) >= limit:
+                break
+            result = {'row': int(row['row']), 'name': row['customer_name'], 'status': row['status']}
+            if row['status'] == 'success':
+                result.update(prediction=row['prediction'], risk_score=int(row['risk_score']),
+                              probability=row['probability'])
+            else:
+                result['error'] = row['error']
+            results.append(result)
+
+    return results
+
+def delete_user_jobs(user_id):
+    """Remove a user's jobs and their files (used when accounts are deleted)"""
+    for job in BulkJob.query.filter_by(user_id=user_id).all():
+        for path in (upload_path(job.id), result_path(job.id)):
+            if os.path.exists(path):
+                os.remove(path)
+    BulkJob.query.filter_by(user_id=user_id).delete()
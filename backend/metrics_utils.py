@@ -0,0 +1,78 @@
+"""
+Prometheus metrics for requests, model inference, database queries and caches
+
+Under gunicorn the samples of all workers are aggregated through
+prometheus_client's multiprocess mode: gunicorn_config.py points
+PROMETHEUS_MULTIPROC_DIR at a shared directory before the app is imported,
+every worker writes its samples there and /metrics reads them all.
+"""
+
+import os
+import time
+
+from flask import Response, current_app, g, request
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess)
+
+from query_utils import current_queries
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+INFERENCE_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 1000, 5000)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+REQUESTS = Counter('churn_http_requests_total', 'HTTP requests by endpoint and status',
+                   ['endpoint', 'method', 'status'])
+REQUEST_LATENCY = Histogram('churn_http_request_duration_seconds', 'Time to build the response',
+                            ['endpoint'], buckets=LATENCY_BUCKETS)
+INFERENCE_LATENCY = Histogram('churn_model_inference_seconds', 'Model scoring time per call',
+                              ['kind'], buckets=INFERENCE_BUCKETS)
+BATCH_SIZE = Histogram('churn_model_batch_size', 'Customers scored per call',
+                       ['kind'], buckets=BATCH_SIZE_BUCKETS)
+DB_QUERIES = Histogram('churn_db_queries_per_request', 'SQL statements executed per request',
+                       ['endpoint'], buckets=QUERY_COUNT_BUCKETS)
+DB_TIME = Histogram('churn_db_seconds_per_request', 'Time spent in SQL statements per request',
+                    ['endpoint'], buckets=LATENCY_BUCKETS)
+CACHE_LOOKUPS = Counter('churn_prediction_cache_lookups_total', 'Prediction cache lookups by result',
+                        ['result'])
+
+def observe_inference(kind, seconds, batch_size=1):
+    """Record one scoring call (kind: single, batch or micro)"""
+    INFERENCE_LATENCY.labels(kind).observe(seconds)
+    BATCH_SIZE.labels(kind).observe(batch_size)
+
+def observe_cache_lookup(hit):
+    CACHE_LOOKUPS.labels('hit' if hit else 'miss').inc()
+
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+def _record_request(response):
+    endpoint = request.endpoint or 'unmatched'
+    REQUESTS.labels(endpoint, request.method, str(response.status_code)).inc()
+    if 'request_started' in g:
+        REQUEST_LATENCY.labels(endpoint).observe(time.perf_counter() - g.request_started)
+    queries = current_queries()
+    DB_QUERIES.labels(endpoint).observe(queries.count)
+    DB_TIME.labels(endpoint).observe(queries.seconds)
+    return response
+
+def metrics_view():
+    """Prometheus text exposition; set METRICS_TOKEN to require a bearer token"""
+    token = current_app.config.get('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        # Aggregate the samples written by every worker
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+def init_metrics(app):
+    """Instrument the app's requests (statement counts come from query_utils) and add the /metrics endpoint"""
+    app.before_request(_start_request_timer)
+    app.after_request(_record_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -1,59 +1,130 @@
+import os
+import asyncio
+import logging
 import pickle
+import threading
+import time
+from concurrent.futures import Future
 import numpy as np
 from config import Config
+from cache_utils import PredictionCache
+from batching_utils import MicroBatcher
+from metrics_utils import observe_cache_lookup, observe_inference
+from artifact_utils import FEATURE_COLUMNS, CONTRACT_MAP, PAYMENT_MAP, FusedLogisticModel, content_version, load_artifact
+from registry_utils import active_artifacts, manifest_path
 
-class ChurnPredictor:
-    def __init__(self):
-        self.model = None
-        self.scaler = None
-        self.load_models()
+logger = logging.getLogger(__name__)
+
+# Accepted range of each numeric feature, the same limits as PredictionForm
+NUMERIC_LIMITS = {
+    'tenure': (0, 100),
+    'monthly_charges': (0, 50000),
+    'total_charges': (0, 500000)
+}
+
+def _encode_column(values, mapping):
+    """Map a column of category labels to codes, unknown labels become 0"""
+    values = np.asarray(values, dtype=object)
+    if values.size == 0:
+        return np.zeros(0, dtype=np.float64)
+    # Look up each distinct label once, then broadcast back with the inverse index
+    uniques, inverse = np.unique(values.astype(str), return_inverse=True)
+    codes = np.array([mapping.get(label, 0) for label in uniques], dtype=np.float64)
+    return codes[inverse.ravel()]
+
+def _read_files(*paths):
+    """Return the raw bytes of each file"""
+    contents = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            contents.append(f.read())
+    return contents
+
+def _completed(result):
+    """A Future that already holds result"""
+    future = Future()
+    future.set_result(result)
+    return future
+
+def _shared_fast_model(fused, version):
+    """Replace the fused model's arrays with a read-only memory map shared by all workers"""
+    if not Config.MODEL_SHARED_DIR or not np.issubdtype(fused.classes.dtype, np.integer):
+        return fused
     
-    def load_models(self):
-        try:
-            with open(Config.MODEL_PATH, 'rb') as f:
-                self.model = pickle.load(f)
-            with open(Config.SCALER_PATH, 'rb') as f:
-                self.scaler = pickle.load(f)
-        except FileNotFoundError as e:
-            print(f"Model files not found: {e}")
-            raise
+    path = os.path.join(Config.MODEL_SHARED_DIR, f'{version}.npy')
+    try:
+        if not os.path.exists(path):
+            os.makedirs(Config.MODEL_SHARED_DIR, exist_ok=True)
+            fused.save(path)
+        shared = FusedLogisticModel.load_shared(path)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Shared model state unavailable, using a private copy: {e}")
+        return fused
     
-    def encode_features(self, contract_type, payment_method):
-        """Encode categorical features for Indian context"""
-        contract_map = {
-            "Month-to-month": 0,
-            "One year": 1,
-            "Two year": 2
-        }
-        
-        payment_map = {
-            "Electronic check": 0,
-            "Mailed check": 1,
-            "Bank transfer (automatic)": 2,
-            "Credit card (automatic)": 3,
-            "UPI": 4,
-            "Net Banking": 5,
-            "Digital Wallet": 6
-        }
-        
-        return contract_map.get(contract_type, 0), payment_map.get(payment_method, 0)
-    
-    def predict(self, tenure, monthly_charges, total_charges, contract_type, payment_method):
-        """Make prediction for customer churn"""
-        if not self.model or not self.scaler:
-            raise ValueError("Models not loaded properly")
+    # Never trust a file that does not hold exactly this model
+    if (shared.bias != fused.bias or not np.array_equal(shared.weights, fused.weights)
+            or not np.array_equal(shared.classes, fused.classes)):
+        return fused
+    return shared
+
+class LoadedModel:
+    """One model version ready for scoring, never modified after loading"""
+    
+    # Rows scored before a new version is swapped in
+    WARMUP_ROWS = 256
+    
+    def __init__(self, version, fast_model=None, model=None, scaler=None, contract_map=None,
+                 payment_map=None, feature_mean=None, feature_scale=None):
+        if fast_model is None and (model is None or scaler is None):
+            raise ValueError(f"Model {version} has neither a fast path nor sklearn objects")
         
-        # Encode categorical features
-        contract_encoded, payment_encoded = self.encode_features(contract_type, payment_method)
+        self.version = version
+        self.model = model
+        self.scaler = scaler
+        self.contract_map = contract_map if contract_map is not None else CONTRACT_MAP
+        self.payment_map = payment_map if payment_map is not None else PAYMENT_MAP
+        
+        # Typical feature values, used to build warm-up inputs
+        n_features = len(FEATURE_COLUMNS)
+        self.feature_mean = np.asarray(feature_mean if feature_mean is not None else np.zeros(n_features), dtype=np.float64)
+        self.feature_scale = np.asarray(feature_scale if feature_scale is not None else np.ones(n_features), dtype=np.float64)
+        
+        self.fast_model = _shared_fast_model(fast_model, version) if fast_model is not None else None
+    
+    @classmethod
+    def from_artifact(cls, version, artifact):
+        """Build from a loaded .npz ModelArtifact, without sklearn"""
+        return cls(version, fast_model=artifact.fused,
+                   contract_map=artifact.contract_map, payment_map=artifact.payment_map,
+                   feature_mean=artifact.feature_mean, feature_scale=artifact.feature_scale)
+    
+    @classmethod
+    def from_sklearn(cls, version, model, scaler):
+        """Build from unpickled sklearn objects; other estimator types than the fused one use sklearn directly"""
+        return cls(version, fast_model=FusedLogisticModel.from_sklearn(scaler, model), model=model, scaler=scaler,
+                   feature_mean=getattr(scaler, 'mean_', None), feature_scale=getattr(scaler, 'scale_', None))
+    
+    def encode_features(self, contract_type, payment_method):
+        """Encode categorical features with this version's category maps"""
+        return self.contract_map.get(contract_type, 0), self.payment_map.get(payment_method, 0)
+    
+    def build_feature_matrix(self, tenure, monthly_charges, total_charges, contract_type, payment_method):
+        """Build the (n, 5) feature matrix from columnar inputs"""
+        return np.column_stack([
+            np.asarray(tenure, dtype=np.float64).ravel(),
+            np.asarray(monthly_charges, dtype=np.float64).ravel(),
+            np.asarray(total_charges, dtype=np.float64).ravel(),
+            _encode_column(contract_type, self.contract_map),
+            _encode_column(payment_method, self.payment_map)
+        ])
+    
+    def predict_one(self, features):
+        """Score one encoded feature tuple, returns (label, probability)"""
+        input_data = np.array([features], dtype=np.float64)
         
-        # Prepare input data
-        input_data = np.array([[
-            tenure,
-            monthly_charges,
-            total_charges,
-            contract_encoded,
-            payment_encoded
-        ]])
+        if self.fast_model is not None:
+            prediction, churn_probability = self.fast_model.predict_one(input_data[0])
+            return int(prediction), churn_probability
         
         # Scale the input
         input_scaled = self.scaler.transform(input_data)
@@ -66,6 +137,359 @@ class ChurnPredictor:
         churn_probability = probability[1] if len(probability) > 1 else probability[0]
         
         return int(prediction), float(churn_probability)
+    
+    def predict_matrix(self, features):
+        """Score an (n, 5) feature matrix, returns (labels, probabilities) arrays"""
+        if self.fast_model is not None:
+            churn_probability = self.fast_model.predict_proba(features)
+            predictions = self.fast_model.classes[(churn_probability > 0.5).astype(np.intp)].astype(np.int64)
+            return predictions, churn_probability
+        
+        # Scale once and score everything with a single predict_proba call
+        probabilities = self.model.predict_proba(self.scaler.transform(features))
+        
+        # Derive the label from the probabilities instead of a second predict() pass
+        predictions = np.asarray(self.model.classes_)[np.argmax(probabilities, axis=1)].astype(np.int64)
+        churn_probability = probabilities[:, 1] if probabilities.shape[1] > 1 else probabilities[:, 0]
+        
+        return predictions, churn_probability.astype(np.float64)
+    
+    def warm_up(self):
+        """
+        Run the scoring paths once so the first real request pays no first-call cost
+        
+        Raises:
+            ValueError: If the model does not take the expected features or
+                returns invalid probabilities
+        """
+        n_features = len(FEATURE_COLUMNS)
+        mean, scale = self.feature_mean, self.feature_scale
+        if mean.shape != (n_features,) or scale.shape != (n_features,):
+            raise ValueError(f"Model {self.version} expects {mean.size} features, not {n_features}")
+        
+        features = mean + np.outer(np.linspace(-3, 3, self.WARMUP_ROWS), scale)
+        _, probabilities = self.predict_matrix(features)
+        _, probability = self.predict_one(tuple(features[0]))
+        
+        if not (np.all(np.isfinite(probabilities)) and np.all((probabilities >= 0) & (probabilities <= 1))
+                and 0 <= probability <= 1):
+            raise ValueError(f"Model {self.version} returned invalid probabilities during warm-up")
+
+class ChurnPredictor:
+    def __init__(self):
+        self.active = None
+        self.cache = PredictionCache(max_size=Config.PREDICTION_CACHE_SIZE,
+                                     shared_path=Config.PREDICTION_CACHE_PATH)
+        # Concurrent single predictions are queued and scored together when enabled
+        self.batcher = None
+        if Config.MICRO_BATCH_MAX_LATENCY_MS > 0:
+            self.batcher = MicroBatcher(self._score_batch,
+                                        max_batch=Config.MICRO_BATCH_MAX_SIZE,
+                                        max_latency=Config.MICRO_BATCH_MAX_LATENCY_MS / 1000)
+        self._reload_lock = threading.Lock()
+        self._watcher_lock = threading.Lock()
+        self._watcher_pid = None
+        self._artifact_signature = None
+        self.load_models()
+    
+    # Attributes of the active version, kept for callers that inspect the predictor directly
+    @property
+    def model(self):
+        return self.active.model if self.active else None
+    
+    @property
+    def scaler(self):
+        return self.active.scaler if self.active else None
+    
+    @property
+    def fast_model(self):
+        return self.active.fast_model if self.active else None
+    
+    @property
+    def model_version(self):
+        return self.active.version if self.active else None
+    
+    def artifact_source(self):
+        """
+        Return (version, artifact_path, model_path, scaler_path) of the active
+        model, version is None for the legacy files
+        """
+        active = active_artifacts()
+        if active is not None:
+            return active
+        return None, Config.MODEL_ARTIFACT_PATH, Config.MODEL_PATH, Config.SCALER_PATH
+    
+    def _current_signature(self):
+        """Modification stamp of whatever decides the active model"""
+        if os.path.exists(manifest_path()):
+            paths = [manifest_path()]
+        else:
+            paths = [Config.MODEL_ARTIFACT_PATH, Config.MODEL_PATH, Config.SCALER_PATH]
+        signature = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                signature.append((path, stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append((path, None, None))
+        return tuple(signature)
+    
+    def load_models(self, force=False):
+        """
+        Load the active model version, warm it up and swap it in
+        
+        In-flight requests keep scoring with the version they started with; the
+        old version stays active if loading or warm-up fails.
+        
+        Args:
+            force (bool): Reload even if the active version did not change
+        
+        Returns:
+            bool: True if a new version was swapped in
+        """
+        with self._reload_lock:
+            signature = self._current_signature()
+            version, artifact_path, model_path, scaler_path = self.artifact_source()
+            
+            # Prefer the safe .npz artifact: no unpickling and no sklearn import
+            artifact = None
+            if os.path.exists(artifact_path):
+                try:
+                    artifact = load_artifact(artifact_path)
+                except ValueError as e:
+                    logger.warning(f"Ignoring model artifact: {e}")
+            
+            model_bytes = scaler_bytes = None
+            if version is None:
+                # Legacy files are identified by a content hash of the pickles (read, not unpickled)
+                try:
+                    model_bytes, scaler_bytes = _read_files(model_path, scaler_path)
+                    version = content_version(model_bytes, scaler_bytes)
+                except FileNotFoundError as e:
+                    if artifact is None:
+                        logger.error(f"Model files not found: {e}")
+                        raise
+                    version = artifact.header.get('source_version') or 'artifact'
+                
+                # An artifact exported from other pickles than the current ones is stale
+                if artifact is not None and model_bytes is not None and artifact.header.get('source_version') != version:
+                    logger.warning(f"Model artifact {artifact_path} is stale, loading the pickles")
+                    artifact = None
+            
+            self._artifact_signature = signature
+            if not force and self.active is not None and self.active.version == version:
+                return False
+            
+            if artifact is not None:
+                loaded = LoadedModel.from_artifact(version, artifact)
+            else:
+                if not Config.MODEL_ALLOW_PICKLE:
+                    raise ValueError(f"No valid model artifact for version {version} and pickle loading is disabled")
+                if model_bytes is None:
+                    try:
+                        model_bytes, scaler_bytes = _read_files(model_path, scaler_path)
+                    except FileNotFoundError as e:
+                        logger.error(f"Model files not found: {e}")
+                        raise
+                loaded = LoadedModel.from_sklearn(version, pickle.loads(model_bytes), pickle.loads(scaler_bytes))
+            loaded.warm_up()
+            
+            # A single reference assignment, so readers see either the old or the new version
+            self.active = loaded
+            
+            # Results of the previous model are no longer valid
+            self.cache.reset(version)
+            return True
+    
+    def start_watcher(self, interval=None):
+        """
+        Poll the model artifacts in a daemon thread and hot-swap changed models
+        
+        Safe to call on every request: one watcher is started per process, so
+        each forked gunicorn worker gets its own.
+        """
+        interval = Config.MODEL_WATCH_INTERVAL if interval is None else interval
+        if interval <= 0 or self._watcher_pid == os.getpid():
+            return
+        
+        with self._watcher_lock:
+            if self._watcher_pid == os.getpid():
+                return
+            self._watcher_pid = os.getpid()
+            threading.Thread(target=self._watch, args=(interval,), name='model-watcher', daemon=True).start()
+    
+    def refresh(self):
+        """
+        Load the active model if its files changed since this copy was loaded
+        
+        Returns:
+            bool: True if a new version was loaded
+        """
+        if self._current_signature() == self._artifact_signature:
+            return False
+        try:
+            if self.load_models():
+                logger.info(f"Model version {self.model_version} loaded")
+                return True
+        except Exception as e:
+            # Keep serving the current version; a later file change triggers another attempt
+            logger.error(f"Model reload failed, keeping version {self.model_version}: {e}")
+        return False
+    
+    def _watch(self, interval):
+        while True:
+            time.sleep(interval)
+            self.refresh()
+    
+    def encode_features(self, contract_type, payment_method):
+        """Encode categorical features for Indian context"""
+        return self.active.encode_features(contract_type, payment_method)
+    
+    def build_feature_matrix(self, tenure, monthly_charges, total_charges, contract_type, payment_method):
+        """Build the (n, 5) feature matrix from columnar inputs"""
+        return self.active.build_feature_matrix(tenure, monthly_charges, total_charges, contract_type, payment_method)
+    
+    def predict(self, tenure, monthly_charges, total_charges, contract_type, payment_method, return_version=False):
+        """
+        Make prediction for customer churn
+        
+        Returns:
+            tuple: (prediction, probability), plus the model version when
+            return_version is set
+        """
+        active, cache_key, future = self._start_prediction(tenure, monthly_charges, total_charges,
+                                                           contract_type, payment_method)
+        return self._finish_prediction(active, cache_key, future.result(), return_version)
+    
+    async def predict_async(self, tenure, monthly_charges, total_charges, contract_type, payment_method,
+                            return_version=False):
+        """
+        predict() for async code: waits for the micro-batch without blocking the event loop
+        
+        Returns:
+            tuple: (prediction, probability), plus the model version when
+            return_version is set
+        """
+        active, cache_key, future = self._start_prediction(tenure, monthly_charges, total_charges,
+                                                           contract_type, payment_method)
+        return self._finish_prediction(active, cache_key, await asyncio.wrap_future(future), return_version)
+    
+    def _start_prediction(self, tenure, monthly_charges, total_charges, contract_type, payment_method):
+        """
+        Encode one customer and answer from the cache, the micro-batcher or the model
+        
+        Shared by predict() and predict_async(), which differ only in how they
+        wait for the returned future.
+        
+        Returns:
+            tuple: (active model, cache key to store the result under or None,
+            Future of (prediction, probability))
+        """
+        # Score the whole request with one version even if a reload happens meanwhile
+        active = self.active
+        if active is None:
+            raise ValueError("Models not loaded properly")
+        
+        # Encode categorical features
+        contract_encoded, payment_encoded = active.encode_features(contract_type, payment_method)
+        features = (float(tenure), float(monthly_charges), float(total_charges), contract_encoded, payment_encoded)
+        
+        # Identical encoded features give identical results for the same model
+        cache_key = (active.version,) + features
+        if self.cache.enabled:
+            result = self.cache.get(cache_key)
+            observe_cache_lookup(result is not None)
+            if result is not None:
+                return active, None, _completed(result)
+        else:
+            cache_key = None
+        
+        if self.batcher is not None:
+            return active, cache_key, self.batcher.submit((active, features))
+        
+        start = time.perf_counter()
+        result = active.predict_one(features)
+        observe_inference('single', time.perf_counter() - start)
+        return active, cache_key, _completed(result)
+    
+    def _finish_prediction(self, active, cache_key, result, return_version):
+        """Cache a freshly scored result and shape the return value of predict()"""
+        if cache_key is not None:
+            self.cache.put(cache_key, result)
+        return (*result, active.version) if return_version else result
+    
+    def _score_batch(self, items):
+        """
+        Score queued (active model, features) items, one vectorized call per model version
+        
+        Returns:
+            list: (prediction, probability) per item, in order
+        """
+        results = [None] * len(items)
+        groups = {}
+        for index, (active, _) in enumerate(items):
+            groups.setdefault(id(active), (active, []))[1].append(index)
+        
+        for active, indexes in groups.values():
+            start = time.perf_counter()
+            predictions, probabilities = active.predict_matrix(
+                np.array([items[i][1] for i in indexes], dtype=np.float64))
+            observe_inference('micro', time.perf_counter() - start, len(indexes))
+            for i, prediction, probability in zip(indexes, predictions.tolist(), probabilities.tolist()):
+                results[i] = (int(prediction), float(probability))
+        return results
+    
+    def predict_batch(self, data=None, return_version=False, **columns):
+        """
+        Make predictions for many customers in one vectorized pass
+        
+        Args:
+            data: DataFrame or mapping of column name -> sequence holding
+                the FEATURE_COLUMNS. Alternatively pass the columns as
+                keyword arguments (lists or NumPy arrays).
+            return_version (bool): Also return the model version used
+        
+        Returns:
+            tuple: (predictions, probabilities) as NumPy arrays of int and float,
+            plus the model version when return_version is set
+        """
+        active = self.active
+        if active is None:
+            raise ValueError("Models not loaded properly")
+        
+        if data is not None:
+            columns = {name: data[name] for name in FEATURE_COLUMNS}
+        
+        missing = [name for name in FEATURE_COLUMNS if name not in columns]
+        if missing:
+            raise ValueError(f"Missing feature columns: {', '.join(missing)}")
+        
+        features = active.build_feature_matrix(*(columns[name] for name in FEATURE_COLUMNS))
+        if features.shape[0] == 0:
+            result = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+        else:
+            start = time.perf_counter()
+            result = active.predict_matrix(features)
+            observe_inference('batch', time.perf_counter() - start, features.shape[0])
+        
+        return (*result, active.version) if return_version else result
+
+class LazyPredictor:
+    """Creates the ChurnPredictor, and so loads the model, on first use instead of at import"""
+    
+    def __init__(self):
+        self._instance = None
+        self._lock = threading.Lock()
+    
+    def get(self):
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = ChurnPredictor()
+        return self._instance
+    
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
 
 # Global predictor instance
-predictor = ChurnPredictor()
\ No newline at end of file
+predictor = LazyPredictor()
@@ -1,11 +1,27 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from sqlalchemy import insert, select, delete, update, func, case, event, inspect
+from sqlalchemy.dialects import sqlite, postgresql
+from collections import defaultdict
 from datetime import datetime
+import hashlib
+import secrets
+import numpy as np
 import bcrypt
 
+from config import Config
+
 db = SQLAlchemy()
 
+def hash_api_key(key):
+    """SHA-256 of an API key; keys are random, so a fast hash is enough and keeps lookups cheap"""
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
 class User(UserMixin, db.Model):
+    __table_args__ = (
+        db.Index('ix_user_api_key_hash', 'api_key_hash', unique=True),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
@@ -13,9 +29,12 @@ class User(UserMixin, db.Model):
     role = db.Column(db.String(20), default='user')  # 'admin' or 'user'
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     is_active = db.Column(db.Boolean, default=True)
+    api_key_hash = db.Column(db.String(64))  # Only the hash of the key is stored
     
-    # Relationship with predictions
-    predictions = db.relationship('Prediction', backref='user', lazy=True)
+    # Relationship with predictions. Never load it per user in lists (read counts from
+    # UserPredictionRollup); deleting a user relies on Prediction.delete_for_user instead
+    # of loading every prediction to detach it
+    predictions = db.relationship('Prediction', backref='user', lazy=True, passive_deletes=True)
     
     def set_password(self, password):
         self.password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
@@ -25,8 +44,33 @@ class User(UserMixin, db.Model):
     
     def is_admin(self):
         return self.role == 'admin'
+    
+    def generate_api_key(self):
+        """Create a new API key, replacing the previous one; the key is only returned, never stored"""
+        key = secrets.token_urlsafe(32)
+        self.api_key_hash = hash_api_key(key)
+        return key
+    
+    def revoke_api_key(self):
+        self.api_key_hash = None
+    
+    @classmethod
+    def from_api_key(cls, key):
+        """The active user owning an API key, or None"""
+        if not key:
+            return None
+        return cls.query.filter_by(api_key_hash=hash_api_key(key), is_active=True).first()
 
 class Prediction(db.Model):
+    # Hot queries filter by user and order/range on created_at (history, dashboard,
+    # trends, exports); admin views filter on prediction
+    __table_args__ = (
+        db.Index('ix_prediction_user_created', 'user_id', 'created_at'),
+        db.Index('ix_prediction_user_prediction', 'user_id', 'prediction'),
+        db.Index('ix_prediction_created_at', 'created_at'),
+        db.Index('ix_prediction_prediction', 'prediction'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     
@@ -45,12 +89,125 @@ class Prediction(db.Model):
     # Metadata
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     customer_name = db.Column(db.String(100))
+    model_version = db.Column(db.String(40))  # Registry version (or artifact hash) that scored the row
     
     def calculate_risk_score(self):
         """Calculate risk score from 0-100 based on churn probability"""
         self.risk_score = int(self.probability * 100)
         return self.risk_score
     
+    @staticmethod
+    def risk_scores(probabilities):
+        """Vectorized calculate_risk_score for an array of probabilities"""
+        return (np.asarray(probabilities, dtype=np.float64) * 100).astype(np.int64)
+    
+    @classmethod
+    def bulk_insert(cls, rows, batch_size=1000, return_ids=False):
+        """
+        Insert many predictions without the ORM unit of work
+        
+        Args:
+            rows (list): Dicts of Prediction column values. risk_score is
+                computed from probability when not given.
+            batch_size (int): Rows per executemany INSERT
+            return_ids (bool): Collect the new primary keys
+        
+        Returns:
+            list: Inserted ids in input order when return_ids is set and the
+            database supports RETURNING for executemany, otherwise None
+        """
+        dialect = db.session.get_bind().dialect
+        can_return = return_ids and getattr(dialect, 'insert_executemany_returning_sort_by_parameter_order', False)
+        ids = [] if can_return else None
+        
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            scores = cls.risk_scores([row['probability'] for row in batch]).tolist()
+            now = datetime.utcnow()
+            params = [dict(row, risk_score=row.get('risk_score', score), created_at=row.get('created_at') or now)
+                      for row, score in zip(batch, scores)]
+            
+            if can_return:
+                stmt = insert(cls).returning(cls.id, sort_by_parameter_order=True)
+                ids.extend(db.session.scalars(stmt, params).all())
+            else:
+                db.session.execute(insert(cls), params)
+            
+            update_rollups(db.session.connection(), [
+                (p['user_id'], p['created_at'], p['prediction'], p['probability']) for p in params
+            ])
+        
+        return ids
+    
+    @classmethod
+    def delete_for_user(cls, user_id):
+        """Delete all of a user's predictions together with their rollup rows"""
+        connection = db.session.connection()
+        
+        # Lock rows in the same order as update_rollups (predictions, user, user-daily, daily)
+        # so concurrent writers cannot deadlock
+        cls.query.filter_by(user_id=user_id).delete()
+        connection.execute(delete(UserPredictionRollup).where(UserPredictionRollup.user_id == user_id))
+        
+        # Take the user's share out of the global daily rollup before dropping it
+        user_days = connection.execute(
+            select(UserDailyPredictionRollup.day,
+                   UserDailyPredictionRollup.prediction_count,
+                   UserDailyPredictionRollup.churn_count,
+                   UserDailyPredictionRollup.probability_sum)
+            .where(UserDailyPredictionRollup.user_id == user_id)
+            .order_by(UserDailyPredictionRollup.day)
+            .with_for_update()
+        ).all()
+        _upsert_counters(connection, DailyPredictionRollup, ('day',), {
+            (row.day,): (-row.prediction_count, -row.churn_count, -row.probability_sum) for row in user_days
+        })
+        connection.execute(delete(UserDailyPredictionRollup).where(UserDailyPredictionRollup.user_id == user_id))
+    
+    @classmethod
+    def user_stats(cls, user_id):
+        """Prediction count, churn count and mean probability for a user from the rollup table"""
+        rollup = db.session.get(UserPredictionRollup, user_id)
+        total = rollup.prediction_count if rollup else 0
+        churn = rollup.churn_count if rollup else 0
+        
+        return {
+            'total_predictions': total,
+            'churn_predictions': churn,
+            'no_churn_predictions': total - churn,
+            'avg_probability': rollup.probability_sum / total if total > 0 else 0.0
+        }
+    
+    @classmethod
+    def count_for_user(cls, user_id, prediction=None, start_day=None, end_day=None):
+        """
+        Count a user's predictions from the rollup tables
+        
+        Args:
+            prediction (int): Only count churn (1) or no-churn (0) predictions
+            start_day (date): First day included
+            end_day (date): First day excluded
+        """
+        if start_day is None and end_day is None:
+            stats = cls.user_stats(user_id)
+            total, churn = stats['total_predictions'], stats['churn_predictions']
+        else:
+            query = db.session.query(
+                func.coalesce(func.sum(UserDailyPredictionRollup.prediction_count), 0),
+                func.coalesce(func.sum(UserDailyPredictionRollup.churn_count), 0)
+            ).filter(UserDailyPredictionRollup.user_id == user_id)
+            if start_day is not None:
+                query = query.filter(UserDailyPredictionRollup.day >= start_day)
+            if end_day is not None:
+                query = query.filter(UserDailyPredictionRollup.day < end_day)
+            total, churn = query.one()
+        
+        if prediction == 1:
+            return churn
+        if prediction == 0:
+            return total - churn
+        return total
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -63,9 +220,227 @@ class Prediction(db.Model):
             'prediction': self.prediction,
             'probability': self.probability,
             'risk_score': self.risk_score,
+            'model_version': self.model_version,
             'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S')
         }
 
+class UserPredictionRollup(db.Model):
+    """Running prediction totals per user"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    prediction_count = db.Column(db.Integer, nullable=False, default=0)
+    churn_count = db.Column(db.Integer, nullable=False, default=0)
+    probability_sum = db.Column(db.Float, nullable=False, default=0.0)
+
+class UserDailyPredictionRollup(db.Model):
+    """Prediction totals per user per day (monthly figures are summed from these)"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    prediction_count = db.Column(db.Integer, nullable=False, default=0)
+    churn_count = db.Column(db.Integer, nullable=False, default=0)
+    probability_sum = db.Column(db.Float, nullable=False, default=0.0)
+
+class DailyPredictionRollup(db.Model):
+    """Prediction totals across all users per day"""
+    day = db.Column(db.Date, primary_key=True)
+    prediction_count = db.Column(db.Integer, nullable=False, default=0)
+    churn_count = db.Column(db.Integer, nullable=False, default=0)
+    probability_sum = db.Column(db.Float, nullable=False, default=0.0)
+
+ROLLUP_COUNTERS = ('prediction_count', 'churn_count', 'probability_sum')
+
+def _upsert_counters(connection, model, key_columns, deltas):
+    """
+    Add (count, churn, probability) deltas to rollup rows, creating missing rows
+    
+    Rows are written in key order, so two transactions touching the same rows
+    lock them in the same order instead of deadlocking.
+    """
+    if not deltas:
+        return
+    
+    table = model.__table__
+    params = [dict(zip(key_columns, key), **dict(zip(ROLLUP_COUNTERS, values)))
+              for key, values in sorted(deltas.items())]
+    
+    dialect_insert = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}.get(connection.dialect.name)
+    if dialect_insert is not None:
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key_columns),
+            set_={name: table.c[name] + stmt.excluded[name] for name in ROLLUP_COUNTERS}
+        )
+        connection.execute(stmt, params)
+        return
+    
+    # Generic fallback: update in place, insert when the row does not exist yet
+    for row in params:
+        condition = [table.c[name] == row[name] for name in key_columns]
+        result = connection.execute(
+            update(table).where(*condition)
+            .values({name: table.c[name] + row[name] for name in ROLLUP_COUNTERS})
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(table).values(row))
+
+def update_rollups(connection, rows, sign=1):
+    """
+    Apply predictions to the rollup tables
+    
+    Every writer updates the tables in this order (user, user-daily, daily)
+    to keep lock acquisition consistent on PostgreSQL.
+    
+    Args:
+        connection: Connection of the transaction writing the predictions
+        rows: Iterable of (user_id, created_at, prediction, probability)
+        sign (int): 1 for inserted predictions, -1 for deleted ones
+    """
+    per_user = defaultdict(lambda: [0, 0, 0.0])
+    per_user_day = defaultdict(lambda: [0, 0, 0.0])
+    per_day = defaultdict(lambda: [0, 0, 0.0])
+    
+    for user_id, created_at, prediction, probability in rows:
+        day = (created_at or datetime.utcnow()).date()
+        for totals in (per_user[(user_id,)], per_user_day[(user_id, day)], per_day[(day,)]):
+            totals[0] += sign
+            totals[1] += sign if prediction == 1 else 0
+            totals[2] += sign * probability
+    
+    _upsert_counters(connection, UserPredictionRollup, ('user_id',), per_user)
+    _upsert_counters(connection, UserDailyPredictionRollup, ('user_id', 'day'), per_user_day)
+    _upsert_counters(connection, DailyPredictionRollup, ('day',), per_day)
+
+def rebuild_rollups():
+    """Recompute all rollup tables from the Prediction table"""
+    churn = func.sum(case((Prediction.prediction == 1, 1), else_=0))
+    day = func.date(Prediction.created_at)
+    
+    for model in (UserPredictionRollup, UserDailyPredictionRollup, DailyPredictionRollup):
+        db.session.execute(delete(model))
+    
+    db.session.execute(insert(UserPredictionRollup).from_select(
+        ['user_id', *ROLLUP_COUNTERS],
+        select(Prediction.user_id, func.count(Prediction.id), churn, func.sum(Prediction.probability))
+        .group_by(Prediction.user_id)
+    ))
+    db.session.execute(insert(UserDailyPredictionRollup).from_select(
+        ['user_id', 'day', *ROLLUP_COUNTERS],
+        select(Prediction.user_id, day, func.count(Prediction.id), churn, func.sum(Prediction.probability))
+        .group_by(Prediction.user_id, day)
+    ))
+    db.session.execute(insert(DailyPredictionRollup).from_select(
+        ['day', *ROLLUP_COUNTERS],
+        select(day, func.count(Prediction.id), churn, func.sum(Prediction.probability))
+        .group_by(day)
+    ))
+    db.session.commit()
+
+@event.listens_for(Prediction, 'after_insert')
+def _rollup_after_insert(mapper, connection, target):
+    update_rollups(connection, [(target.user_id, target.created_at, target.prediction, target.probability)])
+
+@event.listens_for(Prediction, 'after_delete')
+def _rollup_after_delete(mapper, connection, target):
+    update_rollups(connection, [(target.user_id, target.created_at, target.prediction, target.probability)], sign=-1)
+
+class BulkJob(db.Model):
+    """Background bulk CSV prediction job"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    filename = db.Column(db.String(255))
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, completed, failed
+    
+    # Progress
+    rows_processed = db.Column(db.Integer, nullable=False, default=0)
+    success_count = db.Column(db.Integer, nullable=False, default=0)
+    error_count = db.Column(db.Integer, nullable=False, default=0)
+    error_message = db.Column(db.Text)
+    
+    # Metadata
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)  # Refreshed by the worker after every chunk
+    attempts = db.Column(db.Integer, default=0)  # Runs started, including resumes after a worker exited
+    
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
+    
+    def is_stale(self, max_age):
+        """Queued or running but not touched by a worker for max_age seconds (the worker exited)"""
+        if self.is_finished():
+            return False
+        last_seen = self.heartbeat_at or self.created_at
+        return last_seen is not None and (datetime.utcnow() - last_seen).total_seconds() > max_age
+    
+    def throughput(self):
+        """Rows processed per second since the job started"""
+        if not self.started_at:
+            return 0.0
+        elapsed = ((self.finished_at or datetime.utcnow()) - self.started_at).total_seconds()
+        return self.rows_processed / elapsed if elapsed > 0 else 0.0
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'status': self.status,
+            'rows_processed': self.rows_processed,
+            'success_count': self.success_count,
+            'error_count': self.error_count,
+            'rows_per_second': round(self.throughput(), 1),
+            'error_message': self.error_message,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'started_at': self.started_at.strftime('%Y-%m-%d %H:%M:%S') if self.started_at else None,
+            'finished_at': self.finished_at.strftime('%Y-%m-%d %H:%M:%S') if self.finished_at else None,
+            'heartbeat_at': self.heartbeat_at.strftime('%Y-%m-%d %H:%M:%S') if self.heartbeat_at else None,
+            'attempts': self.attempts or 0,
+            'stale': self.is_stale(Config.BULK_JOB_STALE_SECONDS)
+        }
+
+class EmailOutbox(db.Model):
+    """Email queued by a request and delivered by the background sender"""
+    __table_args__ = (
+        db.Index('ix_email_outbox_due', 'status', 'next_attempt_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    recipient = db.Column(db.String(255), nullable=False)
+    sender = db.Column(db.String(255), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    html_body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, sending, sent, failed
+    
+    # Optional file attachment, stored as data or as the JSON parameters of a
+    # report the sender renders when it delivers (e.g. a large bulk report's .csv.gz)
+    attachment_name = db.Column(db.String(255))
+    attachment_type = db.Column(db.String(100))
+    attachment_data = db.Column(db.LargeBinary)
+    attachment_query = db.Column(db.Text)
+    
+    # Delivery attempts
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    claimed_by = db.Column(db.String(32))
+    
+    # Metadata
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'recipient': self.recipient,
+            'subject': self.subject,
+            'status': self.status,
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'next_attempt_at': self.next_attempt_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'sent_at': self.sent_at.strftime('%Y-%m-%d %H:%M:%S') if self.sent_at else None
+        }
+
 class ModelMetrics(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     accuracy = db.Column(db.Float, nullable=False)
@@ -76,4 +451,41 @@ class ModelMetrics(db.Model):
     
     @classmethod
     def get_latest(cls):
-        return cls.query.order_by(cls.updated_at.desc()).first()
\ No newline at end of file
+        return cls.query.order_by(cls.updated_at.desc()).first()
+
+def ensure_indexes():
+    """
+    Create model indexes missing from an existing database
+    
+    db.create_all() only creates indexes together with new tables, so databases
+    created before an index was declared are upgraded here.
+    """
+    engine = db.engine
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+def ensure_columns():
+    """
+    Add nullable model columns missing from an existing database
+    
+    db.create_all() never alters existing tables, so nullable columns declared
+    after a table was created (e.g. Prediction.model_version) are added here.
+    """
+    engine = db.engine
+    inspector = inspect(engine)
+    preparer = engine.dialect.identifier_preparer
+    
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable or column.primary_key:
+                continue
+            with engine.begin() as connection:
+                connection.exec_driver_sql(
+                    f'ALTER TABLE {preparer.format_table(table)} '
+                    f'ADD COLUMN {preparer.format_column(column)} {column.type.compile(dialect=engine.dialect)}'
+                )
@@ -0,0 +1,280 @@
+"""
+Email outbox with background delivery
+
+Requests store their email in the EmailOutbox table and return at once. A
+sender thread in each worker process claims due messages in batches, sends
+them over one SMTP connection that stays open while there is work, and
+retries failures with exponential backoff; every attempt is recorded on the
+row, so delivery status survives restarts and is shared by all workers.
+
+Large attachments are not stored: the row keeps the parameters of the
+report and the sender renders it at delivery time, off the request.
+
+Once a message is sent its body and attachment are dropped, and sent rows
+are deleted after OUTBOX_RETENTION_DAYS, so the table does not keep every
+report ever mailed.
+
+With an in-memory SQLite database there is no sender thread (it would share
+the requests' only connection); queue_email then delivers due messages in
+the request itself.
+"""
+
+import json
+import logging
+import os
+import smtplib
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from datetime import datetime, timedelta
+
+from flask import current_app
+from flask_mail import Message
+
+from config import Config
+from models import db, EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+# A claim that is never finished (the worker died mid-send) expires after this
+CLAIM_TIMEOUT_SECONDS = 300
+
+# How often each sender thread deletes expired sent messages
+PURGE_INTERVAL_SECONDS = 3600
+
+def queue_email(recipient, subject, html_body, user_id=None, sender=None, attachment=None,
+                report_attachment=None):
+    """
+    Store an email for background delivery and wake this process's sender
+
+    Args:
+        attachment (tuple): Optional (filename, content_type, data bytes)
+        report_attachment (tuple): Optional (filename, content_type, report parameters dict),
+            rendered by the sender with email_utils.render_report_attachment
+
+    Returns:
+        EmailOutbox: The queued message
+    """
+    message = EmailOutbox(user_id=user_id, recipient=recipient, subject=subject, html_body=html_body,
+                          sender=sender or current_app.config['MAIL_DEFAULT_SENDER'])
+    if attachment:
+        message.attachment_name, message.attachment_type, message.attachment_data = attachment
+    if report_attachment:
+        message.attachment_name, message.attachment_type, parameters = report_attachment
+        message.attachment_query = json.dumps(parameters)
+    db.session.add(message)
+    db.session.commit()
+
+    if Config.IN_MEMORY_DATABASE:
+        send_now()
+    else:
+        outbox_sender.start(current_app._get_current_object())
+        outbox_sender.wake()
+    return message
+
+def send_now():
+    """Deliver due messages in the calling request (no background thread may use the database)"""
+    sender = OutboxSender()
+    try:
+        sender.send_due()
+    finally:
+        sender.close()
+
+def retry_delay(attempts):
+    """Seconds to wait before the next attempt after `attempts` failures"""
+    return Config.OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+
+def claim_due_messages(limit):
+    """
+    Mark up to limit due messages as being sent by this process
+
+    The conditional update makes the claim exclusive between workers.
+
+    Returns:
+        list: Claimed EmailOutbox rows, oldest first
+    """
+    now = datetime.utcnow()
+    due = EmailOutbox.status.in_(('pending', 'sending')) & (EmailOutbox.next_attempt_at <= now)
+
+    ids = [message_id for (message_id,) in db.session.query(EmailOutbox.id).filter(due)
+           .order_by(EmailOutbox.next_attempt_at).limit(limit)]
+    if not ids:
+        return []
+
+    token = uuid.uuid4().hex
+    EmailOutbox.query.filter(EmailOutbox.id.in_(ids), due).update({
+        'status': 'sending',
+        'claimed_by': token,
+        'next_attempt_at': now + timedelta(seconds=CLAIM_TIMEOUT_SECONDS)
+    }, synchronize_session=False)
+    db.session.commit()
+
+    return EmailOutbox.query.filter_by(claimed_by=token).order_by(EmailOutbox.id).all()
+
+def build_message(message):
+    """Turn an outbox row into a Flask-Mail Message"""
+    mail_message = Message(subject=message.subject, recipients=[message.recipient],
+                           html=message.html_body, sender=message.sender)
+    if message.attachment_name:
+        data = message.attachment_data
+        if message.attachment_query:
+            from email_utils import render_report_attachment
+            data = render_report_attachment(json.loads(message.attachment_query))
+        mail_message.attach(message.attachment_name, message.attachment_type, data)
+    return mail_message
+
+def record_sent(message):
+    message.status = 'sent'
+    message.attempts += 1
+    message.sent_at = datetime.utcnow()
+    message.last_error = None
+    # The content is never sent again, keep only the envelope for the delivery log
+    message.html_body = ''
+    message.attachment_data = None
+    message.attachment_query = None
+
+def purge_sent_messages():
+    """Delete messages sent more than OUTBOX_RETENTION_DAYS ago; returns the number deleted"""
+    if Config.OUTBOX_RETENTION_DAYS <= 0:
+        return 0
+    cutoff = datetime.utcnow() - timedelta(days=Config.OUTBOX_RETENTION_DAYS)
+    deleted = EmailOutbox.query.filter(EmailOutbox.status == 'sent', EmailOutbox.sent_at < cutoff)\
+        .delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+def record_failure(message, error):
+    """Schedule a retry with exponential backoff, or give up after OUTBOX_MAX_ATTEMPTS"""
+    message.attempts += 1
+    message.last_error = error
+    if message.attempts >= Config.OUTBOX_MAX_ATTEMPTS:
+        message.status = 'failed'
+    else:
+        message.status = 'pending'
+        message.next_attempt_at = datetime.utcnow() + timedelta(seconds=retry_delay(message.attempts))
+
+class OutboxSender:
+    """Delivers queued emails over a reused SMTP connection"""
+
+    def __init__(self):
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._connection = None
+        self._connection_stack = None
+        self._last_used = 0.0
+        self._last_purge = None
+
+    def start(self, app):
+        """Start the sender thread once per process (threads do not survive a fork)"""
+        if Config.OUTBOX_POLL_INTERVAL <= 0 or Config.IN_MEMORY_DATABASE or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._wake = threading.Event()
+            self._connection = None
+            threading.Thread(target=self._run, args=(app,), name='email-outbox', daemon=True).start()
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self, app):
+        while True:
+            # Wake up in time to close an idle SMTP connection
+            timeout = Config.OUTBOX_POLL_INTERVAL
+            if self._connection is not None:
+                timeout = min(timeout, Config.OUTBOX_SMTP_IDLE_SECONDS)
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+            try:
+                with app.app_context():
+                    self.send_due()
+                    self._purge_expired()
+            except Exception as e:
+                logger.error(f"Email outbox pass failed: {str(e)}")
+
+            if self._connection is not None and time.monotonic() - self._last_used >= Config.OUTBOX_SMTP_IDLE_SECONDS:
+                self._disconnect()
+
+    def send_due(self):
+        """
+        Deliver due messages batch by batch until none are left
+
+        Returns:
+            tuple: (sent, failed) counts
+        """
+        sent = failed = 0
+        while True:
+            batch = claim_due_messages(Config.OUTBOX_BATCH_SIZE)
+            for message in batch:
+                try:
+                    self._connect().send(build_message(message))
+                except Exception as e:
+                    # The connection may be unusable after an error, reconnect for the next message
+                    self._disconnect()
+                    record_failure(message, str(e))
+                    failed += 1
+                    logger.warning(f"Email {message.id} to {message.recipient} failed "
+                                   f"(attempt {message.attempts}): {str(e)}")
+                else:
+                    record_sent(message)
+                    sent += 1
+                    self._last_used = time.monotonic()
+                # Record each outcome at once so a crash does not resend delivered mail
+                db.session.commit()
+
+            if len(batch) < Config.OUTBOX_BATCH_SIZE:
+                return sent, failed
+
+    def _purge_expired(self):
+        """Delete expired sent messages at most once per PURGE_INTERVAL_SECONDS"""
+        if self._last_purge is not None and time.monotonic() - self._last_purge < PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = time.monotonic()
+        deleted = purge_sent_messages()
+        if deleted:
+            logger.info(f"Deleted {deleted} sent emails older than {Config.OUTBOX_RETENTION_DAYS:g} days")
+
+    def _connect(self):
+        if self._connection is None:
+            from app_flask import mail
+            self._connection_stack = ExitStack()
+            self._connection = self._connection_stack.enter_context(mail.connect())
+            self._last_used = time.monotonic()
+        return self._connection
+
+    def _disconnect(self):
+        if self._connection is None:
+            return
+        try:
+            self._connection_stack.close()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._connection = None
+        self._connection_stack = None
+
+    def close(self):
+        """Close the SMTP connection (used by one-off senders such as the CLI command)"""
+        self._disconnect()
+
+def outbox_stats():
+    """Message counts per status and the most recent failures"""
+    counts = dict(db.session.query(EmailOutbox.status, db.func.count(EmailOutbox.id))
+                  .group_by(EmailOutbox.status).all())
+    recent_failures = EmailOutbox.query.filter(EmailOutbox.last_error.isnot(None))\
+        .order_by(EmailOutbox.id.desc()).limit(10).all()
+    return {
+        'counts': {status: counts.get(status, 0) for status in ('pending', 'sending', 'sent', 'failed')},
+        'recent_failures': [message.to_dict() for message in recent_failures]
+    }
+
+def delete_user_emails(user_id):
+    """Remove a user's queued and delivered emails (used when accounts are deleted)"""
+    EmailOutbox.query.filter_by(user_id=user_id).delete()
+
+# Global sender instance
+outbox_sender = OutboxSender()
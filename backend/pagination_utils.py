@@ -0,0 +1,97 @@
+"""
+Keyset (seek) pagination for prediction lists
+
+Pages are addressed by opaque cursors holding the (created_at, id) of the
+row at the page boundary, so every page is an index range scan of the same
+cost instead of an OFFSET that grows with the page number.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_, desc
+
+from models import Prediction
+
+def encode_cursor(prediction, direction):
+    """Build an opaque token pointing before ('prev') or after ('next') a prediction"""
+    payload = {
+        't': prediction.created_at.isoformat(),
+        'i': prediction.id,
+        'd': direction
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(token):
+    """
+    Decode a cursor token
+
+    Returns:
+        tuple: (created_at, id, direction)
+
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw)
+        direction = payload['d']
+        if direction not in ('next', 'prev'):
+            raise ValueError(direction)
+        return datetime.fromisoformat(payload['t']), int(payload['i']), direction
+    except Exception as e:
+        raise ValueError(f'Invalid page cursor: {token}') from e
+
+class KeysetPage:
+    """One page of predictions, newest first"""
+
+    def __init__(self, items, has_prev, has_next, total=None):
+        self.items = items
+        self.has_prev = has_prev
+        self.has_next = has_next
+        self.total = total
+
+    @property
+    def prev_cursor(self):
+        return encode_cursor(self.items[0], 'prev') if self.has_prev and self.items else None
+
+    @property
+    def next_cursor(self):
+        return encode_cursor(self.items[-1], 'next') if self.has_next and self.items else None
+
+def keyset_paginate(query, per_page, cursor=None, total=None):
+    """
+    Fetch one page of a Prediction query ordered by (created_at, id) descending
+
+    Args:
+        query: Filtered Prediction query without ORDER BY
+        per_page (int): Page size
+        cursor (str): Token from a previous page, None for the first page
+        total (int): Optional precomputed total to attach to the page
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if cursor is None:
+        rows = query.order_by(desc(Prediction.created_at), desc(Prediction.id)).limit(per_page + 1).all()
+        return KeysetPage(rows[:per_page], has_prev=False, has_next=len(rows) > per_page, total=total)
+
+    created_at, prediction_id, direction = decode_cursor(cursor)
+
+    if direction == 'next':
+        # Rows strictly older than the boundary row
+        rows = query.filter(or_(
+            Prediction.created_at < created_at,
+            and_(Prediction.created_at == created_at, Prediction.id < prediction_id)
+        )).order_by(desc(Prediction.created_at), desc(Prediction.id)).limit(per_page + 1).all()
+        return KeysetPage(rows[:per_page], has_prev=True, has_next=len(rows) > per_page, total=total)
+
+    # Rows strictly newer than the boundary row, fetched oldest first then flipped
+    rows = query.filter(or_(
+        Prediction.created_at > created_at,
+        and_(Prediction.created_at == created_at, Prediction.id > prediction_id)
+    )).order_by(Prediction.created_at, Prediction.id).limit(per_page + 1).all()
+    items = list(reversed(rows[:per_page]))
+    return KeysetPage(items, has_prev=len(rows) > per_page, has_next=True, total=total)
@@ -0,0 +1,250 @@
+"""
+Sampling profiler for production requests
+
+With PROFILING_ENABLED on, a fraction of requests (PROFILE_SAMPLE_RATE) and
+admin requests carrying the PROFILE_HEADER header are profiled: a background
+OS thread reads the serving thread's stack every PROFILE_INTERVAL_MS. No
+tracing hook is installed, so unprofiled requests run at full speed and
+profiled ones are barely slowed down.
+
+Profiles are written to PROFILE_DIR as folded stacks, one
+"outer;...;inner count" line per distinct stack (the input of flamegraph.pl
+and speedscope): recent/<id>.folded plus a JSON summary for every profile,
+and endpoints/<endpoint>.folded, which accumulates all profiles of an
+endpoint and is compacted once it grows past PROFILE_ENDPOINT_MAX_KB.
+
+Under gevent all requests of a worker share one OS thread, so a profile
+follows its request's greenlet instead: its saved stack while it waits, the
+thread's stack while it runs.
+"""
+
+import json
+import logging
+import os
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import g, request
+from flask_login import current_user
+
+from config import Config
+from concurrency_utils import current_greenlet, native_sleep, native_thread_id, start_native_thread
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Frame label per code object, so each sample only walks the stack
+_labels = {}
+
+def frame_label(frame):
+    """'function (file:first line)' for code, the template name for Jinja templates"""
+    code = frame.f_code
+    label = _labels.get(code)
+    if label is None:
+        template = frame.f_globals.get('__jinja_template__')
+        filename = code.co_filename
+        if template is not None:
+            label = f"{template.name} (template)"
+        else:
+            if filename.startswith(ROOT_DIR):
+                filename = os.path.relpath(filename, ROOT_DIR)
+            elif 'site-packages' in filename:
+                filename = filename.split('site-packages' + os.sep, 1)[-1]
+            else:
+                filename = os.path.basename(filename)
+            label = f"{code.co_name} ({filename}:{code.co_firstlineno})"
+        _labels[code] = label
+    return label
+
+def fold_stack(frame):
+    """The stack ending at frame as one folded line, outermost frame first"""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+class StackSampler:
+    """Samples the stacks of the threads (or greenlets) serving profiled requests"""
+
+    def __init__(self):
+        self._targets = {}
+        self._pid = None
+
+    def start(self, thread_id, greenlet=None):
+        """
+        Start sampling a thread, or one greenlet on it under gevent
+
+        Returns:
+            tuple: (key to pass to stop(), Counter the folded stacks are added to)
+        """
+        if self._pid != os.getpid():
+            # Threads do not survive a fork, start one sampler per worker
+            self._pid = os.getpid()
+            self._targets = {}
+            start_native_thread(self._run)
+        key = greenlet if greenlet is not None else thread_id
+        counts = Counter()
+        self._targets[key] = (thread_id, greenlet, counts)
+        return key, counts
+
+    def stop(self, key):
+        self._targets.pop(key, None)
+
+    def _run(self):
+        while True:
+            native_sleep(Config.PROFILE_INTERVAL_MS / 1000)
+            if not self._targets:
+                continue
+            frames = sys._current_frames()
+            for thread_id, greenlet, counts in list(self._targets.values()):
+                # A waiting greenlet keeps its stack in gr_frame; a running one (None) is its thread's stack
+                frame = greenlet.gr_frame if greenlet is not None else None
+                if frame is None:
+                    frame = frames.get(thread_id)
+                if frame is not None:
+                    counts[fold_stack(frame)] += 1
+
+def _should_profile():
+    if request.endpoint in (None, 'static'):
+        return False
+    if Config.PROFILE_HEADER and request.headers.get(Config.PROFILE_HEADER):
+        if current_user.is_authenticated and current_user.is_admin():
+            return True
+    return random.random() < Config.PROFILE_SAMPLE_RATE
+
+def _start_profile():
+    if _should_profile():
+        g.profile_started = datetime.utcnow()
+        g.profile_clock = time.perf_counter()
+        g.profile_key, g.profile_counts = sampler.start(native_thread_id(), current_greenlet())
+
+def _finish_profile(exc):
+    # Teardown also runs for requests that raised, so sampling always stops
+    if 'profile_counts' not in g:
+        return
+    sampler.stop(g.profile_key)
+    duration = time.perf_counter() - g.profile_clock
+    if g.profile_counts:
+        try:
+            save_profile(request.endpoint, request.method, request.full_path.rstrip('?'), g.profile_started,
+                         duration, Counter(g.profile_counts))
+        except OSError as e:
+            logger.warning(f"Could not save profile: {str(e)}")
+
+def save_profile(endpoint, method, path, started, duration, counts):
+    """Write one request's folded stacks and summary, and add them to its endpoint's aggregate"""
+    recent_dir = os.path.join(Config.PROFILE_DIR, 'recent')
+    endpoint_dir = os.path.join(Config.PROFILE_DIR, 'endpoints')
+    os.makedirs(recent_dir, exist_ok=True)
+    os.makedirs(endpoint_dir, exist_ok=True)
+
+    profile_id = f"{started:%Y%m%d-%H%M%S-%f}-{os.getpid()}-{endpoint}"
+    folded = ''.join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+    # Functions the samples were in (self time), for the admin listing
+    hot_frames = Counter()
+    for stack, count in counts.items():
+        hot_frames[stack.rsplit(';', 1)[-1]] += count
+
+    with open(os.path.join(recent_dir, f'{profile_id}.folded'), 'w') as f:
+        f.write(folded)
+    with open(os.path.join(recent_dir, f'{profile_id}.json'), 'w') as f:
+        json.dump({
+            'id': profile_id,
+            'endpoint': endpoint,
+            'method': method,
+            'path': path,
+            'created_at': started.isoformat(),
+            'duration_ms': round(duration * 1000, 1),
+            'samples': sum(counts.values()),
+            'hot_frames': hot_frames.most_common(3)
+        }, f)
+    add_to_endpoint_profile(os.path.join(endpoint_dir, f'{endpoint}.folded'), folded)
+
+    prune_profiles(recent_dir)
+
+def add_to_endpoint_profile(path, folded):
+    """
+    Append folded stacks to an endpoint's aggregate, compacting it past PROFILE_ENDPOINT_MAX_KB
+
+    Compaction merges repeated stacks into one line each and keeps the most
+    sampled ones within half the limit, so it runs again only after many
+    more profiles. Samples another worker appends meanwhile may be lost.
+    """
+    with open(path, 'a') as f:
+        f.write(folded)
+        size = f.tell()
+    max_bytes = Config.PROFILE_ENDPOINT_MAX_KB * 1024
+    if size <= max_bytes:
+        return
+
+    counts = Counter()
+    with open(path) as f:
+        for line in f:
+            stack, _, count = line.rstrip('\n').rpartition(' ')
+            if stack and count.isdigit():
+                counts[stack] += int(count)
+
+    lines = []
+    kept_bytes = 0
+    for stack, count in counts.most_common():
+        line = f"{stack} {count}\n"
+        kept_bytes += len(line.encode('utf-8'))
+        if kept_bytes > max_bytes / 2:
+            break
+        lines.append(line)
+
+    partial_path = f'{path}.{os.getpid()}.partial'
+    with open(partial_path, 'w') as f:
+        f.writelines(lines)
+    os.replace(partial_path, path)
+
+def prune_profiles(recent_dir):
+    """Keep the PROFILE_KEEP most recent profiles"""
+    summaries = sorted(name for name in os.listdir(recent_dir) if name.endswith('.json'))
+    for name in summaries[:-Config.PROFILE_KEEP]:
+        for path in (name, name[:-len('.json')] + '.folded'):
+            try:
+                os.remove(os.path.join(recent_dir, path))
+            except FileNotFoundError:
+                # Another worker pruned it first
+                pass
+
+def recent_profiles(limit=50):
+    """The slowest of the kept profiles, slowest first"""
+    recent_dir = os.path.join(Config.PROFILE_DIR, 'recent')
+    if not os.path.isdir(recent_dir):
+        return []
+    profiles = []
+    for name in os.listdir(recent_dir):
+        if name.endswith('.json'):
+            try:
+                with open(os.path.join(recent_dir, name)) as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    profiles.sort(key=lambda profile: profile['duration_ms'], reverse=True)
+    return profiles[:limit]
+
+def endpoint_profiles():
+    """(endpoint, size in KB) of the aggregated per-endpoint folded files"""
+    endpoint_dir = os.path.join(Config.PROFILE_DIR, 'endpoints')
+    if not os.path.isdir(endpoint_dir):
+        return []
+    return [(name[:-len('.folded')], os.path.getsize(os.path.join(endpoint_dir, name)) / 1024)
+            for name in sorted(os.listdir(endpoint_dir)) if name.endswith('.folded')]
+
+def init_profiling(app):
+    """Profile sampled requests when PROFILING_ENABLED is on"""
+    if not Config.PROFILING_ENABLED:
+        return
+    app.before_request(_start_profile)
+    app.teardown_request(_finish_profile)
+
+# Global sampler instance
+sampler = StackSampler()
@@ -0,0 +1,120 @@
+"""
+Per-request SQL statement tracking and N+1 detection
+
+SQLAlchemy engine events count every statement a request runs and the time
+spent in them. Requests over SQL_QUERY_WARN_COUNT statements or
+SQL_QUERY_WARN_MS are logged, and a statement repeated SQL_REPEAT_THRESHOLD
+times in one request (typically a lazy relationship loaded per row) is logged
+with the application frames that issued it.
+
+Routes declare how many statements they need with @query_budget(n). With
+SQL_QUERY_BUDGET_ENFORCE on (for checks and tests) a request over its budget
+raises QueryBudgetExceeded instead of only logging.
+"""
+
+import logging
+import os
+import sys
+import time
+import traceback
+from collections import Counter
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Frames from these directories are the application's own code and templates
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class QueryBudgetExceeded(AssertionError):
+    """A request ran more SQL statements than its route's budget"""
+
+class RequestQueries:
+    """Statements run while serving one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+        self.repeated = {}
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        self.statements[statement] += 1
+        # Capture the call site once, when the statement first looks like an N+1
+        if self.statements[statement] == Config.SQL_REPEAT_THRESHOLD:
+            self.repeated[statement] = app_stack()
+
+def app_stack(limit=8):
+    """The innermost application frames of the current stack (templates at their own lines), formatted"""
+    frames = []
+    frame = sys._getframe(1)
+    while frame is not None and len(frames) < limit:
+        filename = frame.f_code.co_filename
+        if filename.startswith(ROOT_DIR) and 'site-packages' not in filename and filename != __file__:
+            lineno = frame.f_lineno
+            template = frame.f_globals.get('__jinja_template__')
+            if template is not None:
+                lineno = template.get_corresponding_lineno(lineno)
+            frames.append(traceback.FrameSummary(filename, lineno, frame.f_code.co_name))
+        frame = frame.f_back
+    return ''.join(traceback.format_list(reversed(frames)))
+
+def current_queries():
+    """The RequestQueries of the request being served, or None outside requests"""
+    if not has_request_context():
+        return None
+    if 'sql_queries' not in g:
+        g.sql_queries = RequestQueries()
+    return g.sql_queries
+
+def query_budget(max_queries):
+    """Declare the most SQL statements a route may run per request"""
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_query_start', None)
+    queries = current_queries() if started is not None else None
+    if queries is not None:
+        queries.record(statement, time.perf_counter() - started)
+
+def _check_request_queries(response):
+    queries = g.get('sql_queries')
+    if queries is None:
+        return response
+
+    endpoint = request.endpoint or 'unmatched'
+    for statement, stack in queries.repeated.items():
+        logger.warning("Possible N+1 in %s: statement ran %d times\n  %s\n%s", endpoint,
+                       queries.statements[statement], ' '.join(statement.split())[:300], stack)
+
+    view = current_app.view_functions.get(request.endpoint)
+    budget = getattr(view, 'query_budget', None)
+    if queries.count > (budget if budget is not None else Config.SQL_QUERY_WARN_COUNT) \
+            or queries.seconds * 1000 > Config.SQL_QUERY_WARN_MS:
+        logger.warning("%s %s ran %d SQL statements in %.1f ms (budget %s)", request.method, request.path,
+                       queries.count, queries.seconds * 1000, budget if budget is not None else '-')
+
+    if Config.SQL_QUERY_BUDGET_ENFORCE and budget is not None and queries.count > budget:
+        raise QueryBudgetExceeded(f"{endpoint} ran {queries.count} SQL statements, budget is {budget}")
+    return response
+
+def init_query_tracking(app):
+    """Count the SQL statements of every request and check them against the route budgets"""
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+    app.after_request(_check_request_queries)
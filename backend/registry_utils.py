@@ -0,0 +1,135 @@
+"""
+Versioned model registry
+
+Trained artifacts are stored per version under Config.MODEL_REGISTRY_DIR:
+
+    manifest.json                 {"active": "<version>", "versions": [...]}
+    <version>/churn_model.npz     safe artifact served without sklearn
+    <version>/churn_model.pkl     sklearn originals, kept for non-linear models
+    <version>/scaler.pkl
+
+Version directories are written once and never modified; the manifest is
+replaced atomically, so a running worker always sees either the old or the
+new active version. Without a manifest the predictor falls back to
+Config.MODEL_ARTIFACT_PATH or Config.MODEL_PATH / Config.SCALER_PATH.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+from datetime import datetime
+
+from config import Config
+from artifact_utils import ARTIFACT_FORMAT_VERSION, export_artifact
+
+MANIFEST_NAME = 'manifest.json'
+ARTIFACT_FILENAME = 'churn_model.npz'
+MODEL_FILENAME = 'churn_model.pkl'
+SCALER_FILENAME = 'scaler.pkl'
+
+def manifest_path(registry_dir=None):
+    return os.path.join(registry_dir or Config.MODEL_REGISTRY_DIR, MANIFEST_NAME)
+
+def artifact_paths(version, registry_dir=None):
+    """Return (artifact_path, model_path, scaler_path) of a registered version"""
+    version_dir = os.path.join(registry_dir or Config.MODEL_REGISTRY_DIR, version)
+    return tuple(os.path.join(version_dir, name) for name in (ARTIFACT_FILENAME, MODEL_FILENAME, SCALER_FILENAME))
+
+def load_manifest(registry_dir=None):
+    """Return the manifest dict, or None when no registry exists yet"""
+    try:
+        with open(manifest_path(registry_dir), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def _write_manifest(manifest, registry_dir=None):
+    """Replace the manifest atomically"""
+    path = manifest_path(registry_dir)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.manifest-')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+def active_artifacts(registry_dir=None):
+    """
+    Return (version, artifact_path, model_path, scaler_path) of the active registry version,
+    or None when no version is active
+    """
+    manifest = load_manifest(registry_dir)
+    if not manifest or not manifest.get('active'):
+        return None
+    version = manifest['active']
+    return (version, *artifact_paths(version, registry_dir))
+
+def register_model(model, scaler, metrics=None, activate=True, registry_dir=None):
+    """
+    Store a trained model and scaler as a new registry version
+
+    Args:
+        model: Fitted sklearn estimator
+        scaler: Fitted scaler applied before the estimator
+        metrics (dict): Optional training metrics kept in the manifest
+        activate (bool): Make the new version the active one
+
+    Returns:
+        str: The new version name
+    """
+    registry_dir = registry_dir or Config.MODEL_REGISTRY_DIR
+    os.makedirs(registry_dir, exist_ok=True)
+
+    model_bytes = pickle.dumps(model)
+    scaler_bytes = pickle.dumps(scaler)
+    digest = hashlib.sha256(model_bytes + scaler_bytes).hexdigest()
+    version = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}-{digest[:8]}"
+
+    # Write into a scratch directory and rename it, so a version directory is never partial
+    staging_dir = tempfile.mkdtemp(dir=registry_dir, prefix='.staging-')
+    try:
+        with open(os.path.join(staging_dir, MODEL_FILENAME), 'wb') as f:
+            f.write(model_bytes)
+        with open(os.path.join(staging_dir, SCALER_FILENAME), 'wb') as f:
+            f.write(scaler_bytes)
+        try:
+            export_artifact(scaler, model, os.path.join(staging_dir, ARTIFACT_FILENAME), source_version=version)
+            artifact_format = ARTIFACT_FORMAT_VERSION
+        except ValueError:
+            # Models that cannot be folded are served from the pickles
+            artifact_format = None
+        os.rename(staging_dir, os.path.join(registry_dir, version))
+    except Exception:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+
+    manifest = load_manifest(registry_dir) or {'active': None, 'versions': []}
+    manifest['versions'].append({
+        'version': version,
+        'sha256': digest,
+        'created_at': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+        'model_type': type(model).__name__,
+        'artifact_format': artifact_format,
+        'metrics': metrics or {}
+    })
+    if activate:
+        manifest['active'] = version
+    _write_manifest(manifest, registry_dir)
+
+    return version
+
+def activate_version(version, registry_dir=None):
+    """
+    Make a registered version the active one
+
+    Raises:
+        ValueError: If the version is not in the manifest
+    """
+    manifest = load_manifest(registry_dir)
+    known = {entry['version'] for entry in (manifest or {}).get('versions', [])}
+    if version not in known:
+        raise ValueError(f'Unknown model version: {version}')
+
+    manifest['active'] = version
+    _write_manifest(manifest, registry_dir)
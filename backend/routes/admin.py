@@ -1,12 +1,22 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_from_directory, abort
 from flask_login import login_required, current_user
 from functools import wraps
-from sqlalchemy import func, desc
+import logging
+import os
+from sqlalchemy import func, desc, case
 from datetime import datetime, timedelta
 
-from models import db, User, Prediction, ModelMetrics
+from config import Config
+from models import db, User, Prediction, ModelMetrics, UserPredictionRollup, DailyPredictionRollup
+from job_utils import delete_user_jobs
+from outbox_utils import delete_user_emails, outbox_stats
+from ml_utils import predictor
+from registry_utils import load_manifest, activate_version
+from query_utils import query_budget
+from profiling_utils import recent_profiles, endpoint_profiles
 
 admin_bp = Blueprint('admin', __name__)
+logger = logging.getLogger(__name__)
 
 def admin_required(f):
     @wraps(f)
@@ -18,26 +28,36 @@ def admin_required(f):
     return decorated_function
 
 @admin_bp.route('/dashboard')
+@query_budget(3)
 @login_required
 @admin_required
 def dashboard():
-    # System statistics
+    # All users with their prediction totals in one query; the system statistics are
+    # summed from the same rows instead of separate count queries
+    rows = db.session.query(
+        User,
+        func.coalesce(UserPredictionRollup.prediction_count, 0),
+        func.coalesce(UserPredictionRollup.churn_count, 0)
+    ).outerjoin(UserPredictionRollup, UserPredictionRollup.user_id == User.id)\
+        .order_by(desc(User.created_at)).all()
+    
+    users = [user for user, _, _ in rows]
+    prediction_counts = {user.id: count for user, count, _ in rows}
+    
     stats = {
-        'total_users': User.query.count(),
-        'active_users': User.query.filter_by(is_active=True).count(),
-        'total_predictions': Prediction.query.count(),
-        'churn_predictions': Prediction.query.filter_by(prediction=1).count()
+        'total_users': len(users),
+        'active_users': sum(1 for user in users if user.is_active),
+        'total_predictions': sum(prediction_counts.values()),
+        'churn_predictions': sum(churn for _, _, churn in rows)
     }
     
-    # Get all users
-    users = User.query.order_by(desc(User.created_at)).all()
-    
     # Get model metrics
     model_metrics = ModelMetrics.get_latest()
     
     return render_template('admin/dashboard.html', 
                          stats=stats, 
                          users=users,
+                         prediction_counts=prediction_counts,
                          model_metrics=model_metrics)
 @admin_bp.route('/create-user', methods=['POST'])
 @login_required
@@ -90,17 +110,14 @@ def toggle_user_status(user_id):
     })
 
 @admin_bp.route('/api/user/<int:user_id>', methods=['GET'])
+@query_budget(3)
 @login_required
 @admin_required
 def get_user_details(user_id):
     user = User.query.get_or_404(user_id)
     
     # Get user statistics
-    predictions = Prediction.query.filter_by(user_id=user_id).all()
-    total_predictions = len(predictions)
-    churn_predictions = sum(1 for p in predictions if p.prediction == 1)
-    no_churn_predictions = total_predictions - churn_predictions
-    avg_probability = sum(p.probability for p in predictions) / total_predictions if total_predictions > 0 else 0
+    stats = Prediction.user_stats(user_id)
     
     return jsonify({
         'id': user.id,
@@ -109,10 +126,10 @@ def get_user_details(user_id):
         'role': user.role,
         'is_active': user.is_active,
         'created_at': user.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-        'total_predictions': total_predictions,
-        'churn_predictions': churn_predictions,
-        'no_churn_predictions': no_churn_predictions,
-        'avg_probability': avg_probability
+        'total_predictions': stats['total_predictions'],
+        'churn_predictions': stats['churn_predictions'],
+        'no_churn_predictions': stats['no_churn_predictions'],
+        'avg_probability': stats['avg_probability']
     })
 
 @admin_bp.route('/api/user/<int:user_id>', methods=['DELETE'])
@@ -125,7 +142,9 @@ def delete_user(user_id):
         return jsonify({'success': False, 'message': 'Cannot delete your own account'})
     
     # Delete user predictions first
-    Prediction.query.filter_by(user_id=user_id).delete()
+    Prediction.delete_for_user(user_id)
+    delete_user_jobs(user_id)
+    delete_user_emails(user_id)
     
     # Delete user
     db.session.delete(user)
@@ -146,7 +165,84 @@ def update_model_metrics():
     
     return jsonify({'success': True})
 
+@admin_bp.route('/api/cache-stats')
+@login_required
+@admin_required
+def cache_stats():
+    return jsonify(predictor.cache.stats())
+
+@admin_bp.route('/api/outbox')
+@login_required
+@admin_required
+def email_outbox():
+    return jsonify(outbox_stats())
+
+@admin_bp.route('/api/batch-stats')
+@login_required
+@admin_required
+def batch_stats():
+    if predictor.batcher is None:
+        return jsonify({'enabled': False})
+    return jsonify(predictor.batcher.stats())
+
+@admin_bp.route('/profiles')
+@login_required
+@admin_required
+def profiles():
+    return render_template('admin/profiles.html',
+                         profiling_enabled=Config.PROFILING_ENABLED,
+                         sample_rate=Config.PROFILE_SAMPLE_RATE,
+                         profile_header=Config.PROFILE_HEADER,
+                         profiles=recent_profiles(),
+                         endpoints=endpoint_profiles())
+
+@admin_bp.route('/profiles/<kind>/<name>.folded')
+@login_required
+@admin_required
+def download_profile(kind, name):
+    if kind not in ('recent', 'endpoints'):
+        abort(404)
+    # send_from_directory rejects names that leave the directory
+    return send_from_directory(os.path.join(Config.PROFILE_DIR, kind), f'{name}.folded',
+                               mimetype='text/plain', as_attachment=True)
+
+@admin_bp.route('/api/models')
+@login_required
+@admin_required
+def list_models():
+    manifest = load_manifest() or {'active': None, 'versions': []}
+    return jsonify({
+        'loaded_version': predictor.model_version,
+        'active_version': manifest['active'],
+        'versions': manifest['versions']
+    })
+
+@admin_bp.route('/api/models/reload', methods=['POST'])
+@login_required
+@admin_required
+def reload_model():
+    # Other workers pick the change up through their artifact watcher
+    try:
+        swapped = predictor.load_models()
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Reload failed: {str(e)}'})
+    
+    return jsonify({'success': True, 'swapped': swapped, 'model_version': predictor.model_version})
+
+@admin_bp.route('/api/models/<version>/activate', methods=['POST'])
+@login_required
+@admin_required
+def activate_model(version):
+    try:
+        activate_version(version)
+        predictor.load_models()
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+    
+    return jsonify({'success': True, 'model_version': predictor.model_version})
+
 @admin_bp.route('/api/prediction-trends')
+@query_budget(2)
 @login_required
 @admin_required
 def prediction_trends():
@@ -155,46 +251,40 @@ def prediction_trends():
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=30)
         
-        print(f"DEBUG: Querying predictions from {start_date} to {end_date}")
-        
-        # Query predictions by date
+        # Read daily totals from the rollup table
         predictions = db.session.query(
-            func.date(Prediction.created_at).label('date'),
-            func.count(Prediction.id).label('count')
+            DailyPredictionRollup.day.label('date'),
+            DailyPredictionRollup.prediction_count.label('count')
         ).filter(
-            Prediction.created_at >= start_date
-        ).group_by(
-            func.date(Prediction.created_at)
-        ).order_by('date').all()
+            DailyPredictionRollup.day >= start_date.date(),
+            DailyPredictionRollup.prediction_count > 0
+        ).order_by(DailyPredictionRollup.day).all()
         
         dates = [str(pred.date) for pred in predictions]
         counts = [pred.count for pred in predictions]
         
-        print(f"DEBUG: Found {len(predictions)} date groups")
-        print(f"DEBUG: Dates: {dates}")
-        print(f"DEBUG: Counts: {counts}")
-        
         result = {
             'dates': dates,
             'counts': counts
         }
         
-        print(f"DEBUG: Returning JSON: {result}")
+        logger.debug("Prediction trends: %d days since %s", len(dates), start_date.date())
         return jsonify(result)
         
     except Exception as e:
-        print(f"ERROR in prediction_trends: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Prediction trends query failed")
         return jsonify({'error': str(e), 'dates': [], 'counts': []})
 
 @admin_bp.route('/api/user-activity')
+@query_budget(2)
 @login_required
 @admin_required
 def user_activity():
-    active_users = User.query.filter_by(is_active=True).count()
-    inactive_users = User.query.filter_by(is_active=False).count()
-    admin_users = User.query.filter_by(role='admin').count()
+    active_users, inactive_users, admin_users = db.session.query(
+        func.coalesce(func.sum(case((User.is_active == True, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((User.is_active == False, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((User.role == 'admin', 1), else_=0)), 0)
+    ).one()
     
     return jsonify({
         'labels': ['Active Users', 'Inactive Users', 'Admin Users'],
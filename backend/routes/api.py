@@ -1,12 +1,185 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, send_file, current_app, Response, stream_with_context
 from flask_login import login_required, current_user
-from sqlalchemy import func, desc
 from datetime import datetime, timedelta
+import json
 
-from models import db, Prediction
+from models import db, Prediction, BulkJob, UserDailyPredictionRollup
+from ml_utils import predictor, FEATURE_COLUMNS, CONTRACT_MAP, PAYMENT_MAP, NUMERIC_LIMITS
+from job_utils import result_path
+from concurrency_utils import run_cpu_bound
+from query_utils import query_budget
 
 api_bp = Blueprint('api', __name__)
 
+def validate_customer(record):
+    """
+    Validate one customer record from a JSON request
+    
+    Returns:
+        tuple: (clean_record, errors) where errors maps field name to message
+    """
+    if not isinstance(record, dict):
+        return None, {'record': 'Expected a JSON object'}
+    
+    errors = {}
+    clean = {}
+    
+    customer_name = record.get('customer_name')
+    if customer_name is not None and (not isinstance(customer_name, str) or len(customer_name) > 100):
+        errors['customer_name'] = 'Must be a string of at most 100 characters'
+    clean['customer_name'] = customer_name
+    
+    for field, (low, high) in NUMERIC_LIMITS.items():
+        value = record.get(field)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            errors[field] = 'Must be a number'
+        elif not low <= value <= high:
+            errors[field] = f'Must be between {low} and {high}'
+        else:
+            clean[field] = float(value)
+    
+    for field, mapping in (('contract_type', CONTRACT_MAP), ('payment_method', PAYMENT_MAP)):
+        value = record.get(field)
+        if value not in mapping:
+            errors[field] = f"Must be one of: {', '.join(mapping)}"
+        else:
+            clean[field] = value
+    
+    return clean, errors
+
+def score_customers(customers, user_id=None):
+    """
+    Score validated customers in one vectorized call
+    
+    Args:
+        customers (list): Records returned by validate_customer
+        user_id (int): Save the predictions for this user when given
+    
+    Returns:
+        list: Result dicts in input order
+    """
+    # Scoring is CPU-bound, keep it off the event loop under gevent
+    predictions, probabilities, model_version = run_cpu_bound(
+        predictor.predict_batch,
+        {name: [c[name] for c in customers] for name in FEATURE_COLUMNS},
+        return_version=True
+    )
+    risk_scores = Prediction.risk_scores(probabilities)
+    
+    results = [{
+        'customer_name': customer['customer_name'],
+        'prediction': prediction,
+        'probability': probability,
+        'risk_score': risk_score,
+        'model_version': model_version
+    } for customer, prediction, probability, risk_score in zip(
+        customers, predictions.tolist(), probabilities.tolist(), risk_scores.tolist())]
+    
+    if user_id is not None:
+        ids = Prediction.bulk_insert([dict(
+            customer,
+            user_id=user_id,
+            prediction=result['prediction'],
+            probability=result['probability'],
+            risk_score=result['risk_score'],
+            model_version=model_version
+        ) for customer, result in zip(customers, results)], return_ids=True)
+        db.session.commit()
+        if ids is not None:
+            for result, prediction_id in zip(results, ids):
+                result['id'] = prediction_id
+    
+    return results
+
+@api_bp.route('/predict', methods=['POST'])
+@login_required
+def predict():
+    """
+    Score one customer (JSON object) or a batch (JSON array)
+    
+    Pass ?persist=true to save the predictions to the user's history.
+    """
+    payload = request.get_json(silent=True)
+    if payload is None:
+        return jsonify({'error': 'Request body must be JSON'}), 400
+    
+    single = isinstance(payload, dict)
+    records = [payload] if single else payload
+    if not isinstance(records, list) or not records:
+        return jsonify({'error': 'Expected a customer object or a non-empty array of customers'}), 400
+    
+    max_batch = current_app.config['API_MAX_BATCH']
+    if len(records) > max_batch:
+        return jsonify({'error': f'At most {max_batch} customers per request'}), 413
+    
+    customers = []
+    details = []
+    for index, record in enumerate(records):
+        clean, errors = validate_customer(record)
+        if errors:
+            details.append({'index': index, 'errors': errors})
+        customers.append(clean)
+    
+    if details:
+        return jsonify({'error': 'Invalid customer data', 'details': details}), 400
+    
+    persist = request.args.get('persist', '').lower() in ['true', '1', 'yes']
+    results = score_customers(customers, user_id=current_user.id if persist else None)
+    
+    if single:
+        return jsonify(results[0])
+    return jsonify({'count': len(results), 'results': results})
+
+@api_bp.route('/predict/stream', methods=['POST'])
+@login_required
+def predict_stream():
+    """
+    Score newline-delimited JSON customers as they arrive
+    
+    The request body is read line by line and scored in micro-batches of
+    STREAM_BATCH_SIZE; one NDJSON result line is streamed back per input line,
+    in input order. Pass ?persist=true to save the predictions.
+    """
+    batch_size = current_app.config['STREAM_BATCH_SIZE']
+    persist = request.args.get('persist', '').lower() in ['true', '1', 'yes']
+    user_id = current_user.id if persist else None
+    stream = request.stream
+    
+    def flush(pending):
+        """Score the valid records of a micro-batch and render all its result lines"""
+        valid = [clean for _, clean, errors in pending if not errors]
+        scored = iter(score_customers(valid, user_id=user_id) if valid else [])
+        lines = []
+        for line_no, clean, errors in pending:
+            result = {'line': line_no, 'errors': errors} if errors else dict(next(scored), line=line_no)
+            lines.append(json.dumps(result))
+        return '\n'.join(lines) + '\n'
+    
+    def generate():
+        pending = []
+        
+        for line_no, raw in enumerate(stream, start=1):
+            raw = raw.strip()
+            if not raw:
+                continue
+            
+            try:
+                clean, errors = validate_customer(json.loads(raw))
+            except ValueError:
+                clean, errors = None, {'record': 'Invalid JSON'}
+            
+            pending.append((line_no, clean, errors))
+            
+            # Count invalid lines too, so a run of bad input cannot grow the batch without bound
+            if len(pending) >= batch_size:
+                yield flush(pending)
+                pending = []
+        
+        if pending:
+            yield flush(pending)
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @api_bp.route('/prediction/<int:prediction_id>')
 @login_required
 def get_prediction(prediction_id):
@@ -33,41 +206,71 @@ def delete_prediction(prediction_id):
     return jsonify({'success': True})
 
 @api_bp.route('/prediction-stats')
+@query_budget(2)
 @login_required
 def prediction_stats():
     # Get user's prediction statistics
-    predictions = Prediction.query.filter_by(user_id=current_user.id).all()
-    
-    churn_count = sum(1 for p in predictions if p.prediction == 1)
-    no_churn_count = len(predictions) - churn_count
+    stats = Prediction.user_stats(current_user.id)
     
     return jsonify({
-        'churn': churn_count,
-        'no_churn': no_churn_count
+        'churn': stats['churn_predictions'],
+        'no_churn': stats['no_churn_predictions']
     })
 
 @api_bp.route('/monthly-trend')
+@query_budget(2)
 @login_required
 def monthly_trend():
     # Get user's predictions for the last 12 months
     end_date = datetime.utcnow()
     start_date = end_date - timedelta(days=365)
     
-    # Query predictions by month
-    predictions = db.session.query(
-        func.strftime('%Y-%m', Prediction.created_at).label('month'),
-        func.count(Prediction.id).label('count')
+    # Sum the user's daily rollups into months
+    daily = db.session.query(
+        UserDailyPredictionRollup.day,
+        UserDailyPredictionRollup.prediction_count
     ).filter(
-        Prediction.user_id == current_user.id,
-        Prediction.created_at >= start_date
-    ).group_by(
-        func.strftime('%Y-%m', Prediction.created_at)
-    ).order_by('month').all()
+        UserDailyPredictionRollup.user_id == current_user.id,
+        UserDailyPredictionRollup.day >= start_date.date()
+    ).order_by(UserDailyPredictionRollup.day).all()
+    
+    monthly = {}
+    for row in daily:
+        month = row.day.strftime('%Y-%m')
+        monthly[month] = monthly.get(month, 0) + row.prediction_count
     
-    months = [pred.month for pred in predictions]
-    counts = [pred.count for pred in predictions]
+    months = [month for month, count in monthly.items() if count > 0]
+    counts = [monthly[month] for month in months]
     
     return jsonify({
         'months': months,
         'counts': counts
-    })
\ No newline at end of file
+    })
+
+@api_bp.route('/jobs/<int:job_id>')
+@login_required
+def get_job(job_id):
+    job = BulkJob.query.get_or_404(job_id)
+    
+    # Check if user owns this job or is admin
+    if job.user_id != current_user.id and not current_user.is_admin():
+        return jsonify({'error': 'Access denied'}), 403
+    
+    return jsonify(job.to_dict())
+
+@api_bp.route('/jobs/<int:job_id>/results')
+@login_required
+def download_job_results(job_id):
+    job = BulkJob.query.get_or_404(job_id)
+    
+    # Check if user owns this job or is admin
+    if job.user_id != current_user.id and not current_user.is_admin():
+        return jsonify({'error': 'Access denied'}), 403
+    
+    if job.status != 'completed':
+        return jsonify({'error': 'Job has not finished yet', 'status': job.status}), 409
+    
+    return send_file(result_path(job.id),
+                     mimetype='text/csv',
+                     as_attachment=True,
+                     download_name=f'bulk_predictions_job_{job.id}.csv')
\ No newline at end of file
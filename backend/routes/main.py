@@ -1,14 +1,17 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, make_response
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
 from sqlalchemy import func, desc
 from datetime import datetime, timedelta
-import csv
-import io
 
-from models import db, User, Prediction, ModelMetrics
+from config import Config
+from models import db, User, Prediction, ModelMetrics, BulkJob
 from forms import PredictionForm
 from ml_utils import predictor
-from email_utils import send_prediction_email, send_bulk_prediction_email
+from job_utils import submit_bulk_job, load_job_results, delete_user_jobs
+from outbox_utils import delete_user_emails
+from pagination_utils import keyset_paginate
+from export_utils import stream_predictions_csv
+from query_utils import query_budget
 
 main_bp = Blueprint('main', __name__)
 
@@ -20,6 +23,7 @@ def index():
     return render_template('index.html', user_stats=user_stats)
 
 @main_bp.route('/dashboard')
+@query_budget(4)
 @login_required
 def dashboard():
     # Get user statistics
@@ -45,12 +49,13 @@ def predict():
     if form.validate_on_submit():
         try:
             # Make prediction
-            prediction, probability = predictor.predict(
+            prediction, probability, model_version = predictor.predict(
                 tenure=form.tenure.data,
                 monthly_charges=form.monthly_charges.data,
                 total_charges=form.total_charges.data,
                 contract_type=form.contract_type.data,
-                payment_method=form.payment_method.data
+                payment_method=form.payment_method.data,
+                return_version=True
             )
             
             # Save prediction to database
@@ -63,7 +68,8 @@ def predict():
                 contract_type=form.contract_type.data,
                 payment_method=form.payment_method.data,
                 prediction=prediction,
-                probability=probability
+                probability=probability,
+                model_version=model_version
             )
             
             # Calculate risk score (0-100)
@@ -90,6 +96,9 @@ def predict():
 @login_required
 def send_prediction_email_route():
     """Send prediction result via email"""
+    # Email support is only needed by these routes, so it is not imported at boot
+    from email_utils import send_prediction_email
+    
     try:
         prediction_id = request.form.get('prediction_id')
         recipient_email = request.form.get('recipient_email')
@@ -122,11 +131,12 @@ def send_prediction_email_route():
             recipient_email=recipient_email,
             customer_name=prediction.customer_name,
             prediction_data=prediction_data,
-            sender_name=sender_name
+            sender_name=sender_name,
+            user_id=current_user.id
         )
         
         if success:
-            flash(f'Prediction report sent successfully to {recipient_email}!', 'success')
+            flash(f'Prediction report is on its way to {recipient_email}!', 'success')
         else:
             flash('Failed to send email. Please check the email address and try again.', 'error')
         
@@ -160,81 +170,35 @@ def bulk_predict():
             return render_template('bulk_predict.html', results=[], success_count=0, error_count=0)
         
         try:
-            # Parse CSV file
-            stream = io.StringIO(file.stream.read().decode("UTF8"), newline=None)
-            csv_reader = csv.DictReader(stream)
-            
-            for row_num, row in enumerate(csv_reader, start=2):  # Start at 2 (accounting for header)
-                try:
-                    # Extract data from CSV
-                    customer_name = row.get('customer_name', f'Customer {row_num}')
-                    tenure = float(row.get('tenure', 0))
-                    monthly_charges = float(row.get('monthly_charges', 0))
-                    total_charges = float(row.get('total_charges', 0))
-                    contract_type = row.get('contract_type', 'Month-to-month')
-                    payment_method = row.get('payment_method', 'Electronic check')
-                    
-                    # Make prediction
-                    prediction, probability = predictor.predict(
-                        tenure=tenure,
-                        monthly_charges=monthly_charges,
-                        total_charges=total_charges,
-                        contract_type=contract_type,
-                        payment_method=payment_method
-                    )
-                    
-                    # Save to database
-                    pred_record = Prediction(
-                        user_id=current_user.id,
-                        customer_name=customer_name,
-                        tenure=tenure,
-                        monthly_charges=monthly_charges,
-                        total_charges=total_charges,
-                        contract_type=contract_type,
-                        payment_method=payment_method,
-                        prediction=prediction,
-                        probability=probability
-                    )
-                    
-                    pred_record.calculate_risk_score()
-                    db.session.add(pred_record)
-                    
-                    results.append({
-                        'row': row_num,
-                        'name': customer_name,
-                        'status': 'success',
-                        'prediction': 'Churn' if prediction == 1 else 'No Churn',
-                        'risk_score': pred_record.risk_score,
-                        'probability': f"{probability:.1%}"
-                    })
-                    success_count += 1
-                    
-                except Exception as e:
-                    error_count += 1
-                    results.append({
-                        'row': row_num,
-                        'name': row.get('customer_name', 'Unknown'),
-                        'status': 'error',
-                        'error': str(e)
-                    })
-            
-            # Commit all predictions
-            if success_count > 0:
-                db.session.commit()
-                flash(f'Successfully imported {success_count} predictions!', 'success')
-            
-            if error_count > 0:
-                flash(f'Failed to import {error_count} records. Check the details below.', 'warning')
+            # Queue the upload for background processing
+            job = submit_bulk_job(file, current_user.id)
+            flash('File uploaded! Predictions are being processed in the background.', 'info')
+            return redirect(url_for('main.bulk_predict', job_id=job.id))
         
         except Exception as e:
+            db.session.rollback()
             flash(f'Error processing CSV file: {str(e)}', 'error')
     
-    return render_template('bulk_predict.html', results=results, success_count=success_count, error_count=error_count)
+    # Show progress or results of a submitted job
+    job = None
+    job_id = request.args.get('job_id', type=int)
+    if job_id:
+        job = BulkJob.query.filter_by(id=job_id, user_id=current_user.id).first()
+        if not job:
+            flash('Bulk prediction job not found', 'error')
+        elif job.status == 'completed':
+            results = load_job_results(job)
+            success_count = job.success_count
+            error_count = job.error_count
+    
+    return render_template('bulk_predict.html', results=results, success_count=success_count, error_count=error_count, job=job)
 
 @main_bp.route('/send-bulk-email', methods=['POST'])
 @login_required
 def send_bulk_email():
     """Send bulk prediction results via email"""
+    from email_utils import send_bulk_prediction_email
+    
     try:
         recipient_email = request.form.get('recipient_email')
         sender_name = request.form.get('sender_name', current_user.username)
@@ -243,37 +207,23 @@ def send_bulk_email():
             flash('Email address is required', 'error')
             return redirect(url_for('main.bulk_predict'))
         
-        # Get recent predictions (last 50 for email)
-        predictions = Prediction.query.filter_by(user_id=current_user.id)\
-            .order_by(desc(Prediction.created_at)).limit(50).all()
-        
-        if not predictions:
+        if not Prediction.count_for_user(current_user.id):
             flash('No predictions found to send', 'error')
             return redirect(url_for('main.bulk_predict'))
         
-        # Prepare predictions data
-        predictions_data = []
-        for pred in predictions:
-            predictions_data.append({
-                'customer_name': pred.customer_name,
-                'prediction': pred.prediction,
-                'probability': pred.probability,
-                'tenure': pred.tenure,
-                'monthly_charges': pred.monthly_charges,
-                'total_charges': pred.total_charges,
-                'contract_type': pred.contract_type,
-                'payment_method': pred.payment_method
-            })
+        # Recent predictions (last 50 unless a larger report is requested)
+        limit = min(request.form.get('limit', 50, type=int), Config.EMAIL_REPORT_MAX_ROWS)
         
         # Send email
         success = send_bulk_prediction_email(
             recipient_email=recipient_email,
-            predictions_data=predictions_data,
-            sender_name=sender_name
+            sender_name=sender_name,
+            user_id=current_user.id,
+            limit=limit
         )
         
         if success:
-            flash(f'Bulk prediction report sent successfully to {recipient_email}!', 'success')
+            flash(f'Bulk prediction report is on its way to {recipient_email}!', 'success')
         else:
             flash('Failed to send email. Please check the email address and try again.', 'error')
         
@@ -283,23 +233,22 @@ def send_bulk_email():
     return redirect(url_for('main.bulk_predict'))
 
 @main_bp.route('/history')
+@query_budget(3)
 @login_required
 def history():
     try:
-        page = request.args.get('page', 1, type=int)
         per_page = 10
-        
-        # Ensure page is at least 1
-        if page < 1:
-            page = 1
+        cursor = request.args.get('cursor') or None
         
         # Build query with filters
         query = Prediction.query.filter_by(user_id=current_user.id)
         
         # Filter by prediction type
+        prediction_value = None
         prediction_filter = request.args.get('prediction_filter')
         if prediction_filter in ['0', '1']:
-            query = query.filter(Prediction.prediction == int(prediction_filter))
+            prediction_value = int(prediction_filter)
+            query = query.filter(Prediction.prediction == prediction_value)
         
         # Filter by date range
         from_date = request.args.get('from_date')
@@ -311,6 +260,7 @@ def history():
                 query = query.filter(Prediction.created_at >= from_date)
             except ValueError:
                 flash('Invalid from date format', 'warning')
+                from_date = None
         
         if to_date:
             try:
@@ -318,86 +268,57 @@ def history():
                 query = query.filter(Prediction.created_at < to_date)
             except ValueError:
                 flash('Invalid to date format', 'warning')
+                to_date = None
         
         # Check for CSV export
         if request.args.get('export') == 'csv':
-            return export_predictions_csv(query.all())
-        
-        # Get total count before pagination
-        total_count = query.count()
-        
-        # Calculate max page
-        max_page = (total_count + per_page - 1) // per_page if total_count > 0 else 1
-        
-        # If page is beyond max page, redirect to last page
-        if page > max_page and total_count > 0:
-            return redirect(url_for('main.history', page=max_page, **{k: v for k, v in request.args.items() if k != 'page'}))
-        
-        # Paginate results
-        predictions = query.order_by(desc(Prediction.created_at))\
-            .paginate(page=page, per_page=per_page, error_out=False)
+            return export_predictions_csv(query)
+        
+        # Filters are whole days, so the total comes straight from the daily rollups
+        total_count = Prediction.count_for_user(
+            current_user.id,
+            prediction=prediction_value,
+            start_day=from_date.date() if from_date else None,
+            end_day=to_date.date() if to_date else None
+        )
         
-        # Debug info (remove in production)
-        print(f"DEBUG: History page {page}, total items: {predictions.total}, pages: {predictions.pages}")
+        # Seek to the page after/before the cursor row instead of using OFFSET
+        try:
+            predictions = keyset_paginate(query, per_page, cursor=cursor, total=total_count)
+        except ValueError:
+            flash('Invalid page link, showing the latest predictions', 'warning')
+            predictions = keyset_paginate(query, per_page, total=total_count)
         
-        # If no items and not on page 1, redirect to page 1
-        if not predictions.items and page > 1:
-            print(f"DEBUG: No items on page {page}, redirecting to page 1")
-            return redirect(url_for('main.history', page=1, **{k: v for k, v in request.args.items() if k != 'page'}))
+        # Paging back past the newest rows lands on the first page
+        if not predictions.items and cursor:
+            return redirect(url_for('main.history', **{k: v for k, v in request.args.items() if k != 'cursor'}))
         
         return render_template('history.html', predictions=predictions)
         
     except Exception as e:
         flash(f'Error loading prediction history: {str(e)}', 'error')
-        # Redirect to page 1 on any error
-        return redirect(url_for('main.history', page=1))
+        # Redirect to the first page on any error
+        return redirect(url_for('main.history'))
 
 @main_bp.route('/export-email', methods=['POST'])
 @login_required
 def export_email():
     """Export prediction history as CSV and show download option"""
     try:
-        # Get user's predictions
-        predictions = Prediction.query.filter_by(user_id=current_user.id)\
-            .order_by(desc(Prediction.created_at)).all()
+        # Count from the rollups instead of loading the predictions
+        total_count = Prediction.count_for_user(current_user.id)
         
-        if not predictions:
+        if not total_count:
             flash('No predictions to export', 'warning')
             return redirect(url_for('main.history'))
         
-        # Generate CSV content
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write header
-        writer.writerow([
-            'Customer Name', 'Tenure (Months)', 'Monthly Charges (₹)', 'Total Charges (₹)',
-            'Contract Type', 'Payment Method', 'Prediction', 'Risk Score', 'Probability', 'Date'
-        ])
-        
-        # Write data
-        for pred in predictions:
-            writer.writerow([
-                pred.customer_name,
-                f"{pred.tenure} months",
-                f"₹{pred.monthly_charges:,.0f}",
-                f"₹{pred.total_charges:,.0f}",
-                pred.contract_type,
-                pred.payment_method,
-                'Churn' if pred.prediction == 1 else 'No Churn',
-                pred.risk_score,
-                f"{pred.probability:.3f}",
-                pred.created_at.strftime('%Y-%m-%d %H:%M:%S')
-            ])
-        
-        output.seek(0)
-        
-        # Create response
-        response = make_response(output.getvalue())
-        response.headers['Content-Type'] = 'text/csv'
-        response.headers['Content-Disposition'] = f'attachment; filename=churn_predictions_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-        
-        flash(f'Export ready! Downloaded {len(predictions)} predictions.', 'success')
+        # Stream the user's predictions as CSV
+        query = Prediction.query.filter_by(user_id=current_user.id)\
+            .order_by(desc(Prediction.created_at))
+        response = stream_predictions_csv(query, include_risk_score=True,
+                                          compress=request.values.get('compress') == 'gzip')
+        
+        flash(f'Export ready! Downloaded {total_count} predictions.', 'success')
         return response
         
     except Exception as e:
@@ -409,6 +330,23 @@ def export_email():
 def settings():
     user_stats = get_user_stats(current_user.id)
     return render_template('settings.html', user_stats=user_stats)
+
+@main_bp.route('/settings/api-key', methods=['POST'])
+@login_required
+def generate_api_key():
+    key = current_user.generate_api_key()
+    db.session.commit()
+    flash(f'Your new API key (shown only once, any previous key no longer works): {key}', 'success')
+    return redirect(url_for('main.settings'))
+
+@main_bp.route('/settings/api-key/revoke', methods=['POST'])
+@login_required
+def revoke_api_key():
+    current_user.revoke_api_key()
+    db.session.commit()
+    flash('API key revoked.', 'success')
+    return redirect(url_for('main.settings'))
+
 @main_bp.route('/change-password', methods=['POST'])
 @login_required
 def change_password():
@@ -437,8 +375,7 @@ def change_password():
 @main_bp.route('/export-data')
 @login_required
 def export_data():
-    predictions = Prediction.query.filter_by(user_id=current_user.id).all()
-    return export_predictions_csv(predictions)
+    return export_predictions_csv(Prediction.query.filter_by(user_id=current_user.id))
 
 @main_bp.route('/delete-account', methods=['POST'])
 @login_required
@@ -450,7 +387,9 @@ def delete_account():
         return redirect(url_for('main.settings'))
     
     # Delete all user predictions
-    Prediction.query.filter_by(user_id=current_user.id).delete()
+    Prediction.delete_for_user(current_user.id)
+    delete_user_jobs(current_user.id)
+    delete_user_emails(current_user.id)
     
     # Delete user account
     db.session.delete(current_user)
@@ -461,49 +400,8 @@ def delete_account():
 
 def get_user_stats(user_id):
     """Get user statistics"""
-    predictions = Prediction.query.filter_by(user_id=user_id).all()
-    
-    total_predictions = len(predictions)
-    churn_predictions = sum(1 for p in predictions if p.prediction == 1)
-    no_churn_predictions = total_predictions - churn_predictions
-    avg_probability = sum(p.probability for p in predictions) / total_predictions if total_predictions > 0 else 0
-    
-    return {
-        'total_predictions': total_predictions,
-        'churn_predictions': churn_predictions,
-        'no_churn_predictions': no_churn_predictions,
-        'avg_probability': avg_probability
-    }
+    return Prediction.user_stats(user_id)
 
-def export_predictions_csv(predictions):
+def export_predictions_csv(query):
     """Export predictions to CSV with Indian formatting"""
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write header
-    writer.writerow([
-        'Customer Name', 'Tenure (Months)', 'Monthly Charges (₹)', 'Total Charges (₹)',
-        'Contract Type', 'Payment Method', 'Prediction', 'Probability', 'Date'
-    ])
-    
-    # Write data
-    for pred in predictions:
-        writer.writerow([
-            pred.customer_name,
-            f"{pred.tenure} months",
-            f"₹{pred.monthly_charges:,.0f}",
-            f"₹{pred.total_charges:,.0f}",
-            pred.contract_type,
-            pred.payment_method,
-            'Churn' if pred.prediction == 1 else 'No Churn',
-            f"{pred.probability:.3f}",
-            pred.created_at.strftime('%Y-%m-%d %H:%M:%S')
-        ])
-    
-    output.seek(0)
-    
-    response = make_response(output.getvalue())
-    response.headers['Content-Type'] = 'text/csv'
-    response.headers['Content-Disposition'] = f'attachment; filename=churn_predictions_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-    
-    return response
\ No newline at end of file
+    return stream_predictions_csv(query, compress=request.args.get('compress') == 'gzip')
@@ -4,10 +4,12 @@ Customer Churn Prediction System
 Main application runner
 """
 
-from app_flask import create_app
+from app_flask import create_app, init_database
 
 if __name__ == '__main__':
     app = create_app()
+    with app.app_context():
+        init_database()
     print("🚀 Starting Customer Churn Prediction System...")
     print("📊 Dashboard: http://localhost:5000")
     print("👤 Demo Admin: admin / admin123")
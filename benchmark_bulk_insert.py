@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Compare rows/sec of per-object ORM inserts against Prediction.bulk_insert
+Runs against a throwaway SQLite database unless DATABASE_URL is set
+"""
+
+import sys
+import os
+import random
+import tempfile
+import time
+
+# Use a scratch database so the benchmark never touches real data
+if not os.environ.get('DATABASE_URL'):
+    scratch_db = os.path.join(tempfile.mkdtemp(), 'benchmark.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{scratch_db}'
+
+# Add the backend directory to Python path
+backend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+sys.path.insert(0, backend_path)
+
+from app_flask import create_app, init_database
+from models import db, User, Prediction
+
+def make_rows(user_id, n_rows):
+    """Generate synthetic prediction rows"""
+    random.seed(42)
+    contract_types = ["Month-to-month", "One year", "Two year"]
+    payment_methods = ["UPI", "Net Banking", "Credit card (automatic)", "Digital Wallet", "Electronic check"]
+
+    rows = []
+    for i in range(n_rows):
+        tenure = random.randint(1, 72)
+        monthly_charges = random.randint(500, 3500)
+        probability = random.random()
+        rows.append({
+            'user_id': user_id,
+            'customer_name': f'Customer {i}',
+            'tenure': tenure,
+            'monthly_charges': monthly_charges,
+            'total_charges': tenure * monthly_charges,
+            'contract_type': random.choice(contract_types),
+            'payment_method': random.choice(payment_methods),
+            'prediction': int(probability > 0.5),
+            'probability': probability
+        })
+    return rows
+
+def orm_insert(rows):
+    """Current path: one Prediction object per row, flushed by the session"""
+    for row in rows:
+        pred_record = Prediction(**row)
+        pred_record.calculate_risk_score()
+        db.session.add(pred_record)
+    db.session.commit()
+
+def bulk_insert(rows, batch_size):
+    Prediction.bulk_insert(rows, batch_size=batch_size)
+    db.session.commit()
+
+def timed(label, fn, n_rows):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"⏱️  {label:<28} {elapsed:7.3f}s  {n_rows / elapsed:>10,.0f} rows/sec")
+    return elapsed
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    print("📊 Prediction insert benchmark")
+    print("=" * 50)
+    print(f"Database: {os.environ['DATABASE_URL']}")
+    print(f"Rows per run: {n_rows:,}\n")
+
+    app = create_app()
+    with app.app_context():
+        init_database()
+        user = User.query.filter_by(username='demo_user').first()
+        rows = make_rows(user.id, n_rows)
+
+        orm_time = timed("ORM add + commit", lambda: orm_insert(rows), n_rows)
+        for batch_size in (500, 1000, 5000):
+            bulk_time = timed(f"bulk_insert (batch={batch_size})", lambda: bulk_insert(rows, batch_size), n_rows)
+        print(f"\n🚀 Speedup (batch=5000): {orm_time / bulk_time:.1f}x")
+
+        ids = Prediction.bulk_insert(rows[:10], return_ids=True)
+        db.session.commit()
+        print(f"🔑 Returned ids supported: {'yes' if ids is not None else 'no'}")
+
+if __name__ == '__main__':
+    main()
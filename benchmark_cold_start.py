@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Compare worker cold-start time when the model is loaded from the pickles
+(sklearn objects) versus the safe .npz artifact
+Each measurement runs in a fresh interpreter, as a new worker would
+"""
+
+import sys
+import os
+import json
+import statistics
+import subprocess
+import tempfile
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Timed in the child: importing the predictor module loads the model
+CHILD_CODE = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, %r)
+from ml_utils import predictor
+predictor.predict(12, 1500, 18000, 'Month-to-month', 'UPI')
+print(json.dumps({
+    'seconds': time.perf_counter() - start,
+    'sklearn_imported': 'sklearn' in sys.modules,
+    'version': predictor.model_version
+}))
+"""
+
+def cold_start(env, runs):
+    results = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-W', 'ignore', '-c', CHILD_CODE % os.path.join(ROOT, 'backend')],
+                                env=env, capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return results
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    print("🧊 Worker cold-start benchmark")
+    print("=" * 50)
+
+    # Empty registry so both runs use the files in backend/
+    base_env = dict(os.environ,
+                    MODEL_REGISTRY_DIR=tempfile.mkdtemp(),
+                    MODEL_SHARED_DIR='',
+                    MODEL_WATCH_INTERVAL='0')
+    modes = {
+        'pickle + sklearn': dict(base_env, MODEL_ARTIFACT_PATH=os.path.join(tempfile.mkdtemp(), 'missing.npz')),
+        '.npz artifact': base_env
+    }
+
+    medians = {}
+    for label, env in modes.items():
+        results = cold_start(env, runs)
+        medians[label] = statistics.median(r['seconds'] for r in results)
+        print(f"⏱️  {label:<18} {medians[label] * 1000:8.1f} ms (median of {runs}), "
+              f"sklearn imported: {'yes' if results[0]['sklearn_imported'] else 'no'}, "
+              f"version {results[0]['version']}")
+
+    pickle_time, artifact_time = medians['pickle + sklearn'], medians['.npz artifact']
+    print(f"\n🚀 Cold start {pickle_time / artifact_time:.1f}x faster "
+          f"({(pickle_time - artifact_time) * 1000:.0f} ms saved per worker)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark email report rendering for 50, 5k and 50k predictions
+Compares a bulk report with every row in an inline HTML table against the
+shipped report (first EMAIL_INLINE_ROWS rows inline, all rows in an
+attached .csv.gz, rendered by the outbox sender), and times the cached
+single prediction template.
+Runs against a throwaway SQLite database; nothing is sent.
+"""
+
+import sys
+import os
+import tempfile
+import time
+import timeit
+from datetime import datetime
+
+scratch = tempfile.mkdtemp()
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{os.path.join(scratch, 'email_bench.db')}",
+    JOB_FOLDER=os.path.join(scratch, 'jobs'),
+    MODEL_WATCH_INTERVAL='0',
+    OUTBOX_POLL_INTERVAL='0'
+)
+
+# Add the backend directory to Python path
+backend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+sys.path.insert(0, backend_path)
+
+from sqlalchemy import desc
+from app_flask import create_app, init_database
+from config import Config
+from models import db, User, Prediction, EmailOutbox
+from email_utils import (REPORT_COLUMNS, create_bulk_prediction_email_template, create_prediction_email_template,
+                         send_bulk_prediction_email)
+from outbox_utils import build_message
+
+SIZES = (50, 5000, 50000)
+
+def seed_predictions(user_id, n_rows):
+    Prediction.query.filter_by(user_id=user_id).delete()
+    now = datetime.utcnow()
+    Prediction.bulk_insert([{
+        'user_id': user_id,
+        'customer_name': f'Customer {i}',
+        'tenure': i % 72 + 1,
+        'monthly_charges': 500 + i % 3000,
+        'total_charges': (i % 72 + 1) * (500 + i % 3000),
+        'contract_type': 'Month-to-month',
+        'payment_method': 'UPI',
+        'prediction': i % 3 == 0,
+        'probability': (i % 100) / 100,
+        'risk_score': i % 100,
+        'created_at': now
+    } for i in range(n_rows)], batch_size=5000)
+    db.session.commit()
+
+def inline_report(query, n_rows):
+    """Every row in the HTML table, as one giant inline report would be"""
+    inline_rows = Config.EMAIL_INLINE_ROWS
+    Config.EMAIL_INLINE_ROWS = n_rows
+    try:
+        churn_count = query.filter(Prediction.prediction == 1).count()
+        return create_bulk_prediction_email_template(query.with_entities(*REPORT_COLUMNS), 'Benchmark',
+                                                     n_rows, churn_count)
+    finally:
+        Config.EMAIL_INLINE_ROWS = inline_rows
+
+def main():
+    app = create_app()
+    with app.app_context():
+        init_database()
+
+    with app.test_request_context():
+        user = User.query.filter_by(username='demo_user').first()
+
+        print("📧 Email rendering benchmark")
+        print("=" * 50)
+
+        prediction = {'prediction': 1, 'probability': 0.82, 'tenure': 12, 'monthly_charges': 1500,
+                      'total_charges': 18000, 'contract_type': 'Month-to-month', 'payment_method': 'UPI'}
+        start = time.perf_counter()
+        create_prediction_email_template('Customer 1', prediction, 'Benchmark')
+        first = time.perf_counter() - start
+        number = 2000
+        cached = min(timeit.repeat(lambda: create_prediction_email_template('Customer 1', prediction, 'Benchmark'),
+                                   number=number, repeat=3)) / number
+        print(f"⏱️  Single prediction email: first render {first * 1000:.2f} ms (compiles), "
+              f"cached {cached * 1e6:.0f} µs/render")
+
+        print(f"\n   {'rows':>6}  {'inline table':>24}  {'report + .csv.gz attachment':>49}")
+        print(f"   {'':>6}  {'time ms':>10} {'html KB':>13}  {'queue ms':>10} {'html KB':>10} "
+              f"{'sender ms':>12} {'attachment KB':>14}")
+        for n_rows in SIZES:
+            seed_predictions(user.id, n_rows)
+            query = Prediction.query.filter_by(user_id=user.id).order_by(desc(Prediction.created_at))
+
+            start = time.perf_counter()
+            html = inline_report(query, n_rows)
+            inline_time = time.perf_counter() - start
+
+            # The request only queues the email; the sender renders the attachment
+            start = time.perf_counter()
+            send_bulk_prediction_email('bench@example.com', user.id, 'Benchmark', limit=n_rows)
+            queue_time = time.perf_counter() - start
+            message = EmailOutbox.query.order_by(EmailOutbox.id.desc()).first()
+            start = time.perf_counter()
+            attachments = build_message(message).attachments
+            sender_time = time.perf_counter() - start
+            attachment_kb = len(attachments[0].data) / 1024 if attachments else 0
+
+            print(f"   {n_rows:>6}  {inline_time * 1000:10.1f} {len(html.encode('utf-8')) / 1024:13.1f}  "
+                  f"{queue_time * 1000:10.1f} {len(message.html_body.encode('utf-8')) / 1024:10.1f} "
+                  f"{sender_time * 1000:12.1f} {attachment_kb:14.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Check the fused scaler + logistic regression fast path against sklearn
+and compare per-call latency of both scoring paths
+"""
+
+import sys
+import os
+import pickle
+import timeit
+import numpy as np
+
+# Add the backend directory to Python path
+backend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+sys.path.insert(0, backend_path)
+
+# Repeated identical inputs must be scored by the model, not served from the result cache
+os.environ['PREDICTION_CACHE_SIZE'] = '0'
+
+from ml_utils import ChurnPredictor, FusedLogisticModel
+
+def load_reference(predictor):
+    """Unpickle the sklearn model and scaler behind the active version (it may be served from the .npz artifact)"""
+    _, _, model_path, scaler_path = predictor.artifact_source()
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+    with open(scaler_path, 'rb') as f:
+        scaler = pickle.load(f)
+    return model, scaler
+
+def sklearn_predict(model, scaler, features):
+    """Reference path: what ChurnPredictor.predict did before the fast path"""
+    scaled = scaler.transform(features)
+    prediction = model.predict(scaled)[0]
+    probability = model.predict_proba(scaled)[0][1]
+    return int(prediction), float(probability)
+
+def check_parity(predictor, model, scaler, n_samples=10000):
+    """Compare fast path and sklearn on random Indian telecom style inputs"""
+    rng = np.random.default_rng(42)
+    tenure = rng.integers(1, 73, n_samples).astype(np.float64)
+    monthly_charges = rng.uniform(500, 4000, n_samples)
+    features = np.column_stack([
+        tenure,
+        monthly_charges,
+        tenure * monthly_charges,
+        rng.integers(0, 3, n_samples),
+        rng.integers(0, 7, n_samples)
+    ]).astype(np.float64)
+
+    expected_proba = model.predict_proba(scaler.transform(features))[:, 1]
+    expected_labels = model.predict(scaler.transform(features))
+
+    fast_proba = predictor.fast_model.predict_proba(features)
+    fast_labels = predictor.fast_model.classes[(fast_proba > 0.5).astype(np.intp)]
+
+    max_diff = float(np.max(np.abs(fast_proba - expected_proba)))
+    label_mismatches = int(np.sum(fast_labels != expected_labels))
+
+    print(f"📊 Max probability difference: {max_diff:.3e} (tolerance {FusedLogisticModel.TOLERANCE:.0e})")
+    print(f"📊 Label mismatches: {label_mismatches} / {n_samples}")
+
+    return max_diff <= FusedLogisticModel.TOLERANCE and label_mismatches == 0
+
+def benchmark(predictor, model, scaler, number=20000):
+    """Time single-customer scoring through both paths"""
+    features = np.array([[12, 1500, 18000, 0, 4]], dtype=np.float64)
+
+    sklearn_time = min(timeit.repeat(lambda: sklearn_predict(model, scaler, features), number=number // 10, repeat=3)) / (number // 10)
+    fast_time = min(timeit.repeat(lambda: predictor.predict(12, 1500, 18000, "Month-to-month", "UPI"), number=number, repeat=3)) / number
+
+    print(f"⏱️  sklearn path: {sklearn_time * 1e6:8.1f} µs/call")
+    print(f"⏱️  fast path:    {fast_time * 1e6:8.1f} µs/call")
+    print(f"🚀 Speedup: {sklearn_time / fast_time:.1f}x")
+
+def main():
+    print("🧪 Fused fast path parity and latency check")
+    print("=" * 50)
+
+    predictor = ChurnPredictor()
+    if predictor.fast_model is None:
+        print("⚠️  Loaded model cannot be folded, predictions use the sklearn path")
+        return True
+
+    model, scaler = load_reference(predictor)
+    ok = check_parity(predictor, model, scaler)
+    print("✅ Fast path matches sklearn" if ok else "❌ Fast path does not match sklearn")
+
+    benchmark(predictor, model, scaler)
+    return ok
+
+if __name__ == '__main__':
+    if not main():
+        sys.exit(1)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Compare throughput and latency of concurrent single predictions with and
+without micro-batching, on the fused fast path and on the sklearn path
+
+Usage: python benchmark_micro_batching.py [threads, default 16] [max latency ms, default 2]
+"""
+
+import sys
+import os
+import time
+import threading
+import statistics
+
+# Add the backend directory to Python path
+backend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+sys.path.insert(0, backend_path)
+
+# Every call must reach the model, not the result cache
+os.environ['PREDICTION_CACHE_SIZE'] = '0'
+os.environ.setdefault('MODEL_WATCH_INTERVAL', '0')
+
+import numpy as np
+from ml_utils import ChurnPredictor, LoadedModel
+from batching_utils import MicroBatcher
+from benchmark_inference import load_reference
+
+CALLS_PER_THREAD = 500
+
+def run_threads(predictor, threads):
+    """Each thread scores CALLS_PER_THREAD distinct customers, returns (calls/s, per-call latencies)"""
+    latencies = [[] for _ in range(threads)]
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(index):
+        rng = np.random.default_rng(index)
+        inputs = [(int(rng.integers(1, 73)), float(rng.uniform(500, 4000))) for _ in range(CALLS_PER_THREAD)]
+        barrier.wait()
+        for tenure, monthly in inputs:
+            start = time.perf_counter()
+            predictor.predict(tenure, monthly, tenure * monthly, 'Month-to-month', 'UPI')
+            latencies[index].append(time.perf_counter() - start)
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    return threads * CALLS_PER_THREAD / elapsed, [l for per_thread in latencies for l in per_thread]
+
+def report(label, throughput, latencies):
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"⏱️  {label:<22} {throughput:10.0f} calls/s   p50 {p50 * 1000:7.3f} ms   p99 {p99 * 1000:7.3f} ms")
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    max_latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+
+    print(f"🧪 Micro-batching benchmark ({threads} threads x {CALLS_PER_THREAD} calls)")
+    print("=" * 50)
+
+    predictor = ChurnPredictor()
+    fast = predictor.active
+    model, scaler = load_reference(predictor)
+    paths = {'fast path': fast}
+    if fast.fast_model is not None:
+        # Same model without the fused weights, so scoring goes through sklearn
+        paths['sklearn path'] = LoadedModel(fast.version, model=model, scaler=scaler,
+                                            contract_map=fast.contract_map, payment_map=fast.payment_map,
+                                            feature_mean=fast.feature_mean, feature_scale=fast.feature_scale)
+
+    for path_label, active in paths.items():
+        print(f"\n📊 {path_label}")
+        predictor.active = active
+
+        predictor.batcher = None
+        report('unbatched', *run_threads(predictor, threads))
+
+        predictor.batcher = MicroBatcher(predictor._score_batch, max_batch=64, max_latency=max_latency_ms / 1000)
+        report(f'batched ({max_latency_ms:g} ms)', *run_threads(predictor, threads))
+
+        stats = predictor.batcher.stats()
+        histogram = ', '.join(f"≤{bound}: {count}" for bound, count in stats['batch_size_histogram'].items() if count)
+        print(f"   mean batch size {stats['mean_batch_size']:.1f}, mean queue wait {stats['mean_wait_ms']:.3f} ms")
+        print(f"   batch sizes: {histogram}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Load-test the sync and gevent gunicorn profiles under mixed traffic
+Quick JSON predictions, history pages, bulk CSV uploads and report emails
+run concurrently; the emails go to a local SMTP sink that is slow to accept
+connections, like a remote provider doing a TLS handshake
+
+Usage: python benchmark_serving_modes.py [seconds per profile, default 15] [SMTP connect delay s, default 1.0]
+"""
+
+import sys
+import os
+import json
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+from local_smtp_server import LocalSMTPServer
+from measure_worker_memory import ROOT, free_port, wait_until_ready, login
+
+PROFILES = {
+    'sync': 'gunicorn_config.py',
+    'gevent': 'gunicorn_gevent_config.py'
+}
+
+# Client threads per kind of traffic
+CLIENTS = {
+    'predict': 8,
+    'history': 2,
+    'bulk upload': 1,
+    'email': 2
+}
+
+BULK_ROWS = 2000
+
+def bulk_csv():
+    lines = ['customer_name,tenure,monthly_charges,total_charges,contract_type,payment_method']
+    for i in range(BULK_ROWS):
+        tenure = i % 72 + 1
+        lines.append(f'Customer {i},{tenure},{500 + i % 3000},{tenure * (500 + i % 3000)},Month-to-month,UPI')
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+def multipart(field, filename, content):
+    boundary = 'churn-load-test-boundary'
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f'Content-Type: text/csv\r\n\r\n').encode('utf-8') + content + f'\r\n--{boundary}--\r\n'.encode('utf-8')
+    return body, {'Content-Type': f'multipart/form-data; boundary={boundary}'}
+
+def make_request(kind, base_url, i, upload):
+    if kind == 'predict':
+        tenure = i % 72 + 1
+        body = json.dumps({'customer_name': f'Load {i}', 'tenure': tenure, 'monthly_charges': 1500,
+                           'total_charges': tenure * 1500, 'contract_type': 'Month-to-month',
+                           'payment_method': 'UPI'}).encode('utf-8')
+        return urllib.request.Request(base_url + '/api/predict', body, {'Content-Type': 'application/json'})
+    if kind == 'history':
+        return urllib.request.Request(base_url + '/history')
+    if kind == 'bulk upload':
+        body, headers = multipart('csv_file', 'load.csv', upload)
+        return urllib.request.Request(base_url + '/bulk-predict', body, headers)
+    form = urllib.parse.urlencode({'recipient_email': 'load@example.com', 'sender_name': 'Load test'})
+    return urllib.request.Request(base_url + '/send-bulk-email', form.encode('utf-8'))
+
+def client(kind, base_url, deadline, upload, latencies, errors):
+    opener = login(base_url)
+    # The email report needs at least one saved prediction to send
+    request = make_request('predict', base_url, 0, upload)
+    request.full_url += '?persist=true'
+    opener.open(request).read()
+
+    i = 0
+    while time.time() < deadline:
+        start = time.perf_counter()
+        try:
+            opener.open(make_request(kind, base_url, i, upload), timeout=60).read()
+            latencies.append(time.perf_counter() - start)
+        except OSError:
+            errors.append(kind)
+        i += 1
+
+def run_profile(label, config, seconds, smtp_port):
+    port = free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    scratch = tempfile.mkdtemp()
+    env = dict(os.environ,
+               DATABASE_URL=f"sqlite:///{os.path.join(scratch, 'load.db')}",
+               JOB_FOLDER=os.path.join(scratch, 'jobs'),
+               INIT_DB_ON_BOOT='true',
+               MAIL_SERVER='127.0.0.1',
+               MAIL_PORT=str(smtp_port),
+               MAIL_USE_TLS='false')
+
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', config, '--bind', f'127.0.0.1:{port}', 'render_start:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        if not wait_until_ready(base_url):
+            print(f"❌ gunicorn with {config} did not start")
+            return None
+
+        upload = bulk_csv()
+        deadline = time.time() + seconds
+        latencies = {kind: [] for kind in CLIENTS}
+        errors = []
+        threads = [threading.Thread(target=client, args=(kind, base_url, deadline, upload, latencies[kind], errors))
+                   for kind, count in CLIENTS.items() for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    print(f"\n📊 {label} ({config})")
+    print(f"   {'traffic':<12} {'requests':>8} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for kind, values in latencies.items():
+        values = sorted(values)
+        p50 = statistics.median(values) * 1000 if values else float('nan')
+        p99 = values[max(int(len(values) * 0.99) - 1, 0)] * 1000 if values else float('nan')
+        print(f"   {kind:<12} {len(values):8d} {len(values) / seconds:8.1f} {p50:9.1f} {p99:9.1f} {errors.count(kind):7d}")
+    return latencies
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 15
+    connect_delay = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+
+    print(f"🏁 Serving profile load test ({seconds:g}s each, SMTP connect delay {connect_delay:g}s)")
+    print("=" * 50)
+
+    smtp = LocalSMTPServer(connect_delay=connect_delay).start()
+    try:
+        results = {label: run_profile(label, config, seconds, smtp.port) for label, config in PROFILES.items()}
+    finally:
+        smtp.stop()
+
+    if all(results.values()):
+        sync_predict, gevent_predict = sorted(results['sync']['predict']), sorted(results['gevent']['predict'])
+        print(f"\n🚀 Predictions served: sync {len(sync_predict)}, gevent {len(gevent_predict)}; "
+              f"p99 sync {sync_predict[int(len(sync_predict) * 0.99) - 1] * 1000:.0f} ms, "
+              f"gevent {gevent_predict[int(len(gevent_predict) * 0.99) - 1] * 1000:.0f} ms")
+    print(f"📧 {len(smtp.messages)} emails delivered to the SMTP sink")
+
+if __name__ == '__main__':
+    main()
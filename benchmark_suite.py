@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Reproducible benchmark suite for inference, bulk import, history, export and dashboards
+
+`run` seeds a throwaway SQLite database with one user per dataset size
+(synthetic predictions generated from a fixed seed) and times, through the
+Flask test client where a route is involved:
+  - ChurnPredictor.predict (one customer) and predict_batch (whole dataset)
+  - /bulk-predict end to end: CSV upload until the background job completes
+  - the first and a deep page of /history
+  - the full CSV export (/export-data)
+  - dashboard statistics (/dashboard, /api/prediction-stats, /admin/dashboard)
+Results are written as JSON together with machine and package information.
+
+`compare` reads two result files and flags benchmarks whose median got slower
+by more than the threshold; it exits non-zero when any did.
+
+Usage:
+  python benchmark_suite.py run [--sizes 1k,100k,1M] [--repeat 3] [--output FILE]
+  python benchmark_suite.py compare BASELINE.json CURRENT.json [--threshold 10]
+"""
+
+import sys
+import os
+import argparse
+import io
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timedelta
+from importlib import metadata
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(ROOT_DIR, 'benchmark_results')
+
+SIZE_LABELS = {'1k': 1000, '10k': 10000, '100k': 100000, '1M': 1000000}
+DEFAULT_SIZES = '1k,100k,1M'
+
+CONTRACT_TYPES = ['Month-to-month', 'One year', 'Two year']
+PAYMENT_METHODS = ['UPI', 'Net Banking', 'Credit card (automatic)', 'Digital Wallet', 'Electronic check']
+SEED_CHUNK = 50000
+HISTORY_DEEP_PAGE = 50
+SINGLE_CALLS = 2000
+
+def machine_info():
+    """Hardware, interpreter, package versions and commit the results were measured with"""
+    processor = platform.processor()
+    try:
+        with open('/proc/cpuinfo') as f:
+            processor = next(line.split(':', 1)[1].strip() for line in f if line.startswith('model name'))
+    except (OSError, StopIteration):
+        pass
+
+    try:
+        memory_gb = round(os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') / 1024 ** 3, 1)
+    except (ValueError, OSError, AttributeError):
+        memory_gb = None
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    packages = {}
+    for name in ('Flask', 'Flask-SQLAlchemy', 'SQLAlchemy', 'numpy', 'scikit-learn', 'Werkzeug'):
+        try:
+            packages[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            packages[name] = None
+
+    return {
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'processor': processor,
+        'cpu_count': os.cpu_count(),
+        'memory_gb': memory_gb,
+        'git_commit': commit,
+        'packages': packages
+    }
+
+def synthetic_columns(n_rows, seed):
+    """Feature columns for n_rows customers, identical for the same seed"""
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    tenure = rng.integers(1, 73, n_rows)
+    monthly_charges = rng.integers(500, 3501, n_rows)
+    return {
+        'tenure': tenure,
+        'monthly_charges': monthly_charges,
+        'total_charges': tenure * monthly_charges,
+        'contract_type': rng.choice(CONTRACT_TYPES, n_rows),
+        'payment_method': rng.choice(PAYMENT_METHODS, n_rows)
+    }
+
+def seed_predictions(user_id, n_rows, predictor):
+    """Insert n_rows scored predictions for a user, spread over the last year"""
+    from models import db, Prediction
+
+    end = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    for start in range(0, n_rows, SEED_CHUNK):
+        count = min(SEED_CHUNK, n_rows - start)
+        columns = synthetic_columns(count, seed=start)
+        predictions, probabilities = predictor.predict_batch(**columns)
+        rows = [{
+            'user_id': user_id,
+            'customer_name': f'Customer {start + i}',
+            'tenure': float(columns['tenure'][i]),
+            'monthly_charges': float(columns['monthly_charges'][i]),
+            'total_charges': float(columns['total_charges'][i]),
+            'contract_type': str(columns['contract_type'][i]),
+            'payment_method': str(columns['payment_method'][i]),
+            'prediction': int(predictions[i]),
+            'probability': float(probabilities[i]),
+            'created_at': end - timedelta(seconds=(start + i) * 31536000 // n_rows)
+        } for i in range(count)]
+        Prediction.bulk_insert(rows, batch_size=5000)
+        db.session.commit()
+
+def synthetic_csv(n_rows):
+    """A /bulk-predict upload with n_rows customers"""
+    columns = synthetic_columns(n_rows, seed=n_rows)
+    lines = ['customer_name,tenure,monthly_charges,total_charges,contract_type,payment_method']
+    lines.extend(f'Upload {i},{columns["tenure"][i]},{columns["monthly_charges"][i]},{columns["total_charges"][i]},'
+                 f'{columns["contract_type"][i]},{columns["payment_method"][i]}' for i in range(n_rows))
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+def timed(fn, repeat, warmup=1):
+    """Run fn warmup times untimed (template compilation, caches), then repeat times; returns the wall times in seconds"""
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+def summarize(times, items=None):
+    summary = {
+        'runs': [round(t, 6) for t in times],
+        'median_s': round(statistics.median(times), 6),
+        'min_s': round(min(times), 6),
+        'max_s': round(max(times), 6)
+    }
+    if items:
+        summary['items'] = items
+        summary['items_per_s'] = round(items / statistics.median(times), 1)
+    return summary
+
+def login(app, username, password):
+    client = app.test_client()
+    response = client.post('/auth/login', data={'username': username, 'password': password})
+    if response.status_code != 302:
+        raise RuntimeError(f'Login as {username} failed')
+    return client
+
+def get_ok(client, path):
+    """GET a page, consuming streamed bodies, and fail loudly on errors"""
+    response = client.get(path)
+    if response.status_code != 200:
+        raise RuntimeError(f'GET {path} returned {response.status_code}')
+    return response.get_data()
+
+def run_bulk_upload(client, payload):
+    """Upload a CSV to /bulk-predict and wait until its job has finished"""
+    response = client.post('/bulk-predict', data={'csv_file': (io.BytesIO(payload), 'benchmark.csv')},
+                           content_type='multipart/form-data')
+    job_id = int(response.headers['Location'].rsplit('job_id=', 1)[1])
+    while True:
+        status = client.get(f'/api/jobs/{job_id}').get_json()['status']
+        if status == 'completed':
+            return
+        if status == 'failed':
+            raise RuntimeError(f'Bulk job {job_id} failed')
+        time.sleep(0.01)
+
+def history_deep_path(user_id, page):
+    """/history URL of the given page (cursors point at the last row of the previous page)"""
+    from models import Prediction
+    from sqlalchemy import desc
+    from pagination_utils import encode_cursor
+
+    boundary = Prediction.query.filter_by(user_id=user_id)\
+        .order_by(desc(Prediction.created_at), desc(Prediction.id))\
+        .offset((page - 1) * 10 - 1).first()
+    return f"/history?cursor={encode_cursor(boundary, 'next')}" if boundary else None
+
+def run_suite(sizes, repeat, output):
+    scratch = tempfile.mkdtemp()
+    os.environ.update(
+        DATABASE_URL=f"sqlite:///{os.path.join(scratch, 'benchmark.db')}",
+        JOB_FOLDER=os.path.join(scratch, 'jobs'),
+        MODEL_WATCH_INTERVAL='0',
+        OUTBOX_POLL_INTERVAL='0',
+        PROFILING_ENABLED='false',
+        # Every single prediction must reach the model, not the result cache
+        PREDICTION_CACHE_SIZE='0'
+    )
+    sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+
+    from app_flask import create_app, init_database
+    from models import db, User, Prediction
+    from ml_utils import predictor
+
+    # Large exports and uploads are expected to exceed the slow-request thresholds
+    logging.getLogger('query_utils').setLevel(logging.ERROR)
+
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+
+    print("📊 Benchmark suite")
+    print("=" * 50)
+    info = machine_info()
+    print(f"🖥️  {info['processor']} ({info['cpu_count']} CPUs), Python {info['python']}, commit {info['git_commit']}")
+
+    results = {}
+
+    def record(name, summary):
+        results[name] = summary
+        rate = f"  {summary['items_per_s']:>12,.0f} items/s" if 'items_per_s' in summary else ''
+        print(f"⏱️  {name:<32} median {summary['median_s'] * 1000:10.2f} ms{rate}")
+
+    with app.app_context():
+        init_database()
+        predictor.get()
+
+        single = synthetic_columns(SINGLE_CALLS, seed=0)
+        inputs = [tuple(single[name][i] for name in single) for i in range(SINGLE_CALLS)]
+        times = timed(lambda: [predictor.predict(*customer) for customer in inputs], repeat)
+        record('predict_single', summarize(times, items=SINGLE_CALLS))
+
+        users = {}
+        for label, n_rows in sizes:
+            user = User(username=f'bench_{label}', email=f'bench_{label}@example.com')
+            user.set_password('bench123')
+            db.session.add(user)
+            db.session.commit()
+            users[label] = user.id
+
+            start = time.perf_counter()
+            seed_predictions(user.id, n_rows, predictor)
+            print(f"🌱 Seeded {n_rows:,} predictions for {label} in {time.perf_counter() - start:.1f}s")
+
+        bulk_user = User(username='bench_bulk', email='bench_bulk@example.com')
+        bulk_user.set_password('bench123')
+        db.session.add(bulk_user)
+        db.session.commit()
+        bulk_user_id = bulk_user.id
+
+    for label, n_rows in sizes:
+        print(f"\n📦 {label} ({n_rows:,} predictions)")
+        columns = synthetic_columns(n_rows, seed=1)
+        times = timed(lambda: predictor.predict_batch(**columns), repeat)
+        record(f'predict_batch[{label}]', summarize(times, items=n_rows))
+
+        client = login(app, f'bench_{label}', 'bench123')
+        with app.app_context():
+            deep_path = history_deep_path(users[label], HISTORY_DEEP_PAGE)
+
+        record(f'history_first_page[{label}]', summarize(timed(lambda: get_ok(client, '/history'), repeat)))
+        if deep_path:
+            record(f'history_page_{HISTORY_DEEP_PAGE}[{label}]',
+                   summarize(timed(lambda: get_ok(client, deep_path), repeat)))
+        record(f'export_csv[{label}]', summarize(timed(lambda: get_ok(client, '/export-data'), repeat, warmup=0), items=n_rows))
+        record(f'dashboard[{label}]', summarize(timed(lambda: get_ok(client, '/dashboard'), repeat)))
+        record(f'prediction_stats[{label}]',
+               summarize(timed(lambda: get_ok(client, '/api/prediction-stats'), repeat)))
+
+        payload = synthetic_csv(n_rows)
+        bulk_client = login(app, 'bench_bulk', 'bench123')
+
+        def bulk_upload():
+            run_bulk_upload(bulk_client, payload)
+            # Start each run from the same table size
+            with app.app_context():
+                Prediction.delete_for_user(bulk_user_id)
+                db.session.commit()
+
+        record(f'bulk_predict[{label}]', summarize(timed(bulk_upload, repeat, warmup=0), items=n_rows))
+
+    admin = login(app, 'admin', 'admin123')
+    print()
+    record('admin_dashboard[all]', summarize(timed(lambda: get_ok(admin, '/admin/dashboard'), repeat)))
+
+    report = {
+        'created_at': datetime.utcnow().isoformat(),
+        'machine': info,
+        'settings': {'sizes': [label for label, _ in sizes], 'repeat': repeat, 'database': 'sqlite'},
+        'results': results
+    }
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{info['git_commit'] or 'nogit'}.json")
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Results written to {output}")
+
+def compare(baseline_path, current_path, threshold):
+    """Print median changes per benchmark; returns the number of regressions"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(current_path) as f:
+        current = json.load(f)
+
+    print(f"📊 Comparing {os.path.basename(current_path)} against {os.path.basename(baseline_path)}")
+    print("=" * 50)
+    for key in ('processor', 'cpu_count', 'python'):
+        if baseline['machine'].get(key) != current['machine'].get(key):
+            print(f"⚠️  Different {key}: {baseline['machine'].get(key)} vs {current['machine'].get(key)}")
+
+    regressions = 0
+    print(f"\n   {'benchmark':<32} {'baseline ms':>12} {'current ms':>12} {'change':>9}")
+    for name, result in current['results'].items():
+        old = baseline['results'].get(name)
+        if old is None:
+            print(f"🆕 {name:<32} {'-':>12} {result['median_s'] * 1000:12.2f}")
+            continue
+        change = (result['median_s'] - old['median_s']) / old['median_s'] * 100
+        if change > threshold:
+            regressions += 1
+            icon = '❌'
+        elif change < -threshold:
+            icon = '🚀'
+        else:
+            icon = '✅'
+        print(f"{icon} {name:<32} {old['median_s'] * 1000:12.2f} {result['median_s'] * 1000:12.2f} {change:+8.1f}%")
+
+    for name in baseline['results'].keys() - current['results'].keys():
+        print(f"➖ {name:<32} not in the current run")
+
+    if regressions:
+        print(f"\n❌ {regressions} benchmarks are more than {threshold:g}% slower")
+    else:
+        print(f"\n🎉 No benchmark is more than {threshold:g}% slower")
+    return regressions
+
+def parse_sizes(value):
+    sizes = []
+    for label in value.split(','):
+        label = label.strip()
+        if label not in SIZE_LABELS:
+            raise argparse.ArgumentTypeError(f"unknown size {label}, choose from {', '.join(SIZE_LABELS)}")
+        sizes.append((label, SIZE_LABELS[label]))
+    return sizes
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark suite for the churn prediction app')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Run the benchmarks and write a JSON result file')
+    run_parser.add_argument('--sizes', type=parse_sizes, default=parse_sizes(DEFAULT_SIZES),
+                            help=f'Dataset sizes (default {DEFAULT_SIZES})')
+    run_parser.add_argument('--repeat', type=int, default=3, help='Runs per benchmark (default 3)')
+    run_parser.add_argument('--output', help='Result file (default benchmark_results/<time>-<commit>.json)')
+
+    compare_parser = commands.add_parser('compare', help='Flag regressions between two result files')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=10,
+                                help='Percent slowdown of the median counted as a regression (default 10)')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run_suite(args.sizes, args.repeat, args.output)
+    else:
+        sys.exit(1 if compare(args.baseline, args.current, args.threshold) else 0)
+
+if __name__ == '__main__':
+    main()
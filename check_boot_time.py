@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Boot-time regression check for the Flask app
+Boots the app in fresh interpreters and exits non-zero when the median boot
+(imports + create_app) exceeds the budget or when modules that should be
+deferred until first use are loaded at boot
+
+Usage: python check_boot_time.py [budget seconds, default BOOT_TIME_BUDGET or 3.0]
+"""
+
+import sys
+import os
+import json
+import statistics
+import subprocess
+
+from profile_startup import ROOT, boot_env
+
+# Modules that must not be imported (or work that must not run) while booting
+DEFERRED_MODULES = ('sklearn', 'pandas', 'plotly', 'email_utils')
+
+CHILD_CODE = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, %r)
+from app_flask import create_app
+create_app()
+boot_seconds = time.perf_counter() - start
+import ml_utils
+print(json.dumps({
+    'boot_seconds': boot_seconds,
+    'loaded_modules': [name for name in %r if name in sys.modules],
+    'model_loaded': ml_utils.predictor._instance is not None
+}))
+"""
+
+def boot_once():
+    output = subprocess.run(
+        [sys.executable, '-W', 'ignore', '-c', CHILD_CODE % (os.path.join(ROOT, 'backend'), DEFERRED_MODULES)],
+        env=boot_env(), capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def check_boot_time(budget, runs=3):
+    print("🧪 Checking app boot time...")
+    print("=" * 50)
+
+    results = [boot_once() for _ in range(runs)]
+    median = statistics.median(r['boot_seconds'] for r in results)
+    failures = 0
+
+    ok = median <= budget
+    failures += not ok
+    print(f"{'✅' if ok else '❌'} Median boot {median:.3f}s (budget {budget:.1f}s, {runs} runs)")
+
+    loaded = sorted({name for r in results for name in r['loaded_modules']})
+    failures += bool(loaded)
+    print(f"{'❌' if loaded else '✅'} Deferred modules imported at boot: {', '.join(loaded) or 'none'}")
+
+    model_loaded = any(r['model_loaded'] for r in results)
+    failures += model_loaded
+    print(f"{'❌' if model_loaded else '✅'} Model loaded at boot: {'yes' if model_loaded else 'no'}")
+
+    if failures:
+        print(f"\n❌ {failures} boot check(s) failed (run profile_startup.py to see where the time goes)")
+    else:
+        print("\n🎉 Boot is within budget")
+    return failures == 0
+
+if __name__ == '__main__':
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else float(os.environ.get('BOOT_TIME_BUDGET') or 3.0)
+    if not check_boot_time(budget):
+        sys.exit(1)
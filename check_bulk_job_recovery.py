@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Check that bulk jobs left behind by an exited worker are resumed
+Seeds a throwaway SQLite database with jobs as a killed worker leaves them:
+queued with its upload spooled, running with a third of its rows committed
+(and result rows of an uncommitted chunk after them), running after using
+up its attempts, queued with the upload gone, and running with a fresh
+heartbeat (still alive). The first request of a new worker must finish the
+first two without duplicating rows, fail the next two and leave the live
+job alone.
+"""
+
+import sys
+import os
+import csv
+import time
+import tempfile
+from datetime import datetime, timedelta
+
+scratch = tempfile.mkdtemp()
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{os.path.join(scratch, 'job_recovery.db')}",
+    JOB_FOLDER=os.path.join(scratch, 'jobs'),
+    MODEL_WATCH_INTERVAL='0',
+    OUTBOX_POLL_INTERVAL='0',
+    BULK_JOB_STALE_SECONDS='60',
+    BULK_JOB_MAX_ATTEMPTS='3'
+)
+
+# Add the backend directory to Python path
+backend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+sys.path.insert(0, backend_path)
+
+from app_flask import create_app, init_database
+from config import Config
+from models import db, User, BulkJob, Prediction
+from job_utils import upload_path, result_path, RESULT_COLUMNS
+
+HEADER = 'customer_name,tenure,monthly_charges,total_charges,contract_type,payment_method\n'
+
+def write_upload(job_id, prefix, n_rows):
+    with open(upload_path(job_id), 'w') as f:
+        f.write(HEADER)
+        f.writelines(f'{prefix} {i},{i + 1},1500,{(i + 1) * 1500},Month-to-month,UPI\n' for i in range(n_rows))
+
+def seed():
+    init_database()
+    user = User.query.filter_by(username='demo_user').first()
+    long_ago = datetime.utcnow() - timedelta(minutes=10)
+    running = dict(status='running', created_at=long_ago, started_at=long_ago, heartbeat_at=long_ago)
+    jobs = {
+        'queued': BulkJob(user_id=user.id, filename='queued.csv', status='queued', created_at=long_ago),
+        'running': BulkJob(user_id=user.id, filename='running.csv', rows_processed=10, success_count=10,
+                           attempts=1, **running),
+        'exhausted': BulkJob(user_id=user.id, filename='exhausted.csv', rows_processed=10, success_count=10,
+                             attempts=3, **running),
+        'lost': BulkJob(user_id=user.id, filename='lost.csv', status='queued', created_at=long_ago),
+        'alive': BulkJob(user_id=user.id, filename='alive.csv', rows_processed=5000, success_count=5000,
+                         attempts=1, **dict(running, heartbeat_at=datetime.utcnow()))
+    }
+    db.session.add_all(jobs.values())
+    db.session.commit()
+
+    os.makedirs(Config.JOB_FOLDER, exist_ok=True)
+    write_upload(jobs['queued'].id, 'Queued', 20)
+    write_upload(jobs['running'].id, 'Resumed', 30)
+    write_upload(jobs['exhausted'].id, 'Exhausted', 30)
+
+    # The killed run committed rows 2-11 and wrote result rows for part of the next chunk
+    Prediction.bulk_insert([{
+        'user_id': user.id, 'customer_name': f'Resumed {i}', 'tenure': i + 1, 'monthly_charges': 1500,
+        'total_charges': (i + 1) * 1500, 'contract_type': 'Month-to-month', 'payment_method': 'UPI',
+        'prediction': 1, 'probability': 0.9
+    } for i in range(10)])
+    db.session.commit()
+    with open(result_path(jobs['running'].id), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(RESULT_COLUMNS)
+        writer.writerows([i + 2, f'Resumed {i}', 'success', 'Churn', 90, '90.0%', ''] for i in range(13))
+
+    return {name: job.id for name, job in jobs.items()}
+
+def report(ok, message):
+    print(f"{'✅' if ok else '❌'} {message}")
+    return not ok
+
+def check_bulk_job_recovery():
+    app = create_app()
+    with app.app_context():
+        job_ids = seed()
+        stale_before = {name: db.session.get(BulkJob, job_id).to_dict()['stale']
+                        for name, job_id in job_ids.items()}
+
+    print("🔍 Checking recovery of bulk jobs left by an exited worker...")
+    print("=" * 50)
+    failures = report(stale_before == {'queued': True, 'running': True, 'exhausted': True, 'lost': True,
+                                       'alive': False},
+                      f"Abandoned jobs are reported as stale ({stale_before})")
+
+    # The first request of a new worker starts the takeover
+    app.test_client().get('/auth/login')
+
+    deadline = time.time() + 15
+    while True:
+        with app.app_context():
+            jobs = {name: db.session.get(BulkJob, job_id) for name, job_id in job_ids.items()}
+            saved = {prefix: Prediction.query.filter(Prediction.customer_name.like(f'{prefix} %')).count()
+                     for prefix in ('Queued', 'Resumed', 'Exhausted')}
+            if (jobs['queued'].is_finished() and jobs['running'].is_finished()) or time.time() > deadline:
+                break
+        time.sleep(0.1)
+
+    with open(result_path(job_ids['running']), newline='') as f:
+        result_rows = [int(row['row']) for row in csv.DictReader(f)]
+
+    failures += report(jobs['queued'].status == 'completed' and saved['Queued'] == 20,
+                       f"Queued job was processed ({jobs['queued'].status}, {saved['Queued']}/20 saved)")
+    failures += report(jobs['running'].status == 'completed' and jobs['running'].rows_processed == 30
+                       and saved['Resumed'] == 30,
+                       f"Interrupted job resumed after its committed rows ({jobs['running'].status}, "
+                       f"{jobs['running'].rows_processed}/30 rows, {saved['Resumed']}/30 predictions, "
+                       f"attempt {jobs['running'].attempts})")
+    failures += report(result_rows == list(range(2, 32)),
+                       f"Results CSV has each row once ({len(result_rows)} rows)")
+    failures += report(jobs['exhausted'].status == 'failed' and saved['Exhausted'] == 0,
+                       f"Job out of attempts was failed ({jobs['exhausted'].error_message})")
+    failures += report(jobs['lost'].status == 'failed',
+                       f"Job without its upload was failed ({jobs['lost'].error_message})")
+    failures += report(jobs['alive'].status == 'running', "Running job with a fresh heartbeat was left alone")
+
+    if failures:
+        print(f"\n❌ {failures} checks failed")
+    else:
+        print("\n🎉 Abandoned bulk jobs are resumed")
+    return failures == 0
+
+if __name__ == '__main__':
+    sys.exit(0 if check_bulk_job_recovery() else 1)
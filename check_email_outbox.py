@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Check email outbox delivery against a local SMTP sink
+Email routes must return without waiting on SMTP, queued emails must share
+one SMTP connection, and failed sends must be retried with backoff until
+the server is back. Bulk reports must queue only the parameters of their
+attachment, which the sender renders. Sent rows must drop their content and
+expire after OUTBOX_RETENTION_DAYS. Runs against a throwaway SQLite database.
+"""
+
+import sys
+import os
+import gzip
+import tempfile
+import time
+from email import message_from_bytes
+from datetime import datetime, timedelta
+
+from local_smtp_server import LocalSMTPServer
+
+# A slow SMTP handshake shows whether the routes wait on it
+smtp = LocalSMTPServer(connect_delay=0.5).start()
+
+scratch = tempfile.mkdtemp()
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{os.path.join(scratch, 'outbox.db')}",
+    JOB_FOLDER=os.path.join(scratch, 'jobs'),
+    MODEL_WATCH_INTERVAL='0',
+    MAIL_SERVER='127.0.0.1',
+    MAIL_PORT=str(smtp.port),
+    MAIL_USE_TLS='false',
+    OUTBOX_POLL_INTERVAL='0.1',
+    OUTBOX_RETRY_BASE_SECONDS='0.2'
+)
+
+# Add the backend directory to Python path
+backend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+sys.path.insert(0, backend_path)
+
+from app_flask import create_app, init_database
+from models import db, EmailOutbox
+
+N_EMAILS = 10
+
+def wait_for(condition, timeout=15):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+def statuses(app):
+    with app.app_context():
+        db.session.remove()
+        return [message.status for message in EmailOutbox.query.order_by(EmailOutbox.id)]
+
+def check_email_outbox():
+    global smtp
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        init_database()
+
+    client = app.test_client()
+    client.post('/auth/login', data={'username': 'demo_user', 'password': 'user123'})
+    # More predictions than EMAIL_INLINE_ROWS, so the bulk report has an attachment
+    for i in range(30):
+        client.post('/api/predict?persist=true', json={'customer_name': f'Outbox Check {i}', 'tenure': 12,
+                                                       'monthly_charges': 1500, 'total_charges': 18000,
+                                                       'contract_type': 'Month-to-month', 'payment_method': 'UPI'})
+
+    print("📧 Checking email outbox delivery...")
+    print("=" * 50)
+    failures = 0
+
+    start = time.perf_counter()
+    for _ in range(N_EMAILS):
+        client.post('/send-bulk-email', data={'recipient_email': 'outbox@example.com'})
+    per_request = (time.perf_counter() - start) / N_EMAILS
+    ok = per_request < smtp.connect_delay
+    failures += not ok
+    print(f"{'✅' if ok else '❌'} Email route returned in {per_request * 1000:.1f} ms per request "
+          f"(SMTP handshake takes {smtp.connect_delay * 1000:.0f} ms)")
+
+    delivered = wait_for(lambda: len(smtp.messages) == N_EMAILS and statuses(app).count('sent') == N_EMAILS)
+    failures += not delivered
+    print(f"{'✅' if delivered else '❌'} Delivered {len(smtp.messages)}/{N_EMAILS} emails")
+
+    ok = smtp.connections == 1
+    failures += not ok
+    print(f"{'✅' if ok else '❌'} SMTP connections used: {smtp.connections}")
+
+    # The request stored the report parameters; the delivered email carries the rendered file
+    with app.app_context():
+        queued = EmailOutbox.query.first()
+        stored = queued.attachment_name is not None and queued.attachment_data is None
+    delivered_csv = None
+    for part in message_from_bytes(smtp.messages[0]['data']).walk():
+        if part.get_filename():
+            delivered_csv = gzip.decompress(part.get_payload(decode=True)).decode('utf-8')
+    ok = stored and delivered_csv is not None and delivered_csv.count('Outbox Check') == 30
+    failures += not ok
+    print(f"{'✅' if ok else '❌'} Bulk report attachment rendered by the sender "
+          f"({delivered_csv.count('Outbox Check') if delivered_csv else 0}/30 rows, no data stored by the request)")
+
+    # Take the server away: sends fail and are retried with backoff
+    port = smtp.port
+    smtp.stop()
+    with app.app_context():
+        from outbox_utils import outbox_sender
+        outbox_sender.close()
+    client.post('/send-bulk-email', data={'recipient_email': 'retry@example.com'})
+
+    def retried():
+        with app.app_context():
+            db.session.remove()
+            message = EmailOutbox.query.order_by(EmailOutbox.id.desc()).first()
+            return message.attempts >= 2 and message.status == 'pending'
+
+    ok = wait_for(retried)
+    failures += not ok
+    with app.app_context():
+        message = EmailOutbox.query.order_by(EmailOutbox.id.desc()).first()
+        print(f"{'✅' if ok else '❌'} Failed send scheduled for retry: attempt {message.attempts}, "
+              f"status {message.status}, error: {message.last_error}")
+
+    smtp = LocalSMTPServer(port=port).start()
+    delivered = wait_for(lambda: statuses(app)[-1] == 'sent')
+    failures += not delivered
+    print(f"{'✅' if delivered else '❌'} Retried email delivered after the server came back")
+
+    # Delivered mail keeps only its envelope, and expires after OUTBOX_RETENTION_DAYS
+    with app.app_context():
+        from outbox_utils import purge_sent_messages
+        db.session.remove()
+        sent = EmailOutbox.query.filter_by(status='sent').all()
+        ok = all(message.html_body == '' and message.attachment_data is None and message.attachment_query is None
+                 for message in sent)
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} Bodies and attachments of {len(sent)} sent emails were dropped")
+
+        EmailOutbox.query.filter_by(id=sent[0].id).update({'sent_at': datetime.utcnow() - timedelta(days=365)})
+        db.session.commit()
+        deleted = purge_sent_messages()
+        ok = deleted == 1 and EmailOutbox.query.filter_by(status='sent').count() == len(sent) - 1
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} Purge deleted {deleted} expired sent email, kept the recent ones")
+
+    smtp.stop()
+    if failures:
+        print(f"\n❌ {failures} outbox check(s) failed")
+    else:
+        print("\n🎉 Email outbox works")
+    return failures == 0
+
+if __name__ == '__main__':
+    if not check_email_outbox():
+        sys.exit(1)
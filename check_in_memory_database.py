@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Check that nothing touches an in-memory SQLite database from a background thread
+Render without DATABASE_URL runs on sqlite:///:memory:, a single connection
+shared by every thread; a background commit or rollback on it would discard
+the transaction of whichever request is running. Emails and bulk uploads must
+be processed in the request instead of by the outbox sender and the bulk job
+pool, and the data written by requests must survive.
+"""
+
+import sys
+import os
+import io
+import tempfile
+import threading
+
+from local_smtp_server import LocalSMTPServer
+
+smtp = LocalSMTPServer().start()
+
+# The Render default: PORT set, no DATABASE_URL
+os.environ.pop('DATABASE_URL', None)
+os.environ.update(
+    PORT='10000',
+    JOB_FOLDER=os.path.join(tempfile.mkdtemp(), 'jobs'),
+    MODEL_WATCH_INTERVAL='0',
+    MAIL_SERVER='127.0.0.1',
+    MAIL_PORT=str(smtp.port),
+    MAIL_USE_TLS='false',
+    OUTBOX_POLL_INTERVAL='0.1'
+)
+
+# Add the backend directory to Python path
+backend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+sys.path.insert(0, backend_path)
+
+from app_flask import create_app
+from config import Config
+from models import Prediction, EmailOutbox, BulkJob
+
+def background_threads():
+    return sorted(thread.name for thread in threading.enumerate()
+                  if thread.name == 'email-outbox' or thread.name.startswith('bulk-job'))
+
+def report(ok, message):
+    print(f"{'✅' if ok else '❌'} {message}")
+    return not ok
+
+def check_in_memory_database():
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+
+    print("🔍 Checking background work on an in-memory database...")
+    print("=" * 50)
+    failures = report(Config.IN_MEMORY_DATABASE, f"Database is in memory ({Config.SQLALCHEMY_DATABASE_URI})")
+
+    client = app.test_client()
+    client.post('/auth/login', data={'username': 'demo_user', 'password': 'user123'})
+    for i in range(3):
+        client.post('/api/predict?persist=true', json={'customer_name': f'Memory Check {i}', 'tenure': 12,
+                                                       'monthly_charges': 1500, 'total_charges': 18000,
+                                                       'contract_type': 'Month-to-month', 'payment_method': 'UPI'})
+    client.post('/send-bulk-email', data={'recipient_email': 'memory@example.com'})
+    upload = 'customer_name,tenure,monthly_charges,total_charges,contract_type,payment_method\n' + ''.join(
+        f'Memory Bulk {i},{i + 1},1200,{(i + 1) * 1200},One year,Credit Card\n' for i in range(50))
+    client.post('/bulk-predict', data={'csv_file': (io.BytesIO(upload.encode()), 'memory.csv')},
+                content_type='multipart/form-data')
+
+    with app.app_context():
+        statuses = [message.status for message in EmailOutbox.query.all()]
+        saved = Prediction.query.filter(Prediction.customer_name.like('Memory Check %')).count()
+        bulk_saved = Prediction.query.filter(Prediction.customer_name.like('Memory Bulk %')).count()
+        jobs = [(job.status, job.rows_processed) for job in BulkJob.query.all()]
+
+    failures += report(not background_threads(), f"No background thread was started ({background_threads()})")
+    failures += report(statuses == ['sent'] and len(smtp.messages) == 1,
+                       f"Email delivered during the request (outbox: {statuses}, received {len(smtp.messages)})")
+    failures += report(saved == 3, f"Predictions written by requests are kept ({saved}/3)")
+    failures += report(jobs == [('completed', 50)] and bulk_saved == 50,
+                       f"Bulk upload processed during the request (jobs: {jobs}, saved {bulk_saved}/50)")
+
+    if failures:
+        print(f"\n❌ {failures} checks failed")
+    else:
+        print("\n🎉 Background work stays off the in-memory database")
+    smtp.stop()
+    return failures == 0
+
+if __name__ == '__main__':
+    sys.exit(0 if check_in_memory_database() else 1)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Check that the main pages stay within their SQL query budgets
+Seeds a throwaway SQLite database with several users and predictions, requests
+each page through the test client with SQL_QUERY_BUDGET_ENFORCE on and exits
+non-zero when a route runs more statements than its @query_budget or repeats
+a statement (N+1). History is also requested filtered by prediction and date
+range, and page 2 is reached through the cursor of page 1's Next link
+"""
+
+import sys
+import os
+import re
+import html
+import logging
+import tempfile
+from datetime import datetime, timedelta
+
+# Use a scratch database so the check never touches real data
+scratch = tempfile.mkdtemp()
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{os.path.join(scratch, 'query_budgets.db')}",
+    JOB_FOLDER=os.path.join(scratch, 'jobs'),
+    MODEL_WATCH_INTERVAL='0',
+    OUTBOX_POLL_INTERVAL='0',
+    SQL_QUERY_BUDGET_ENFORCE='true'
+)
+
+# Add the backend directory to Python path
+backend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+sys.path.insert(0, backend_path)
+
+from app_flask import create_app, init_database
+from models import db, User, Prediction
+from query_utils import QueryBudgetExceeded
+
+N_USERS = 12
+PREDICTIONS_PER_USER = 30
+
+# Churn predictions of the last four weeks (14 rows, two pages): the count comes from the daily rollups
+FILTERED_HISTORY = '/history?prediction_filter=1&from_date={:%Y-%m-%d}&to_date={:%Y-%m-%d}'.format(
+    datetime.utcnow() - timedelta(days=27), datetime.utcnow())
+
+# Follow the "Next" link of the previous page, so the request carries a real keyset cursor
+NEXT_PAGE = 'next page'
+
+PAGES = {
+    'demo_user': ['/dashboard', '/history', NEXT_PAGE, FILTERED_HISTORY, NEXT_PAGE, '/api/prediction-stats',
+                  '/api/monthly-trend'],
+    'admin': ['/admin/dashboard', '/admin/api/user-activity', '/admin/api/prediction-trends',
+              '/admin/api/user/2'],
+}
+
+class RepeatCollector(logging.Handler):
+    """Collects the N+1 warnings logged by query_utils"""
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.repeats = []
+
+    def emit(self, record):
+        if record.getMessage().startswith('Possible N+1'):
+            self.repeats.append(record.getMessage())
+
+def seed():
+    init_database()
+    now = datetime.utcnow()
+    for i in range(N_USERS):
+        user = User(username=f'budget_user_{i}', email=f'budget{i}@example.com')
+        user.set_password('budget123')
+        db.session.add(user)
+    db.session.commit()
+
+    rows = []
+    for user in User.query.all():
+        rows.extend({
+            'user_id': user.id,
+            'customer_name': f'Customer {j}',
+            'tenure': j + 1,
+            'monthly_charges': 800 + j,
+            'total_charges': (j + 1) * (800 + j),
+            'contract_type': 'Month-to-month',
+            'payment_method': 'UPI',
+            'prediction': j % 2,
+            'probability': 0.3 + (j % 2) * 0.4,
+            'risk_score': 30 + (j % 2) * 40,
+            'created_at': now - timedelta(days=j)
+        } for j in range(PREDICTIONS_PER_USER))
+    Prediction.bulk_insert(rows)
+    db.session.commit()
+
+def next_page_path(page):
+    """The href of a history page's Next link, or None"""
+    match = re.search(r'<a class="page-link" href="([^"]+)">Next</a>', page)
+    return html.unescape(match.group(1)) if match else None
+
+def check_query_budgets():
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+    # Let QueryBudgetExceeded reach the test client instead of becoming a 500
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        seed()
+
+    collector = RepeatCollector()
+    logging.getLogger('query_utils').addHandler(collector)
+
+    print("🔍 Checking SQL query budgets...")
+    print("=" * 50)
+
+    failures = 0
+    for username, paths in PAGES.items():
+        client = app.test_client()
+        client.post('/auth/login', data={'username': username,
+                                         'password': 'admin123' if username == 'admin' else 'user123'})
+        previous_page = ''
+        for path in paths:
+            if path == NEXT_PAGE:
+                path = next_page_path(previous_page)
+                if path is None:
+                    failures += 1
+                    print("❌ No Next link to follow")
+                    continue
+            collector.repeats.clear()
+            try:
+                response = client.get(path)
+            except QueryBudgetExceeded as e:
+                failures += 1
+                print(f"❌ {path}: {e}")
+                continue
+            previous_page = response.get_data(as_text=True)
+            if response.status_code != 200:
+                failures += 1
+                print(f"❌ {path}: HTTP {response.status_code}")
+            elif re.search(r'Invalid (page link|from date|to date)', previous_page):
+                # The route flashes and falls back to unfiltered results for bad cursors and dates
+                failures += 1
+                print(f"❌ {path}: parameters were rejected")
+            elif collector.repeats:
+                failures += 1
+                print(f"❌ {path}: repeated statements")
+                for message in collector.repeats:
+                    print(f"     {message}")
+            else:
+                print(f"✅ {path}")
+
+    if failures:
+        print(f"\n❌ {failures} pages are over budget or repeat statements")
+    else:
+        print("\n🎉 All pages are within their query budgets")
+    return failures == 0
+
+if __name__ == '__main__':
+    sys.exit(0 if check_query_budgets() else 1)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Check that the hot Prediction queries use an index (SQLite EXPLAIN QUERY PLAN)
+Runs against a throwaway SQLite database and exits non-zero on a full table scan
+"""
+
+import sys
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+# Use a scratch database so the check never touches real data
+scratch_db = os.path.join(tempfile.mkdtemp(), 'query_plans.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{scratch_db}'
+
+# Add the backend directory to Python path
+backend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+sys.path.insert(0, backend_path)
+
+from app_flask import create_app, init_database
+from models import db, Prediction
+from sqlalchemy import desc
+
+def hot_queries(user_id):
+    """
+    The Prediction queries issued by the routes, keyed by where they come from
+    (stats and trend charts read the rollup tables instead)
+    """
+    since = datetime.utcnow() - timedelta(days=30)
+    by_user = Prediction.query.filter_by(user_id=user_id)
+
+    return {
+        'main.history': by_user.order_by(desc(Prediction.created_at)).limit(10),
+        'main.history (filtered)': by_user.filter(Prediction.prediction == 1,
+                                                  Prediction.created_at >= since)
+                                          .order_by(desc(Prediction.created_at)).limit(10),
+        'main.dashboard recent': by_user.order_by(desc(Prediction.created_at)).limit(5),
+        'main.send_bulk_email': by_user.order_by(desc(Prediction.created_at)).limit(50),
+        'main.export_email': by_user.order_by(desc(Prediction.created_at)),
+    }
+
+def explain(query):
+    """Return the EXPLAIN QUERY PLAN detail lines for an ORM query"""
+    compiled = query.statement.compile(dialect=db.engine.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    with db.engine.connect() as conn:
+        rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + str(compiled), params).fetchall()
+    return [row[-1] for row in rows]
+
+def uses_index(plan):
+    """True unless the plan scans the prediction table without an index"""
+    for detail in plan:
+        if detail.startswith('SCAN prediction') and 'INDEX' not in detail:
+            return False
+    return True
+
+def check_query_plans():
+    app = create_app()
+
+    with app.app_context():
+        init_database()
+        print("🔍 Checking query plans for hot Prediction queries...")
+        print("=" * 50)
+
+        failures = 0
+        for name, query in hot_queries(user_id=1).items():
+            plan = explain(query)
+            ok = uses_index(plan)
+            failures += not ok
+            print(f"{'✅' if ok else '❌'} {name}")
+            for detail in plan:
+                print(f"     {detail}")
+
+        if failures:
+            print(f"\n❌ {failures} queries scan the prediction table")
+        else:
+            print("\n🎉 All hot queries use an index")
+        return failures == 0
+
+if __name__ == '__main__':
+    if not check_query_plans():
+        sys.exit(1)
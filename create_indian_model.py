@@ -4,12 +4,18 @@ Create an Indian model for the Customer Churn Prediction System
 This creates a model that works with Indian rupee amounts and context
 """
 
-import pickle
+import sys
 import numpy as np
 from sklearn.linear_model import LogisticRegression
 from sklearn.preprocessing import StandardScaler
 import os
 
+# Add the backend directory to Python path
+backend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+sys.path.insert(0, backend_path)
+
+from registry_utils import register_model, artifact_paths
+
 def create_indian_model():
     print("🇮🇳 Creating Indian churn prediction model...")
     
@@ -99,17 +105,13 @@ def create_indian_model():
     accuracy = model.score(X_scaled, y)
     print(f"📊 Model accuracy: {accuracy:.2%}")
     
-    # Save the model and scaler to backend directory
-    backend_dir = os.path.join(os.path.dirname(__file__), 'backend')
-    
-    model_path = os.path.join(backend_dir, 'churn_model.pkl')
-    with open(model_path, 'wb') as f:
-        pickle.dump(model, f)
+    # Register the model and scaler as a new active version in the model registry
+    # (the exporter writes a safe .npz artifact next to the pickles, which is what workers load)
+    version = register_model(model, scaler, metrics={'accuracy': round(float(accuracy), 4)})
+    artifact_path, model_path, scaler_path = artifact_paths(version)
+    print(f"✅ Registered model version {version}")
+    print(f"✅ Exported {artifact_path}")
     print(f"✅ Saved {model_path}")
-    
-    scaler_path = os.path.join(backend_dir, 'scaler.pkl')
-    with open(scaler_path, 'wb') as f:
-        pickle.dump(scaler, f)
     print(f"✅ Saved {scaler_path}")
     
     # Test the model with Indian sample data
@@ -143,7 +145,7 @@ def create_indian_model():
         print(f"  Probability: {probability:.1%}")
     
     print("\n🎉 Indian churn prediction model created successfully!")
-    print("🔄 Please restart your Flask application to load the new model.")
+    print("🔄 Running workers switch to the new version within MODEL_WATCH_INTERVAL seconds (no restart needed).")
 
 if __name__ == '__main__':
     create_indian_model()
\ No newline at end of file
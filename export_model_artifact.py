@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Export backend/churn_model.pkl + backend/scaler.pkl to the safe
+backend/churn_model.npz artifact the app loads without unpickling or sklearn
+(models registered through create_indian_model.py are exported automatically)
+"""
+
+import sys
+import os
+import pickle
+
+# Add the backend directory to Python path
+backend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+sys.path.insert(0, backend_path)
+
+from config import Config
+from artifact_utils import content_version, export_artifact, load_artifact
+
+def export_model_artifact():
+    print("📦 Exporting model artifact...")
+
+    with open(Config.MODEL_PATH, 'rb') as f:
+        model_bytes = f.read()
+    with open(Config.SCALER_PATH, 'rb') as f:
+        scaler_bytes = f.read()
+
+    version = content_version(model_bytes, scaler_bytes)
+    try:
+        export_artifact(pickle.loads(scaler_bytes), pickle.loads(model_bytes), Config.MODEL_ARTIFACT_PATH,
+                        source_version=version)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return False
+
+    artifact = load_artifact(Config.MODEL_ARTIFACT_PATH)
+    print(f"✅ Saved {Config.MODEL_ARTIFACT_PATH} ({os.path.getsize(Config.MODEL_ARTIFACT_PATH)} bytes)")
+    print(f"📊 Version: {version}")
+    print(f"📊 Features: {', '.join(artifact.header['feature_columns'])}")
+    return True
+
+if __name__ == '__main__':
+    if not export_model_artifact():
+        sys.exit(1)
@@ -1,4 +1,13 @@
 # Gunicorn configuration for Render deployment
+import gc
+import os
+import shutil
+
+# Workers write their Prometheus samples here so /metrics can add them up;
+# must be set before the app (and prometheus_client) is imported
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR',
+                      os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend', 'instance', 'prometheus'))
+
 bind = "0.0.0.0:10000"
 workers = 2
 worker_class = "sync"
@@ -7,4 +16,31 @@ timeout = 30
 keepalive = 2
 max_requests = 1000
 max_requests_jitter = 100
-preload_app = True
\ No newline at end of file
+preload_app = True
+
+def pre_fork(server, worker):
+    # The model is loaded lazily; load it once in the master so every worker shares it.
+    # Also runs before forking replacements for recycled workers, which then share the current version
+    from ml_utils import predictor
+    predictor.refresh()
+    
+    # Move the preloaded app and model into the permanent GC generation so
+    # collections in the workers do not write to (and un-share) those pages
+    gc.freeze()
+
+def post_fork(server, worker):
+    # The master's copy may predate a registry change (promotion, rollback, deactivation) it
+    # could not load; check before serving instead of waiting for the watcher's first interval
+    from ml_utils import predictor
+    predictor.refresh()
+
+def on_starting(server):
+    # Samples left by a previous run would be counted again
+    metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+def child_exit(server, worker):
+    # Drop the exited worker's live gauges; its counters and histograms are kept
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
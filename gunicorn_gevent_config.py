@@ -0,0 +1,52 @@
+# Gunicorn configuration for the gevent (async) serving profile
+# gunicorn -c gunicorn_gevent_config.py render_start:app
+#
+# Each worker serves many requests concurrently as greenlets: SMTP sends,
+# upload reads and PostgreSQL queries (with psycogreen) yield to other
+# requests instead of blocking the worker, and CPU-bound scoring runs in
+# gevent's native thread pool (see backend/concurrency_utils.py). SQLite
+# calls do not yield: they block every greenlet of the worker while they run
+
+# Install with: pip install -r requirements-gevent.txt
+
+import os
+import sys
+
+# Only the database setting is read before patching (config.py starts no threads or sockets)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+from config import Config
+
+# Every greenlet would share the single in-memory SQLite connection and interleave
+# transactions, so without DATABASE_URL this profile falls back to sync workers
+use_gevent = not Config.IN_MEMORY_DATABASE
+
+if use_gevent:
+    # Patch before anything else is imported: the app is preloaded in the master,
+    # so its locks, sockets and threads must already be the cooperative versions
+    from gevent import monkey
+    monkey.patch_all()
+
+    # psycopg2 talks to PostgreSQL in C and blocks the hub; psycogreen makes it yield while waiting
+    try:
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+    except ImportError:
+        if Config.SQLALCHEMY_DATABASE_URI.startswith('postgresql'):
+            print("⚠️ psycogreen is not installed, PostgreSQL queries will block other requests", file=sys.stderr)
+else:
+    print("⚠️ In-memory database: gevent workers disabled, serving with sync workers", file=sys.stderr)
+
+from gunicorn_config import (bind, workers, timeout, keepalive, max_requests, max_requests_jitter, preload_app, pre_fork,
+                             on_starting, child_exit)
+from gunicorn_config import post_fork as check_model_version
+
+worker_class = "gevent" if use_gevent else "sync"
+# Concurrent requests per worker; keep it within the database pool's reach
+worker_connections = int(os.environ.get('GEVENT_WORKER_CONNECTIONS') or 100)
+
+def post_fork(server, worker):
+    if use_gevent:
+        # Native threads for CPU-bound work (scoring, CSV validation) per worker
+        import gevent
+        gevent.get_hub().threadpool.maxsize = int(os.environ.get('CPU_THREADS') or os.cpu_count() or 2)
+    check_model_version(server, worker)
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+One-time database setup: create and upgrade tables, seed the default
+admin/demo users and model metrics
+Run after deploying to a new database or upgrading the app (safe to re-run)
+"""
+
+import sys
+import os
+
+# Add the backend directory to Python path
+backend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+sys.path.insert(0, backend_path)
+
+from app_flask import create_app, init_database
+from models import User
+
+def main():
+    app = create_app()
+
+    with app.app_context():
+        print("🔄 Initializing database...")
+        init_database()
+        print(f"✅ Database ready ({User.query.count()} users)")
+
+if __name__ == '__main__':
+    main()
@@ -3,7 +3,7 @@
 Initialize demo data for the Customer Churn Prediction System
 """
 
-from app_flask import create_app
+from app_flask import create_app, init_database
 from models import db, User, Prediction, ModelMetrics
 from ml_utils import predictor
 import random
@@ -13,6 +13,7 @@ def create_demo_data():
     app = create_app()
     
     with app.app_context():
+        init_database()
         print("🔄 Creating demo data...")
         
         # Get demo users
@@ -74,12 +75,13 @@ def create_demo_data():
             for i, customer in enumerate(sample_customers):
                 try:
                     # Make prediction
-                    prediction, probability = predictor.predict(
+                    prediction, probability, model_version = predictor.predict(
                         tenure=customer['tenure'],
                         monthly_charges=customer['monthly_charges'],
                         total_charges=customer['total_charges'],
                         contract_type=customer['contract_type'],
-                        payment_method=customer['payment_method']
+                        payment_method=customer['payment_method'],
+                        return_version=True
                     )
                     
                     # Create prediction record with random date in the past
@@ -96,6 +98,7 @@ def create_demo_data():
                         payment_method=customer['payment_method'],
                         prediction=prediction,
                         probability=probability,
+                        model_version=model_version,
                         created_at=created_at
                     )
                     
@@ -13,7 +13,7 @@ import random
 backend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
 sys.path.insert(0, backend_path)
 
-from app_flask import create_app
+from app_flask import create_app, init_database
 from models import db, User, Prediction, ModelMetrics
 
 def create_indian_users():
@@ -230,27 +230,27 @@ def create_indian_predictions():
         }
     ]
     
-    created_count = 0
+    rows = []
     for customer in indian_customers:
         # Create prediction with some date variation
         days_ago = random.randint(1, 90)
         created_at = datetime.utcnow() - timedelta(days=days_ago)
         
-        prediction = Prediction(
-            user_id=demo_user.id,
-            customer_name=customer['name'],
-            tenure=customer['tenure'],
-            monthly_charges=customer['monthly_charges'],
-            total_charges=customer['total_charges'],
-            contract_type=customer['contract_type'],
-            payment_method=customer['payment_method'],
-            prediction=customer['prediction'],
-            probability=customer['probability'],
-            created_at=created_at
-        )
-        
-        db.session.add(prediction)
-        created_count += 1
+        rows.append({
+            'user_id': demo_user.id,
+            'customer_name': customer['name'],
+            'tenure': customer['tenure'],
+            'monthly_charges': customer['monthly_charges'],
+            'total_charges': customer['total_charges'],
+            'contract_type': customer['contract_type'],
+            'payment_method': customer['payment_method'],
+            'prediction': customer['prediction'],
+            'probability': customer['probability'],
+            'created_at': created_at
+        })
+    
+    Prediction.bulk_insert(rows)
+    created_count = len(rows)
     
     db.session.commit()
     print(f"✅ Created {created_count} Indian demo predictions")
@@ -281,6 +281,7 @@ def main():
     app = create_app()
     
     with app.app_context():
+        init_database()
         # Create all tables
         db.create_all()
         print("✅ Database tables created")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Local SMTP sink for testing email delivery without a real mail server
+Accepts every message, keeps it in memory and can delay the greeting
+(connection + TLS setup) and each reply to mimic a slow provider
+
+Point the app at it with MAIL_SERVER=127.0.0.1 MAIL_PORT=<port> MAIL_USE_TLS=false
+
+Usage: python local_smtp_server.py [port, default 1025] [connect delay s, default 0] [reply delay s, default 0]
+"""
+
+import sys
+import socketserver
+import threading
+import time
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line, delay=None):
+        time.sleep(self.server.reply_delay if delay is None else delay)
+        self.wfile.write(line.encode('utf-8') + b'\r\n')
+
+    def handle(self):
+        self.server.record_connection()
+        self.reply('220 localhost SMTP sink ready', delay=self.server.connect_delay)
+        sender, recipients = None, []
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip()
+            verb = command[:4].upper()
+
+            if verb in ('EHLO', 'HELO'):
+                self.reply('250 localhost')
+            elif verb == 'MAIL':
+                sender, recipients = command.split(':', 1)[-1].strip(' <>'), []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                recipients.append(command.split(':', 1)[-1].strip(' <>'))
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data in (b'.\r\n', b'.\n'):
+                        break
+                    lines.append(data[1:] if data.startswith(b'..') else data)
+                self.server.record_message(sender, recipients, b''.join(lines))
+                self.reply('250 OK queued')
+            elif verb in ('RSET', 'NOOP'):
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """In-process SMTP sink; start() serves in a daemon thread"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port=0, connect_delay=0.0, reply_delay=0.0):
+        super().__init__(('127.0.0.1', port), _SMTPHandler)
+        self.connect_delay = connect_delay
+        self.reply_delay = reply_delay
+        self.messages = []
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def record_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def record_message(self, sender, recipients, data):
+        with self._lock:
+            self.messages.append({'sender': sender, 'recipients': recipients, 'data': data})
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name='smtp-sink', daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 1025
+    connect_delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    reply_delay = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+
+    server = LocalSMTPServer(port, connect_delay, reply_delay).start()
+    print(f"📧 SMTP sink listening on 127.0.0.1:{server.port} (Ctrl+C to stop)")
+    seen = 0
+    try:
+        while True:
+            time.sleep(1)
+            for message in server.messages[seen:]:
+                print(f"   ✉️  {message['sender']} -> {', '.join(message['recipients'])} ({len(message['data'])} bytes)")
+            seen = len(server.messages)
+    except KeyboardInterrupt:
+        print(f"\n📊 {len(server.messages)} messages over {server.connections} connections")
+        server.stop()
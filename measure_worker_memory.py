@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Measure per-worker memory of the gunicorn deployment (Linux only)
+Starts gunicorn with gunicorn_config.py for each worker count, sends some
+predictions and reports RSS, PSS and USS of the master and every worker
+from /proc/<pid>/smaps_rollup
+
+Usage: python measure_worker_memory.py [worker counts, default 1,2,4] [requests per run, default 200]
+"""
+
+import sys
+import os
+import re
+import json
+import socket
+import subprocess
+import tempfile
+import time
+import urllib.request
+import urllib.parse
+from http.cookiejar import CookieJar
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def memory_kb(pid):
+    """Return RSS, PSS and USS (private clean + private dirty) in kB"""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss': fields.get('Rss', 0),
+        'pss': fields.get('Pss', 0),
+        'uss': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    }
+
+def child_pids(parent_pid):
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # Field 4 is the parent pid; the command name may contain spaces
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == parent_pid:
+            children.append(int(entry))
+    return sorted(children)
+
+def wait_until_ready(base_url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(base_url + '/auth/login', timeout=2)
+            return True
+        except OSError:
+            time.sleep(0.5)
+    return False
+
+def login(base_url, username='demo_user', password='user123'):
+    """Return a cookie-keeping opener logged in through the login form"""
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+    login_page = opener.open(base_url + '/auth/login').read().decode('utf-8')
+    match = re.search(r'name="csrf_token" type="hidden" value="([^"]+)"', login_page)
+    form = {'username': username, 'password': password}
+    if match:
+        form['csrf_token'] = match.group(1)
+    opener.open(base_url + '/auth/login', urllib.parse.urlencode(form).encode('utf-8'))
+    return opener
+
+def send_predictions(base_url, n_requests):
+    """Log in as the demo user and score customers through the JSON API"""
+    opener = login(base_url)
+
+    for i in range(n_requests):
+        body = json.dumps({
+            'customer_name': f'Customer {i}',
+            'tenure': i % 72 + 1,
+            'monthly_charges': 500 + i % 3000,
+            'total_charges': (i % 72 + 1) * (500 + i % 3000),
+            'contract_type': 'Month-to-month',
+            'payment_method': 'UPI'
+        }).encode('utf-8')
+        request = urllib.request.Request(base_url + '/api/predict', body, {'Content-Type': 'application/json'})
+        # A redirect to the login page would return HTML here instead of JSON
+        json.loads(opener.open(request).read())
+
+def measure(n_workers, n_requests):
+    port = free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    scratch = tempfile.mkdtemp()
+    env = dict(os.environ,
+               DATABASE_URL=f"sqlite:///{os.path.join(scratch, 'memory.db')}",
+               JOB_FOLDER=os.path.join(scratch, 'jobs'),
+               INIT_DB_ON_BOOT='true')
+
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn_config.py',
+         '--workers', str(n_workers), '--bind', f'127.0.0.1:{port}', 'render_start:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        if not wait_until_ready(base_url):
+            print(f"❌ gunicorn with {n_workers} workers did not start")
+            return None
+
+        send_predictions(base_url, n_requests)
+        time.sleep(1)
+
+        master = memory_kb(server.pid)
+        workers = [memory_kb(pid) for pid in child_pids(server.pid)]
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    print(f"\n👷 {n_workers} worker(s), {n_requests} predictions")
+    print(f"   {'process':<10} {'RSS MB':>8} {'PSS MB':>8} {'USS MB':>8}")
+    print(f"   {'master':<10} {master['rss'] / 1024:8.1f} {master['pss'] / 1024:8.1f} {master['uss'] / 1024:8.1f}")
+    for i, usage in enumerate(workers, start=1):
+        print(f"   {f'worker {i}':<10} {usage['rss'] / 1024:8.1f} {usage['pss'] / 1024:8.1f} {usage['uss'] / 1024:8.1f}")
+
+    total_pss = master['pss'] + sum(usage['pss'] for usage in workers)
+    mean_uss = sum(usage['uss'] for usage in workers) / len(workers) if workers else 0
+    print(f"   Total PSS: {total_pss / 1024:.1f} MB, mean worker USS: {mean_uss / 1024:.1f} MB")
+    return total_pss, mean_uss
+
+def main():
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        print("❌ /proc/<pid>/smaps_rollup is required (Linux 4.14+)")
+        sys.exit(1)
+
+    worker_counts = [int(n) for n in (sys.argv[1] if len(sys.argv) > 1 else '1,2,4').split(',')]
+    n_requests = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    print("📊 Gunicorn worker memory (USS = private memory, PSS = proportional share)")
+    print("=" * 50)
+
+    results = {}
+    for n_workers in worker_counts:
+        result = measure(n_workers, n_requests)
+        if result:
+            results[n_workers] = result
+
+    counts = sorted(results)
+    if len(counts) > 1:
+        first, last = counts[0], counts[-1]
+        per_worker = (results[last][0] - results[first][0]) / (last - first)
+        print(f"\n📈 Total PSS grows by {per_worker / 1024:.1f} MB per additional worker")
+
+if __name__ == '__main__':
+    main()
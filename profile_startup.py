@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Profile Flask app startup: runs the app factory in a fresh interpreter
+with `-X importtime` and reports import time per module and per package
+
+Usage: python profile_startup.py [number of modules to list, default 25]
+"""
+
+import sys
+import os
+import json
+import subprocess
+import tempfile
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Timed in the child; importtime output goes to stderr, the timings to stdout
+CHILD_CODE = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, %r)
+from app_flask import create_app
+imported = time.perf_counter()
+create_app()
+ready = time.perf_counter()
+print(json.dumps({'import_seconds': imported - start, 'create_app_seconds': ready - imported}))
+"""
+
+def boot_env():
+    """Environment for a boot against a scratch database, as a production worker would boot"""
+    scratch = tempfile.mkdtemp()
+    return dict(os.environ,
+                DATABASE_URL=f"sqlite:///{os.path.join(scratch, 'startup.db')}",
+                JOB_FOLDER=os.path.join(scratch, 'jobs'),
+                INIT_DB_ON_BOOT='false')
+
+def parse_importtime(stderr):
+    """
+    Parse `-X importtime` lines
+
+    Returns:
+        list: (module, self_us, cumulative_us, depth) in import order
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        modules.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return modules
+
+def profile_startup(top_n=25):
+    child = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-W', 'ignore', '-c', CHILD_CODE % os.path.join(ROOT, 'backend')],
+        env=boot_env(), capture_output=True, text=True
+    )
+    if child.returncode != 0:
+        print("❌ App failed to start:")
+        print(child.stderr[-2000:])
+        return None
+
+    timings = json.loads(child.stdout.strip().splitlines()[-1])
+    modules = parse_importtime(child.stderr)
+
+    print("🚀 Startup profile")
+    print("=" * 50)
+    print(f"⏱️  Imports (app_flask): {timings['import_seconds'] * 1000:8.1f} ms")
+    print(f"⏱️  create_app():        {timings['create_app_seconds'] * 1000:8.1f} ms")
+    print(f"📦 Modules imported:    {len(modules)}")
+
+    # Self time grouped by top-level package shows which dependency is expensive
+    per_package = defaultdict(int)
+    for name, self_us, _, _ in modules:
+        per_package[name.split('.')[0]] += self_us
+
+    print(f"\n📊 Import time per package (self time, top {top_n})")
+    for package, self_us in sorted(per_package.items(), key=lambda item: -item[1])[:top_n]:
+        print(f"   {self_us / 1000:8.1f} ms  {package}")
+
+    print(f"\n📊 Slowest modules (cumulative time, top {top_n})")
+    for name, self_us, cumulative_us, depth in sorted(modules, key=lambda m: -m[2])[:top_n]:
+        print(f"   {cumulative_us / 1000:8.1f} ms  (self {self_us / 1000:6.1f} ms)  {'  ' * depth}{name}")
+
+    return timings, modules
+
+if __name__ == '__main__':
+    top_n = int(sys.argv[1]) if len(sys.argv) > 1 else 25
+    if profile_startup(top_n) is None:
+        sys.exit(1)
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Recompute the prediction rollup tables from scratch
+Use after restoring a backup or editing the Prediction table by hand
+"""
+
+import sys
+import os
+
+# Add the backend directory to Python path
+backend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+sys.path.insert(0, backend_path)
+
+from app_flask import create_app
+from models import rebuild_rollups, UserPredictionRollup, DailyPredictionRollup
+
+def main():
+    app = create_app()
+
+    with app.app_context():
+        print("🔄 Rebuilding prediction rollup tables...")
+        rebuild_rollups()
+        print(f"✅ {UserPredictionRollup.query.count()} user rollups, "
+              f"{DailyPredictionRollup.query.count()} daily rollups")
+
+if __name__ == '__main__':
+    main()
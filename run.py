@@ -16,7 +16,7 @@ if sys.platform == 'win32':
 # Add backend to Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
 
-from backend.app_flask import create_app
+from backend.app_flask import create_app, init_database
 
 def main():
     """Main function to run the application"""
@@ -29,6 +29,11 @@ def main():
     print("=" * 50)
     
     app = create_app()
+    
+    # Local development database: create tables and demo users on first run
+    with app.app_context():
+        init_database()
+    
     app.run(debug=True, host='0.0.0.0', port=5000)
 
 if __name__ == '__main__':
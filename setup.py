@@ -35,10 +35,10 @@ def main():
     print(f"✅ Python {sys.version_info.major}.{sys.version_info.minor} detected")
     
     # Install dependencies
-    if not run_command("pip install Flask Flask-SQLAlchemy Flask-Login Flask-WTF WTForms Werkzeug pandas numpy plotly python-dotenv bcrypt email_validator", 
+    if not run_command("pip install Flask Flask-SQLAlchemy Flask-Login Flask-WTF WTForms Werkzeug numpy python-dotenv bcrypt email_validator", 
                       "Installing dependencies"):
         print("❌ Failed to install dependencies. Please install manually:")
-        print("pip install Flask Flask-SQLAlchemy Flask-Login Flask-WTF WTForms Werkzeug pandas numpy plotly python-dotenv bcrypt email_validator")
+        print("pip install Flask Flask-SQLAlchemy Flask-Login Flask-WTF WTForms Werkzeug numpy python-dotenv bcrypt email_validator")
         return False
     
     # Create demo model if needed